@@ -2,15 +2,35 @@
 ASGI config for AcademyCore2 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server, e.g. ``uvicorn AcademyCore2.asgi:application --workers 4``;
+the server receives request bodies before the async views run, so slow uploads
+don't hold a worker thread. Persistent connections (CONN_MAX_AGE > 0) leak under
+ASGI; reuse connections with the pooled backend (DB_POOL) instead. The preregistration admission checks wrap the
+application so oversized or rate-limited uploads are refused before their
+body is received.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
+import logging
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AcademyCore2.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Las conexiones persistentes no se cierran en los hilos de sync_to_async bajo ASGI (ver settings).
+for alias, database in settings.DATABASES.items():
+    if database.get('CONN_MAX_AGE'):
+        logging.getLogger(__name__).warning(
+            "Database '%s' uses CONN_MAX_AGE=%s under ASGI; connections will accumulate. "
+            "Set DB_CONN_MAX_AGE=0 or use DB_POOL.", alias, database['CONN_MAX_AGE'],
+        )
+
+from preregistration.middleware import AdmissionControlASGIMiddleware  # noqa: E402
+
+application = AdmissionControlASGIMiddleware(django_application)
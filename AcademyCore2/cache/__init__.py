@@ -0,0 +1,51 @@
+"""Cache configuration shared by the settings.
+
+Every deployment gets the same named caches; only the backend changes:
+
+- ``default``: general purpose.
+- ``reference``: lookups that rarely change (statuses, segments, sources).
+- ``template_fragments``: rendered fragments; Django's ``{% cache %}`` tag uses it automatically.
+- ``sessions``: the cache half of the ``cached_db`` session engine.
+
+``locmem`` keeps each process' cache in memory, ``file`` shares it between the
+processes of one box, and ``redis`` (any Redis-protocol server) shares it
+between nodes.
+"""
+import os
+
+BACKENDS = {
+    'locmem': 'AcademyCore2.cache.backends.LocMemCache',
+    'file': 'AcademyCore2.cache.backends.FileBasedCache',
+    'redis': 'AcademyCore2.cache.backends.RedisCache',
+}
+
+# alias: (prefijo de las claves, segundos de vigencia por defecto)
+NAMED_CACHES = {
+    'default': ('default', 300),
+    'reference': ('reference', 3600),
+    'template_fragments': ('fragments', 600),
+    'sessions': ('sessions', 60 * 60 * 24 * 14),
+}
+
+
+def build_caches(backend, location=None, directory=None):
+    """Returns the CACHES setting for `backend` ('locmem', 'file' or 'redis')."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown cache backend '{backend}'; use one of {', '.join(BACKENDS)}.")
+    caches = {}
+    for alias, (prefix, timeout) in NAMED_CACHES.items():
+        if backend == 'locmem':
+            cache_location = alias
+        elif backend == 'file':
+            cache_location = os.path.join(directory, alias)
+        else:
+            cache_location = location
+        caches[alias] = {
+            'BACKEND': BACKENDS[backend],
+            'LOCATION': cache_location,
+            'KEY_PREFIX': prefix,
+            'TIMEOUT': timeout,
+            # Nombre con el que se registran las estadísticas de aciertos
+            'ALIAS': alias,
+        }
+    return caches
@@ -0,0 +1,65 @@
+"""Django cache backends that count hits and misses per cache alias."""
+import threading
+
+from django.core.cache.backends import filebased, locmem, redis
+
+from monitoring.metrics import count_cache_lookups
+
+_MISSING = object()
+_lock = threading.Lock()
+_counters = {}
+
+
+def record(alias, hits=0, misses=0):
+    with _lock:
+        counters = _counters.setdefault(alias, {'hits': 0, 'misses': 0})
+        counters['hits'] += hits
+        counters['misses'] += misses
+    count_cache_lookups(alias, hits, misses)
+
+
+def cache_stats():
+    """Returns the hits, misses and hit rate of each cache in this process."""
+    with _lock:
+        counters = {alias: dict(values) for alias, values in _counters.items()}
+    for values in counters.values():
+        lookups = values['hits'] + values['misses']
+        values['hit_rate'] = values['hits'] / lookups if lookups else None
+    return counters
+
+
+def reset_cache_stats():
+    with _lock:
+        _counters.clear()
+
+
+class InstrumentedCacheMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        params = args[-1] if args else kwargs.get('params', {})
+        self.alias = params.get('ALIAS', 'default')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            record(self.alias, misses=1)
+            return default
+        record(self.alias, hits=1)
+        return value
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(InstrumentedCacheMixin, filebased.FileBasedCache):
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, redis.RedisCache):
+    def get_many(self, keys, version=None):
+        # RedisCache resuelve get_many en una sola llamada, sin pasar por get().
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        record(self.alias, hits=len(values), misses=len(keys) - len(values))
+        return values
@@ -0,0 +1,198 @@
+"""Thread-safe pool of raw DB-API connections shared by the database wrappers of a process.
+
+Django keeps one connection per thread (or per async context) and, with
+``CONN_MAX_AGE = 0``, opens and closes it around every request. The pooled
+backend hands those connections back to a `ConnectionPool` instead of closing
+them, so a request only pays for connection setup when the pool has no idle
+connection to give. `stats()` reports usage and wait times; `monitoring.metrics`
+exports them at ``/metrics``.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the pool timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of connections created by `connect`.
+
+    - `max_size`: maximum number of open connections (idle plus in use).
+    - `timeout`: seconds `acquire` waits for a free connection before raising `PoolTimeout`.
+    - `max_lifetime`: seconds after which a connection is closed instead of reused (None to keep it).
+    - `check`: callable that raises if an idle connection is no longer usable; it runs before reuse.
+    """
+    slow_wait = 1.0
+
+    def __init__(self, connect, max_size=10, timeout=10, max_lifetime=None, check=None):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._counters = {
+            'created': 0, 'closed': 0, 'acquired': 0, 'waits': 0, 'timeouts': 0, 'failed_checks': 0,
+        }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _expired(self, connection, now):
+        created_at = self._created_at.get(id(connection), now)
+        return self.max_lifetime is not None and now - created_at >= self.max_lifetime
+
+    def _close(self, connection):
+        """Closes a connection that has already been removed from the pool's size."""
+        self._created_at.pop(id(connection), None)
+        self._counters['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            logger.debug("Error closing pooled connection", exc_info=True)
+
+    def _record_wait(self, waited):
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        if waited >= self.slow_wait:
+            logger.warning("Waited %.2fs for a database connection (pool size %s).", waited, self.max_size)
+
+    def acquire(self):
+        """Returns an idle connection, a new one if the pool isn't full, or waits for one to be released."""
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._condition:
+                connection = None
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._expired(candidate, time.monotonic()):
+                        self._size -= 1
+                        self._close(candidate)
+                        continue
+                    connection = candidate
+                    break
+                if connection is None and self._size < self.max_size:
+                    self._size += 1
+                    break
+                if connection is None:
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"No database connection available after {self.timeout}s (pool size {self.max_size})."
+                        )
+                    if not waited:
+                        waited = True
+                        self._counters['waits'] += 1
+                    self._condition.wait(remaining)
+                    continue
+                self._in_use += 1
+                self._counters['acquired'] += 1
+                self._record_wait(time.monotonic() - start)
+            # La verificación se hace fuera del candado porque implica un viaje a la base de datos.
+            if self.check is None:
+                return connection
+            try:
+                self.check(connection)
+            except Exception:
+                with self._condition:
+                    self._counters['failed_checks'] += 1
+                    self._in_use -= 1
+                    self._size -= 1
+                    self._close(connection)
+                    self._condition.notify()
+                continue
+            return connection
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created_at[id(connection)] = time.monotonic()
+            self._in_use += 1
+            self._counters['created'] += 1
+            self._counters['acquired'] += 1
+            self._record_wait(time.monotonic() - start)
+        return connection
+
+    def release(self, connection):
+        """Returns a connection to the pool so another thread can reuse it."""
+        with self._condition:
+            self._in_use -= 1
+            if self._expired(connection, time.monotonic()):
+                self._size -= 1
+                self._close(connection)
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Closes a broken connection and frees its slot."""
+        with self._condition:
+            self._in_use -= 1
+            self._size -= 1
+            self._close(connection)
+            self._condition.notify()
+
+    def close_idle(self):
+        """Closes every idle connection; the ones in use are closed when released past their lifetime."""
+        with self._condition:
+            while self._idle:
+                self._size -= 1
+                self._close(self._idle.pop())
+
+    def stats(self):
+        with self._condition:
+            acquired = self._counters['acquired']
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                **self._counters,
+                'wait_seconds_total': self._wait_total,
+                'wait_seconds_max': self._wait_max,
+                'wait_seconds_avg': self._wait_total / acquired if acquired else 0.0,
+            }
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    """Returns the pool registered under `key`, creating it with `factory()` on first use.
+
+    Pools are per process: after a fork the child starts with empty pools
+    instead of sharing the parent's sockets.
+    """
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        if key not in _pools:
+            _pools[key] = factory()
+        return _pools[key]
+
+
+def pool_stats():
+    """Returns the stats of every pool of this process, keyed by database alias."""
+    with _pools_lock:
+        pools = list(_pools.items()) if _pools_pid == os.getpid() else []
+    # Las claves de los pools empiezan por el alias de la base de datos.
+    return {(key[0] if isinstance(key, tuple) else key): pool.stats() for key, pool in pools}
@@ -0,0 +1,73 @@
+"""MySQL backend that borrows connections from a per-process `ConnectionPool`.
+
+Configure it with ``ENGINE = 'AcademyCore2.db.pooled_mysql'`` and a ``POOL``
+dict in the database settings (``MAX_SIZE``, ``TIMEOUT``, ``MAX_LIFETIME``).
+Closing the Django connection (at the end of each request when
+``CONN_MAX_AGE = 0``) returns it to the pool instead of closing the socket.
+"""
+from django.db.backends.mysql import base as mysql
+
+from AcademyCore2.db.pool import ConnectionPool, PoolTimeout, get_pool
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+    pool = None
+    pool_discard = False
+
+    def get_pool(self, conn_params):
+        """Returns the pool for the current settings; the test runner switches NAME, so it is part of the key."""
+        settings_dict = self.settings_dict
+        key = (self.alias, settings_dict['NAME'], settings_dict['HOST'], settings_dict['PORT'], settings_dict['USER'])
+        options = self.settings_dict.get('POOL', {})
+
+        def create():
+            return ConnectionPool(
+                connect=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                max_lifetime=options.get('MAX_LIFETIME'),
+                # Las conexiones nuevas se consideran sanas, así que Django no las verifica; el pool
+                # hace la verificación al reutilizarlas si CONN_HEALTH_CHECKS está activo.
+                check=(lambda connection: connection.ping()) if self.settings_dict['CONN_HEALTH_CHECKS'] else None,
+            )
+
+        return get_pool(key, create)
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as e:
+            raise mysql.Database.OperationalError(str(e)) from e
+        self.pool = pool
+        self.pool_discard = False
+        return connection
+
+    def init_connection_state(self):
+        # El estado de sesión (modo SQL, nivel de aislamiento) se conserva en las conexiones reutilizadas.
+        if getattr(self.connection, '_pool_initialized', False):
+            return
+        super().init_connection_state()
+        self.connection._pool_initialized = True
+
+    def is_usable(self):
+        usable = super().is_usable()
+        if not usable:
+            self.pool_discard = True
+        return usable
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self.pool
+        if self.errors_occurred or self.pool_discard:
+            pool.discard(self.connection)
+            return
+        try:
+            # No se devuelve al pool una transacción abierta.
+            if self.in_atomic_block or not self.autocommit:
+                self.connection.rollback()
+        except mysql.Database.Error:
+            pool.discard(self.connection)
+        else:
+            pool.release(self.connection)
@@ -0,0 +1,122 @@
+"""Routing of read-only workloads to a replica database.
+
+Reads go to the replica only inside a `use_replica()` block (admin
+changelists, dashboards, exports). Every write goes to ``default`` and pins
+the rest of the request, and the next `REPLICA_PIN_SECONDS` of the browser
+session, to ``default``, so users always read what they have just saved even
+if the replica lags behind.
+"""
+import time
+from contextlib import ContextDecorator
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_pin'
+
+_state = Local()
+
+
+def replica_alias():
+    """Returns the alias of the replica database, or None when no replica is configured."""
+    alias = getattr(settings, 'DATABASE_REPLICA', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def reset(pinned=False):
+    """Starts a new unit of work (a request) with no replica block and no writes recorded."""
+    _state.replica_reads = False
+    _state.wrote = False
+    _state.pinned = pinned
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def pin():
+    """Sends every read of the current request (or command) to the primary database."""
+    _state.pinned = True
+
+
+def read_database():
+    """Returns the alias reads should use right now: the replica inside `use_replica()` unless pinned."""
+    alias = replica_alias()
+    if alias and getattr(_state, 'replica_reads', False) and not is_pinned():
+        return alias
+    return DEFAULT_DB_ALIAS
+
+
+class use_replica(ContextDecorator):
+    """Context manager and decorator that lets the reads inside it go to the replica."""
+    def _recreate_cm(self):
+        # Cada llamada a una función decorada usa su propia instancia para guardar el estado previo.
+        return type(self)()
+
+    def __enter__(self):
+        self.previous = getattr(_state, 'replica_reads', False)
+        _state.replica_reads = True
+        return self
+
+    def __exit__(self, *exc_info):
+        _state.replica_reads = self.previous
+        return False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica tiene los mismos datos que la primaria.
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+
+class ReplicaPinMiddleware:
+    """Pins the reads of a request to the primary when the same browser wrote recently."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reset(pinned=self.pinned_by_cookie(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = getattr(_state, 'wrote', False)
+            reset()
+        return self.process_response(response, wrote)
+
+    async def __acall__(self, request):
+        reset(pinned=self.pinned_by_cookie(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = getattr(_state, 'wrote', False)
+            reset()
+        return self.process_response(response, wrote)
+
+    def pinned_by_cookie(self, request):
+        return replica_alias() is not None and PIN_COOKIE in request.COOKIES
+
+    def process_response(self, response, wrote):
+        if wrote and replica_alias():
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time())), max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,83 @@
+"""Delivery of stored files once Django has checked who may download them.
+
+With ``MEDIA_ACCEL = 'nginx'`` the response only carries an
+``X-Accel-Redirect`` header pointing to an ``internal`` location
+(``MEDIA_ACCEL_PREFIX``) that aliases ``MEDIA_ROOT``; with ``'sendfile'`` it
+carries ``X-Sendfile`` with the absolute path (Apache mod_xsendfile,
+lighttpd). Either way the front-end server transfers the bytes and the worker
+is free as soon as the headers are sent. Without a proxy the file is streamed
+by Django: `serve_file` from sync views, `aserve_file` from async views.
+"""
+import mimetypes
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def accelerated_response(field_file, content_type):
+    """Returns an empty response that tells the front server to send the file, or None without one."""
+    mode = getattr(settings, 'MEDIA_ACCEL', '')
+    if mode == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name)
+        return response
+    if mode == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = field_file.path
+        return response
+    return None
+
+
+def guess_content_type(field_file):
+    return mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+
+
+def finish(response, field_file, as_attachment, cache_control):
+    disposition = content_disposition_header(as_attachment, field_file.name.rsplit('/', 1)[-1])
+    if disposition:
+        response['Content-Disposition'] = disposition
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def serve_file(request, field_file, content_type=None, as_attachment=False, cache_control='private, max-age=3600'):
+    """Returns a response that delivers `field_file` (a FieldFile) through the configured accelerator."""
+    if not field_file or not field_file.storage.exists(field_file.name):
+        raise Http404("File not found.")
+    content_type = content_type or guess_content_type(field_file)
+    response = accelerated_response(field_file, content_type)
+    if response is None:
+        response = FileResponse(field_file.open('rb'), content_type=content_type)
+    return finish(response, field_file, as_attachment, cache_control)
+
+
+async def aserve_file(request, field_file, content_type=None, as_attachment=False,
+                      cache_control='private, max-age=3600'):
+    """Async `serve_file`: without an accelerator the file is read in a thread pool chunk by chunk."""
+    if not field_file or not await sync_to_async(field_file.storage.exists, thread_sensitive=False)(field_file.name):
+        raise Http404("File not found.")
+    content_type = content_type or guess_content_type(field_file)
+    response = accelerated_response(field_file, content_type)
+    if response is None:
+        storage, name = field_file.storage, field_file.name
+        size = await sync_to_async(storage.size, thread_sensitive=False)(name)
+        response = StreamingHttpResponse(stream_file(storage, name), content_type=content_type)
+        response['Content-Length'] = str(size)
+    return finish(response, field_file, as_attachment, cache_control)
+
+
+async def stream_file(storage, name, chunk_size=STREAM_CHUNK_SIZE):
+    """Yields the file in chunks without blocking the event loop on disk reads."""
+    open_file = await sync_to_async(storage.open, thread_sensitive=False)(name, 'rb')
+    read = sync_to_async(open_file.read, thread_sensitive=False)
+    try:
+        while chunk := await read(chunk_size):
+            yield chunk
+    finally:
+        await sync_to_async(open_file.close, thread_sensitive=False)()
@@ -12,12 +12,23 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 from django.utils.translation import gettext_lazy as _   
-from decouple import config
+from decouple import Csv, config
+from AcademyCore2.cache import build_caches
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Fragmentos de fotos del preregistro mientras se suben (preregistration.PhotoUpload); fuera de MEDIA_ROOT.
+PHOTO_UPLOAD_DIR = config("PHOTO_UPLOAD_DIR", default=os.path.join(BASE_DIR, '.uploads'))
+PHOTO_UPLOAD_CHUNK_SIZE = 512 * 1024
+PHOTO_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+# Segundos que una foto subida o guardada de un envío con errores puede usarse antes de purgarse.
+PHOTO_UPLOAD_MAX_AGE = config("PHOTO_UPLOAD_MAX_AGE", default=24 * 3600, cast=int)
+# Entrega de archivos protegidos (AcademyCore2/media.py): '' los envía Django, 'nginx' usa
+# X-Accel-Redirect hacia la ubicación interna MEDIA_ACCEL_PREFIX y 'sendfile' usa X-Sendfile.
+MEDIA_ACCEL = config("MEDIA_ACCEL", default='')
+MEDIA_ACCEL_PREFIX = config("MEDIA_ACCEL_PREFIX", default='/protected-media/')
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -47,20 +58,50 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'crm',
     'preregistration',
-    'academy'
+    'academy',
+    'monitoring',
 ]
 
 MIDDLEWARE = [
+    # Latencia y consultas por nombre de URL para /metrics (monitoring/metrics.py)
+    'monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'preregistration.middleware.AdmissionControlMiddleware',
+    'AcademyCore2.db.routers.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Perfilado bajo demanda (?_profile=1 o X-Profile) para usuarios con monitoring.profile_requests
+    'monitoring.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Instrumentación SQL por petición (monitoring/middleware.py): consultas, tiempo, N+1 y
+# estadísticas por endpoint en el admin. Solo se activa con SQL_INSTRUMENTATION=True.
+SQL_INSTRUMENTATION = config("SQL_INSTRUMENTATION", default=False, cast=bool)
+SQL_INSTRUMENTATION_SLOW_COUNT = 5
+# Veces que una misma forma de consulta debe repetirse en una petición para reportarse como N+1
+SQL_INSTRUMENTATION_N_PLUS_ONE = config("SQL_INSTRUMENTATION_N_PLUS_ONE", default=5, cast=int)
+# Segundos entre escrituras de las estadísticas por endpoint; cada proceso las acumula en memoria.
+SQL_INSTRUMENTATION_FLUSH_INTERVAL = config("SQL_INSTRUMENTATION_FLUSH_INTERVAL", default=30, cast=int)
+if SQL_INSTRUMENTATION:
+    # Primero, para medir también las consultas de sesión y autenticación
+    MIDDLEWARE.insert(1, 'monitoring.middleware.SQLInstrumentationMiddleware')
+
+# Métricas en formato Prometheus (GET /metrics). Con PROMETHEUS_MULTIPROC_DIR cada proceso (workers y
+# comandos de manage.py) escribe sus muestras en ese directorio y /metrics las agrega; el directorio
+# debe vaciarse al arrancar el servidor. prometheus_client lee la variable de entorno al importarse.
+PROMETHEUS_MULTIPROC_DIR = config("PROMETHEUS_MULTIPROC_DIR", default='')
+if PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', PROMETHEUS_MULTIPROC_DIR)
+# Con METRICS_TOKEN el scraper debe enviar `Authorization: Bearer <token>`. En producción el token es
+# obligatorio (sin él /metrics responde 403); fuera de producción basta con venir de METRICS_ALLOWED_IPS.
+METRICS_TOKEN = config("METRICS_TOKEN", default='')
+METRICS_ALLOWED_IPS = config("METRICS_ALLOWED_IPS", default='127.0.0.1,::1', cast=Csv())
+
 ROOT_URLCONF = 'AcademyCore2.urls'
 
 TEMPLATES = [
@@ -82,25 +123,97 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'AcademyCore2.wsgi.application'
+# Punto de entrada ASGI (p. ej. `uvicorn AcademyCore2.asgi:application`); el preregistro público usa vistas async.
+# Bajo ASGI las conexiones abiertas en los hilos de sync_to_async no se cierran con request_finished, así
+# que las conexiones persistentes se acumularían hasta agotar max_connections de MySQL: por eso
+# DB_CONN_MAX_AGE vale 0 por omisión. Para reutilizar conexiones bajo ASGI se usa DB_POOL.
+ASGI_APPLICATION = 'AcademyCore2.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# DB_POOL activa el backend con pool de conexiones (AcademyCore2/db/pooled_mysql). Con el pool,
+# CONN_MAX_AGE debe quedar en 0 para que cada petición devuelva su conexión al terminar. Sin el pool,
+# DB_CONN_MAX_AGE > 0 (conexiones persistentes) solo es seguro al servir con WSGI.
+DB_POOL = config("DB_POOL", default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'AcademyCore2.db.pooled_mysql' if DB_POOL else 'django.db.backends.mysql',
         'NAME': config("DB_NAME"),
         'USER': config("DB_USER"),
         'PASSWORD': config("DB_PASSWORD"),
         'HOST': config("DB_HOST"),
-        'PORT': '3306',
+        'PORT': config("DB_PORT", default='3306'),
+        'CONN_MAX_AGE': config("DB_CONN_MAX_AGE", default=0, cast=int),
+        'CONN_HEALTH_CHECKS': config("DB_CONN_HEALTH_CHECKS", default=True, cast=bool),
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        'POOL': {
+            'MAX_SIZE': config("DB_POOL_MAX_SIZE", default=10, cast=int),
+            'TIMEOUT': config("DB_POOL_TIMEOUT", default=10, cast=float),
+            'MAX_LIFETIME': config("DB_POOL_MAX_LIFETIME", default=1800, cast=int),
+        },
     }
 }
 
+# Réplica de solo lectura para listados, tableros y exportaciones (AcademyCore2/db/routers.py).
+# Se activa definiendo DB_REPLICA_HOST; DB_REPLICA_NAME permite usar otra base local como réplica.
+if config("DB_REPLICA_HOST", default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config("DB_REPLICA_NAME", default=DATABASES['default']['NAME']),
+        'USER': config("DB_REPLICA_USER", default=DATABASES['default']['USER']),
+        'PASSWORD': config("DB_REPLICA_PASSWORD", default=DATABASES['default']['PASSWORD']),
+        'HOST': config("DB_REPLICA_HOST"),
+        'PORT': config("DB_REPLICA_PORT", default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['AcademyCore2.db.routers.ReplicaRouter']
+DATABASE_REPLICA = 'replica'
+# Segundos durante los que un navegador que acaba de escribir sigue leyendo de la primaria.
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=5, cast=int)
+
+
+# Caches con nombre (AcademyCore2/cache): CACHE_BACKEND elige locmem, file (compartida entre los
+# procesos de un servidor) o redis (cualquier servidor compatible, compartida entre nodos).
+CACHE_BACKEND = config("CACHE_BACKEND", default='file' if IS_PRODUCTION else 'locmem')
+CACHES = build_caches(
+    CACHE_BACKEND,
+    location=config("CACHE_REDIS_URL", default='redis://127.0.0.1:6379/0'),
+    directory=config("CACHE_DIR", default=os.path.join(BASE_DIR, '.cache')),
+)
+
+# Las sesiones se leen de la caché y se respaldan en la base de datos.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Control de admisión del preregistro público (preregistration/middleware.py): cubos de fichas
+# por IP y globales, máximo de envíos simultáneos y tamaño máximo del cuerpo.
+PREREGISTRATION_ADMISSION = {
+    'PATH_PREFIX': '/preregister/',
+    'IP_RATE': config("PREREG_IP_RATE", default=0.2, cast=float),
+    'IP_BURST': config("PREREG_IP_BURST", default=10, cast=int),
+    'GLOBAL_RATE': config("PREREG_GLOBAL_RATE", default=20, cast=float),
+    'GLOBAL_BURST': config("PREREG_GLOBAL_BURST", default=200, cast=int),
+    'MAX_IN_FLIGHT': config("PREREG_MAX_IN_FLIGHT", default=50, cast=int),
+    'MAX_BODY_SIZE': config("PREREG_MAX_BODY_SIZE", default=10 * 1024 * 1024, cast=int),
+    'TRUSTED_PROXIES': config("PREREG_TRUSTED_PROXIES", default=0, cast=int),
+}
+# Validación previa de CURP y teléfono (GET /preregister/precheck/): presupuesto propio por IP.
+PREREGISTRATION_PRECHECK_ADMISSION = {
+    'IP_RATE': config("PREREG_PRECHECK_IP_RATE", default=1, cast=float),
+    'IP_BURST': config("PREREG_PRECHECK_IP_BURST", default=30, cast=int),
+    'GLOBAL_RATE': config("PREREG_PRECHECK_GLOBAL_RATE", default=100, cast=float),
+    'GLOBAL_BURST': config("PREREG_PRECHECK_GLOBAL_BURST", default=500, cast=int),
+    'MAX_IN_FLIGHT': config("PREREG_PRECHECK_MAX_IN_FLIGHT", default=100, cast=int),
+    'TRUSTED_PROXIES': PREREGISTRATION_ADMISSION['TRUSTED_PROXIES'],
+}
+# Proxies delante de Django para resolver la IP de quien consulta /metrics (igual que el preregistro).
+METRICS_TRUSTED_PROXIES = PREREGISTRATION_ADMISSION['TRUSTED_PROXIES']
 
 
 # Password validation
@@ -148,6 +261,16 @@ LOCALE_PATHS = [
 STATIC_URL = 'static/'
 if IS_PRODUCTION:
     STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+    # collectstatic genera nombres con hash y variantes .gz/.br; WhiteNoise las sirve desde el
+    # proceso con Cache-Control de larga duración (los archivos con hash se marcan immutable).
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    }
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'whitenoise.middleware.WhiteNoiseMiddleware')
+    # Archivos sin hash (p. ej. favicon) se revalidan cada hora
+    WHITENOISE_MAX_AGE = 3600
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -0,0 +1,163 @@
+import threading
+import warnings
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.core.cache import caches
+from AcademyCore2.cache import build_caches
+from AcademyCore2.cache.backends import cache_stats, reset_cache_stats
+from AcademyCore2.db import routers
+from AcademyCore2.db.pool import ConnectionPool, PoolTimeout
+from crm.models import Member
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        return ConnectionPool(connect=FakeConnection, **kwargs)
+
+    def test_released_connections_are_reused(self):
+        pool = self.make_pool(max_size=2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['acquired'], stats['in_use']), (1, 2, 1))
+
+    def test_full_pool_times_out(self):
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_waiting_thread_gets_released_connection(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        connection = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        waiter.start()
+        pool.release(connection)
+        waiter.join()
+        self.assertEqual(acquired, [connection])
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_expired_connections_are_closed(self):
+        pool = self.make_pool(max_lifetime=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_connections_failing_the_check_are_replaced(self):
+        def check(connection):
+            raise OSError("gone away")
+
+        pool = self.make_pool(check=check)
+        stale = pool.acquire()
+        pool.release(stale)
+        fresh = pool.acquire()
+        self.assertIsNot(fresh, stale)
+        self.assertTrue(stale.closed)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+
+    def test_discard_frees_the_slot(self):
+        pool = self.make_pool(max_size=1, timeout=0.01)
+        connection = pool.acquire()
+        pool.discard(connection)
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.acquire(), connection)
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = ConnectionPool(connect=lambda: 1 / 0, max_size=1, timeout=0.01)
+        with self.assertRaises(ZeroDivisionError):
+            pool.acquire()
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class ReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        warnings.simplefilter('ignore', UserWarning)
+        self.addCleanup(warnings.resetwarnings)
+        databases = {**settings.DATABASES, 'replica': settings.DATABASES['default']}
+        override = self.settings(DATABASES=databases)
+        override.enable()
+        self.addCleanup(override.disable)
+        routers.reset()
+        self.addCleanup(routers.reset)
+        self.router = routers.ReplicaRouter()
+        self.middleware = routers.ReplicaPinMiddleware(self.respond)
+        self.factory = RequestFactory()
+
+    def respond(self, request):
+        with routers.use_replica():
+            request.reads = [self.router.db_for_read(Member)]
+            if request.method == 'POST':
+                self.router.db_for_write(Member)
+            request.reads.append(self.router.db_for_read(Member))
+        return HttpResponse()
+
+    def test_reads_use_replica_only_inside_block(self):
+        request = self.factory.get('/')
+        response = self.middleware(request)
+        self.assertEqual(request.reads, ['replica', 'replica'])
+        self.assertEqual(self.router.db_for_read(Member), 'default')
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_write_pins_rest_of_request_and_session(self):
+        request = self.factory.post('/')
+        response = self.middleware(request)
+        self.assertEqual(request.reads, ['replica', 'default'])
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+        request = self.factory.get('/')
+        request.COOKIES[routers.PIN_COOKIE] = response.cookies[routers.PIN_COOKIE].value
+        self.middleware(request)
+        self.assertEqual(request.reads, ['default', 'default'])
+
+    def test_nested_blocks_restore_previous_state(self):
+        with routers.use_replica():
+            with routers.use_replica():
+                pass
+            self.assertEqual(routers.read_database(), 'replica')
+        self.assertEqual(routers.read_database(), 'default')
+
+    def test_without_replica_everything_reads_default(self):
+        with self.settings(DATABASES={'default': settings.DATABASES['default']}):
+            with routers.use_replica():
+                self.assertEqual(self.router.db_for_read(Member), 'default')
+
+
+class CacheConfigTestCase(SimpleTestCase):
+    def test_named_caches_share_backend(self):
+        config = build_caches('redis', location='redis://cache:6379/1')
+        self.assertEqual(set(config), {'default', 'reference', 'template_fragments', 'sessions'})
+        self.assertEqual({entry['LOCATION'] for entry in config.values()}, {'redis://cache:6379/1'})
+        self.assertEqual(len({entry['KEY_PREFIX'] for entry in config.values()}), 4)
+
+    def test_file_caches_use_one_directory_each(self):
+        config = build_caches('file', directory='/var/cache/academy')
+        self.assertEqual(config['reference']['LOCATION'], '/var/cache/academy/reference')
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            build_caches('memcached')
+
+    def test_hits_and_misses_are_counted_per_alias(self):
+        cache = caches['reference']
+        cache.clear()
+        reset_cache_stats()
+        self.addCleanup(reset_cache_stats)
+        self.assertIsNone(cache.get('statuses'))
+        cache.set('statuses', ['active'])
+        self.assertEqual(cache.get('statuses'), ['active'])
+        self.assertEqual(cache.get_or_set('statuses', list), ['active'])
+        self.assertEqual(cache_stats()['reference'], {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
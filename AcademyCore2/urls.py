@@ -15,12 +15,23 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 from django.conf import settings
 from django.conf.urls.static import static
+from crm.views import person_photo
+from monitoring.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('preregister/', include('preregistration.urls')),  # Incluir las rutas de la app 'preregistration'
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('metrics', metrics, name='metrics'),  # Formato de exposición de Prometheus
+    # Las fotos requieren permisos: Django las autoriza y el servidor frontal las entrega (MEDIA_ACCEL).
+    re_path(
+        r'^%s(?P<name>members_photos/.+)$' % settings.MEDIA_URL.lstrip('/'), person_photo, name='person_photo'
+    ),
+]
+
+# En producción MEDIA_ROOT lo sirve el servidor web frontal, no Django.
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
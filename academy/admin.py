@@ -1,9 +1,13 @@
 from django.contrib import admin
+from django.db.models import Sum
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from academy.models import Product
+from academy.models import Product, ProductMembershipRollup
+from academy import rollups
 from django import forms
-from crm.models import Member
-from crm.admin import MemberAdmin, MemberAdminForm as BaseMemberAdminForm 
+from crm.models import Member, MembershipRollup
+from crm.rollups import prepare_day
+from crm.admin import MemberAdmin, MemberAdminForm as BaseMemberAdminForm, MembershipRollupAdmin
 
 class ProductAdminForm(forms.ModelForm):
     class Meta:
@@ -31,12 +35,14 @@ class ProductAdminForm(forms.ModelForm):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('code', 'name')
+    search_fields = ('^code', '^name')
     exclude = ['members']
     form = ProductAdminForm
 
 class ProductInline(admin.TabularInline):  # TabularInline muestra la relación en forma de tabla
     model = Member.product_set.through  # Tabla intermedia de la relación M2M
     extra = 1  # Número de filas vacías para agregar nuevos productos
+    autocomplete_fields = ('product',)
     verbose_name = _("Product")  # Singular
     verbose_name_plural = _("Products")  # Plural
     classes = ('collapse',)
@@ -48,4 +54,25 @@ class ProductInline(admin.TabularInline):  # TabularInline muestra la relación
 #        js = ('js/filter_products.js',)
 #
 #admin.site.unregister(Member)
-#admin.site.register(Member, CustomMemberAdmin)
\ No newline at end of file
+#admin.site.register(Member, CustomMemberAdmin)
+
+
+class MembershipDashboardAdmin(MembershipRollupAdmin):
+    """Adds the per-product breakdown to the membership dashboard."""
+    def seed(self, day):
+        super().seed(day)
+        if day == timezone.localdate():
+            prepare_day(ProductMembershipRollup, day, rollups.rebuild_day)
+
+    def get_sections(self, day, statuses):
+        sections = super().get_sections(day, statuses)
+        rows = (
+            ProductMembershipRollup.objects.filter(day=day)
+            .values('product_id', 'status_id').annotate(total=Sum('member_count')).order_by()
+        )
+        labels = dict(Product.objects.values_list('pk', 'name'))
+        sections.append(self.pivot(_("Product"), rows, 'product_id', labels, statuses))
+        return sections
+
+admin.site.unregister(MembershipRollup)
+admin.site.register(MembershipRollup, MembershipDashboardAdmin)
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0012_membershiprollup'),
+        ('academy', '0003_alter_product_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductMembershipRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='Day')),
+                ('member_count', models.IntegerField(default=0, verbose_name='Members')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academy.product', verbose_name='Product')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crm.accessstatus', verbose_name='Status')),
+            ],
+            options={
+                'verbose_name': 'Product Membership Rollup',
+                'verbose_name_plural': 'Product Membership Rollups',
+                'ordering': ['-day'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:39
+
+from django.db import migrations, models
+
+
+def drop_duplicated_days(apps, schema_editor):
+    """Drop the days that have repeated keys; `rebuild_membership_rollups --missing` seeds them again."""
+    ProductMembershipRollup = apps.get_model('academy', 'ProductMembershipRollup')
+    days = (
+        ProductMembershipRollup.objects.values('day', 'product', 'status')
+        .annotate(rows=models.Count('pk')).filter(rows__gt=1).values_list('day', flat=True).order_by()
+    )
+    ProductMembershipRollup.objects.filter(day__in=set(days)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academy', '0004_productmembershiprollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicated_days, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productmembershiprollup',
+            constraint=models.UniqueConstraint(fields=('day', 'product', 'status'), name='academy_unique_product_rollup'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from crm.models import AgeSegment, MedicalCondition, Member
+from crm.models import AccessStatus, AgeSegment, MedicalCondition, Member
 
 class Product(models.Model):
     code = models.CharField(max_length=50, unique=True, verbose_name=_("Código"))
@@ -15,3 +15,22 @@ class Product(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class ProductMembershipRollup(models.Model):
+    """Daily count of the members of each product per status."""
+    day = models.DateField(db_index=True, verbose_name=_("Day"))
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name=_("Product"))
+    status = models.ForeignKey(AccessStatus, on_delete=models.CASCADE, related_name='+', verbose_name=_("Status"))
+    member_count = models.IntegerField(default=0, verbose_name=_("Members"))
+
+    class Meta:
+        verbose_name = _("Product Membership Rollup")
+        verbose_name_plural = _("Product Membership Rollups")
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product', 'status'], name='academy_unique_product_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.product} - {self.status} - {self.member_count}"
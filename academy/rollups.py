@@ -0,0 +1,70 @@
+"""Daily product membership rollups, maintained like the ones in `crm.rollups`."""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from crm.models import Member
+from crm.rollups import apply_deltas, is_seeded, status_at_end_of_day
+from .models import Product, ProductMembershipRollup
+
+ProductMember = Product.members.through
+
+
+def rebuild_day(day):
+    """Recomputes every product membership rollup row of `day`."""
+    rows = (
+        ProductMember.objects
+        .annotate(status_id_as_of=status_at_end_of_day(day, member_ref='member_id'))
+        .filter(status_id_as_of__isnull=False)
+        .values('product_id', 'status_id_as_of')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    with transaction.atomic():
+        ProductMembershipRollup.objects.filter(day=day).delete()
+        ProductMembershipRollup.objects.bulk_create([
+            ProductMembershipRollup(
+                day=day, product_id=row['product_id'], status_id=row['status_id_as_of'], member_count=row['total']
+            )
+            for row in rows
+        ])
+
+
+def apply_status_changes(changes, day=None):
+    """Moves the product memberships of each changed member to its new status."""
+    day = day or timezone.localdate()
+    if not changes or not is_seeded(ProductMembershipRollup, day):
+        return
+    products = {}
+    member_ids = {member_id for member_id, _, _ in changes}
+    for member_id, product_id in ProductMember.objects.filter(member_id__in=member_ids).values_list('member_id', 'product_id'):
+        products.setdefault(member_id, []).append(product_id)
+    deltas = Counter()
+    for member_id, previous_status_id, new_status_id in changes:
+        if previous_status_id == new_status_id:
+            continue
+        for product_id in products.get(member_id, []):
+            if previous_status_id is not None:
+                deltas[(('product_id', product_id), ('status_id', previous_status_id))] -= 1
+            if new_status_id is not None:
+                deltas[(('product_id', product_id), ('status_id', new_status_id))] += 1
+    apply_deltas(ProductMembershipRollup, day, deltas)
+
+
+def apply_membership_changes(pairs, delta, day=None):
+    """Adds `delta` to the rollup of each (product_id, member_id) pair, using the member's current status."""
+    day = day or timezone.localdate()
+    if not pairs or not is_seeded(ProductMembershipRollup, day):
+        return
+    statuses = dict(
+        Member.objects.filter(pk__in={member_id for _, member_id in pairs})
+        .annotate(current_status_id=status_at_end_of_day(day))
+        .values_list('pk', 'current_status_id')
+    )
+    deltas = Counter()
+    for product_id, member_id in pairs:
+        if statuses.get(member_id) is not None:
+            deltas[(('product_id', product_id), ('status_id', statuses[member_id]))] += delta
+    apply_deltas(ProductMembershipRollup, day, deltas)
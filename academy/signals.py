@@ -0,0 +1,34 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from crm.signals import member_status_changed
+from . import rollups
+from .models import Product
+
+
+@receiver(member_status_changed)
+def update_product_membership_rollups(sender, changes, **kwargs):
+    rollups.apply_status_changes(changes)
+
+
+def membership_pairs(instance, reverse, pk_set):
+    """Returns the (product_id, member_id) pairs touched by a change of Product.members."""
+    if reverse:
+        return [(product_id, instance.pk) for product_id in pk_set]
+    return [(instance.pk, member_id) for member_id in pk_set]
+
+
+@receiver(m2m_changed, sender=Product.members.through)
+def track_product_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keeps today's product rollup in sync when members join or leave a product."""
+    if action == 'post_add':
+        rollups.apply_membership_changes(membership_pairs(instance, reverse, pk_set), 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        # Solo se descuentan las relaciones que realmente existen antes de borrarlas.
+        existing = sender.objects.filter(**{'member' if reverse else 'product': instance})
+        if action == 'pre_remove':
+            existing = existing.filter(**{'product_id__in' if reverse else 'member_id__in': pk_set})
+        instance._removed_memberships = list(existing.values_list('product_id', 'member_id'))
+    elif action in ('post_remove', 'post_clear'):
+        rollups.apply_membership_changes(getattr(instance, '_removed_memberships', []), -1)
+        instance._removed_memberships = []
@@ -0,0 +1,64 @@
+from django import forms
+from django.contrib import messages
+from django.contrib.admin import helpers
+from django.db import transaction
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.utils.translation import gettext_lazy as _
+from .models import AccessStatus, MemberAccessLog
+from .signals import member_status_changed
+
+
+class ChangeStatusForm(forms.Form):
+    status = forms.ModelChoiceField(queryset=AccessStatus.objects.all(), label=_("New status"))
+    reason = forms.CharField(max_length=255, label=_("Reason"))
+
+
+def change_status(modeladmin, request, queryset):
+    """Agrega un nuevo estado con su motivo a todos los Members seleccionados."""
+    form = ChangeStatusForm(request.POST if 'apply' in request.POST else None)
+    if form.is_bound and form.is_valid():
+        status = form.cleaned_data['status']
+        changed, skipped = apply_status(queryset, status, form.cleaned_data['reason'], request.user)
+        modeladmin.message_user(request, f"{changed} Members changed to {status}.")
+        if skipped:
+            modeladmin.message_user(
+                request, f"{skipped} Members omitted because they already had that status.", level=messages.WARNING
+            )
+        return None
+
+    context = {
+        **modeladmin.admin_site.each_context(request),
+        'title': _("Change status"),
+        'opts': modeladmin.model._meta,
+        'queryset': queryset,
+        'form': form,
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    }
+    request.current_app = modeladmin.admin_site.name
+    return TemplateResponse(request, 'admin/crm/member/change_status.html', context)
+
+
+def apply_status(queryset, status, reason, user):
+    """Appends `status` to the members that do not have it yet; returns (changed, skipped) counts."""
+    with transaction.atomic():
+        selected = queryset.count()
+        # Una sola consulta decide a quién cambiar: el estado actual se calcula en SQL. Los miembros
+        # sin ningún log tienen estado NULL, que exclude() también descartaría.
+        pending = list(
+            queryset.with_current_status()
+            .filter(Q(current_status_id__isnull=True) | ~Q(current_status_id=status.pk))
+            .order_by().values_list('pk', 'current_status_id')
+        )
+        MemberAccessLog.objects.bulk_create([
+            MemberAccessLog(member_id=member_id, status=status, reason=reason, changed_by=user)
+            for member_id, _ in pending
+        ])
+        # bulk_create no envía post_save, así que el cambio se anuncia aquí para los rollups.
+        member_status_changed.send(
+            sender=MemberAccessLog,
+            changes=[(member_id, previous_status_id, status.pk) for member_id, previous_status_id in pending],
+        )
+    return len(pending), selected - len(pending)
+
+change_status.short_description = _("Change status of selected Members")
@@ -1,20 +1,56 @@
+from collections import Counter
 from django.contrib import admin
 from django.contrib.admin import SimpleListFilter
-from django.utils import timezone
+from django.contrib.admin.utils import unquote
+from django.db.models import Max, Min, Sum
+from django.http import Http404, JsonResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import formats, timezone
+from django.utils.dateparse import parse_date
 from django.utils.translation import gettext_lazy as _
 from django.utils.safestring import mark_safe
 from django import forms
-from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
+from django.core.exceptions import PermissionDenied, ValidationError
+from AcademyCore2.db.routers import use_replica
+from . import rollups
+from .actions import change_status
+from .pagination import KeysetPaginationMixin, decode_cursor, encode_cursor, seek
 from .models import (
     Member, MemberContact, MemberAccessLog, DiscoverySource, AccessStatus,
-    AgeSegment, MedicalCondition, ContactRelation
+    AgeSegment, MedicalCondition, ContactRelation, MembershipRollup, Person, age_expression, age_range_q
 )
 
 admin.site.register(AccessStatus)
-admin.site.register(DiscoverySource)
 admin.site.register(AgeSegment)
 admin.site.register(MedicalCondition)
 admin.site.register(ContactRelation)
+
+
+class ReplicaReadsMixin:
+    """Serves the GET requests of the changelist from the read replica."""
+    def changelist_view(self, request, extra_context=None):
+        if request.method not in ('GET', 'HEAD'):
+            # Las acciones deben decidir con los datos de la primaria.
+            return super().changelist_view(request, extra_context)
+        with use_replica():
+            response = super().changelist_view(request, extra_context)
+            # La plantilla también consulta la base de datos (p. ej. current_status de cada fila).
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+
+def is_autocomplete_request(request):
+    """True when the request comes from an admin autocomplete widget."""
+    match = getattr(request, 'resolver_match', None)
+    return match is not None and match.url_name == 'autocomplete'
+
+
+@admin.register(DiscoverySource)
+class DiscoverySourceAdmin(admin.ModelAdmin):
+    search_fields = ('^name',)
                 
 class MemberAdminForm(forms.ModelForm):
     class Meta:
@@ -51,18 +87,69 @@ class MemberContactInline(admin.TabularInline):
     classes = ('collapse',)
     fields = ('name', 'phone_number', 'relation', 'is_primary', 'is_emergency')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('relation')
+
 class MedicalConditionInline(admin.TabularInline):  # Puedes usar StackedInline si prefieres.
     model = Member.medical_conditions.through
     extra = 0  # Número de filas vacías adicionales
     can_delete = True
 
 # Inline model for Member access logs
+# Orden de los logs en el inline y en access_log_view: del más reciente al más antiguo
+ACCESS_LOG_KEYSET = [(MemberAccessLog._meta.get_field('date_changed'), True), (MemberAccessLog._meta.pk, True)]
+
+
+class MemberAccessLogFormSet(BaseInlineFormSet):
+    @property
+    def load_more_cursor(self):
+        """Cursor of the last rendered log, where the "load more" button continues."""
+        forms = self.initial_forms
+        return encode_cursor(forms[-1].instance, ACCESS_LOG_KEYSET) if forms else ''
+
+
 class MemberAccessLogInline(admin.TabularInline):
     model = MemberAccessLog
+    formset = MemberAccessLogFormSet
     extra = 0
     classes = ('collapse',)
     fields = ('status', 'reason', 'changed_by', 'date_changed')
     readonly_fields = ('changed_by', 'date_changed')  
+    template = 'admin/crm/member/access_log_inline.html'
+    # Solo se muestran los logs más recientes; el resto se carga bajo demanda desde access_log_view
+    recent_limit = 20
+
+    class Media:
+        js = ('crm/js/access_log_load_more.js',)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('member', 'status', 'changed_by')
+        match = getattr(request, 'resolver_match', None)
+        object_id = match.kwargs.get('object_id') if match else None
+        if object_id is None:
+            return queryset
+        member_id = unquote(object_id)
+        if request.method == 'POST':
+            # El formset se vincula a los mismos logs que se mostraron en el GET: un log creado entretanto
+            # desplazaría la ventana de recientes y las filas enviadas ya no coincidirían.
+            return queryset.filter(member_id=member_id, pk__in=self.rendered_ids(request))
+        # MySQL no admite LIMIT dentro de IN (subconsulta), así que los ids se obtienen aparte.
+        recent_ids = list(
+            MemberAccessLog.objects.filter(member_id=member_id)
+            .order_by('-date_changed', '-pk')
+            .values_list('pk', flat=True)[:self.recent_limit]
+        )
+        return queryset.filter(pk__in=recent_ids).order_by('-date_changed', '-pk')
+
+    def rendered_ids(self, request):
+        """Returns the ids of the existing logs submitted with the change form."""
+        prefix = self.opts.get_field('member').remote_field.get_accessor_name(model=False)
+        try:
+            initial_forms = min(int(request.POST.get(f'{prefix}-INITIAL_FORMS', 0)), self.recent_limit)
+        except ValueError:
+            return []
+        ids = (request.POST.get(f'{prefix}-{index}-id', '') for index in range(initial_forms))
+        return [int(pk) for pk in ids if pk.isdigit()]
 
     def has_change_permission(self, request, obj=None):
         # No se permite editar los logs existentes
@@ -82,24 +169,166 @@ class CurrentStatusFilter(SimpleListFilter):
         return [(status.id, status.name) for status in statuses]
 
     def queryset(self, request, queryset):
-        # Filtra el queryset basado en la opción seleccionada
+        # Filtra por el estado del log más reciente; la subconsulta evita el JOIN con DISTINCT
+        if self.value():
+            return queryset.with_current_status().filter(current_status_id=self.value())
+        return queryset
+
+def parse_range(value):
+    """Parses 'low-high' (either end may be empty) into a pair of ints or None; raises ValueError."""
+    low, separator, high = value.partition('-')
+    if not separator:
+        raise ValueError(value)
+    return int(low) if low else None, int(high) if high else None
+
+
+class AgeSegmentFilter(SimpleListFilter):
+    title = _('Age Segment')
+    parameter_name = 'age_segment'
+
+    def lookups(self, request, model_admin):
+        return [(segment.pk, str(segment)) for segment in AgeSegment.objects.all()]
+
+    def queryset(self, request, queryset):
+        # La edad se traduce a un rango de birth_date para que se use el índice
+        if self.value():
+            segment = AgeSegment.objects.filter(pk=self.value()).first()
+            if segment is None:
+                return queryset.none()
+            return queryset.filter(age_range_q(segment.min_age, segment.max_age))
+        return queryset
+
+
+class AgeRangeFilter(SimpleListFilter):
+    title = _('Age')
+    parameter_name = 'age'
+    # (edad mínima, edad máxima exclusiva); None deja el extremo abierto
+    ranges = ((0, 6), (6, 13), (13, 18), (18, 30), (30, 45), (45, 60), (60, None))
+
+    def lookups(self, request, model_admin):
+        return [
+            (f"{low}-{high or ''}", f"{low}-{high - 1}" if high else f"{low}+")
+            for low, high in self.ranges
+        ]
+
+    def queryset(self, request, queryset):
+        # Acepta también rangos escritos a mano en la URL, p. ej. ?age=20-25
+        if self.value():
+            try:
+                low, high = parse_range(self.value())
+            except ValueError:
+                return queryset.none()
+            return queryset.filter(age_range_q(low, high))
+        return queryset
+
+
+class MemberCodeRangeFilter(SimpleListFilter):
+    title = _('Member Code')
+    parameter_name = 'member_code_range'
+    block_size = 1000
+
+    def lookups(self, request, model_admin):
+        # Un bloque por cada millar de códigos asignados, p. ej. 5000-5999
+        bounds = Member.objects.filter(member_code_number__gt=0).aggregate(
+            low=Min('member_code_number'), high=Max('member_code_number')
+        )
+        if bounds['low'] is None:
+            return []
+        first = bounds['low'] // self.block_size * self.block_size
+        return [
+            (f"{start}-{start + self.block_size - 1}", f"{start}-{start + self.block_size - 1}")
+            for start in range(first, bounds['high'] + 1, self.block_size)
+        ]
+
+    def queryset(self, request, queryset):
+        # Ambos extremos son inclusivos; se filtra sobre member_code_number para usar su índice
         if self.value():
-            return queryset.filter(statuses__status_id=self.value()).distinct()
+            try:
+                low, high = parse_range(self.value())
+            except ValueError:
+                return queryset.none()
+            if low is not None:
+                queryset = queryset.filter(member_code_number__gte=low)
+            if high is not None:
+                queryset = queryset.filter(member_code_number__lte=high)
         return queryset
 
+
+class AgeColumnMixin:
+    """Adds a sortable age column computed in SQL instead of per object."""
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(age_years=age_expression())
+
+    @admin.display(description=_('Age'), ordering='-birth_date')
+    def age_years(self, obj):
+        return obj.age_years
+
+
 # Admin configuration for the Member model
 @admin.register(Member)
-class MemberAdmin(admin.ModelAdmin):
+class MemberAdmin(ReplicaReadsMixin, AgeColumnMixin, KeysetPaginationMixin, admin.ModelAdmin):
     form = MemberAdminForm
+    actions = [change_status]
     list_display = (
-        'photo_preview', 'member_code', 'last_name', 'second_last_name', 'name', 'phone_number', 'current_status'
+        'photo_preview', 'member_code_column', 'last_name', 'second_last_name', 'name', 'age_years', 'phone_number',
+        'current_status'
     )
     search_fields = ('member_code', 'last_name', 'second_last_name','name', 'curp', 'email', 'phone_number')
-    list_filter = ('gender',CurrentStatusFilter)
-    ordering = ('member_code',)
+    list_filter = ('gender', CurrentStatusFilter, AgeSegmentFilter, AgeRangeFilter, MemberCodeRangeFilter)
+    # Los widgets de autocompletado solo buscan por prefijo para aprovechar los índices.
+    autocomplete_search_fields = ('^member_code', '^curp', '^last_name')
+    autocomplete_fields = ('how_did_you_hear',)
+    ordering = ('member_code_number', 'member_code')
     readonly_fields = ('member_code','enrollment_date', 'age', 'age_segment', 'photo_preview','current_status')
     # Add inlines for contacts and access logs
     inlines = [MemberContactInline, MemberAccessLogInline]
+
+    def get_search_fields(self, request):
+        if is_autocomplete_request(request):
+            return self.autocomplete_search_fields
+        return super().get_search_fields(request)
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path(
+                '<path:object_id>/access-log/',
+                self.admin_site.admin_view(self.access_log_view),
+                name=f'{opts.app_label}_{opts.model_name}_access_log',
+            ),
+        ] + super().get_urls()
+
+    def access_log_view(self, request, object_id):
+        """Returns the next page of access logs of a member as JSON, for the inline's "load more" button."""
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None:
+            raise Http404
+        if not self.has_view_or_change_permission(request, obj):
+            raise PermissionDenied
+        logs = obj.statuses.select_related('status', 'changed_by').order_by('-date_changed', '-pk')
+        values = decode_cursor(request.GET.get('cursor', ''), ACCESS_LOG_KEYSET)
+        if values is not None:
+            logs = seek(logs, ACCESS_LOG_KEYSET, values)
+        limit = MemberAccessLogInline.recent_limit
+        logs = list(logs[:limit + 1])
+        return JsonResponse({
+            'rows': [
+                {
+                    'status': str(log.status),
+                    'reason': log.reason,
+                    'changed_by': str(log.changed_by) if log.changed_by else '-',
+                    'date_changed': formats.localize(timezone.localtime(log.date_changed)),
+                }
+                for log in logs[:limit]
+            ],
+            'has_more': len(logs) > limit,
+            'cursor': encode_cursor(logs[limit - 1], ACCESS_LOG_KEYSET) if len(logs) > limit else '',
+        })
+
+    @admin.display(description=_('member code'), ordering='member_code_number')
+    def member_code_column(self, obj):
+        return obj.member_code
+
     def photo_preview(self, obj):
         """Method to display a photo preview in the admin."""
         if obj.photo:
@@ -127,3 +356,101 @@ class MemberAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+# Read-only list of every status change, paginated by date without OFFSET
+@admin.register(MemberAccessLog)
+class MemberAccessLogAdmin(ReplicaReadsMixin, KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ('date_changed', 'member', 'status', 'reason', 'changed_by')
+    list_filter = ('status',)
+    list_select_related = ('member', 'status', 'changed_by')
+    search_fields = ('^member__member_code', '^member__last_name')
+    ordering = ('-date_changed', '-pk')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# Dashboard built from the daily membership rollups
+@admin.register(MembershipRollup)
+class MembershipRollupAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/crm/membershiprollup/dashboard.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_dashboard_day(self, request):
+        """Returns the day requested through ?day=, today by default."""
+        try:
+            day = parse_date(request.GET.get('day', ''))
+        except ValueError:
+            day = None
+        return day or timezone.localdate()
+
+    def seed(self, day):
+        """Computes today's rollup on first access; past days come from the rebuild command."""
+        if day == timezone.localdate():
+            rollups.prepare_day(MembershipRollup, day, rollups.rebuild_day)
+
+    def pivot(self, title, rows, dimension, labels, statuses):
+        """Turns (dimension, status, total) rows into one table row per dimension value."""
+        table = {}
+        for row in rows:
+            table.setdefault(row[dimension], Counter())[row['status_id']] += row['total']
+        return {
+            'title': title,
+            'rows': [
+                {
+                    'label': labels.get(key, _('Unassigned')),
+                    'counts': [counts[status.pk] for status in statuses],
+                    'total': sum(counts.values()),
+                }
+                for key, counts in table.items()
+            ],
+        }
+
+    def get_sections(self, day, statuses):
+        rollup = MembershipRollup.objects.filter(day=day)
+        sections = []
+        dimensions = (
+            (_('Age Segment'), 'age_segment_id', {segment.pk: str(segment) for segment in AgeSegment.objects.all()}),
+            (_('Gender'), 'gender', dict(Person.gender_choices)),
+            (_('Discovery Source'), 'how_did_you_hear_id', dict(DiscoverySource.objects.values_list('pk', 'name'))),
+        )
+        for title, dimension, labels in dimensions:
+            rows = rollup.values(dimension, 'status_id').annotate(total=Sum('member_count')).order_by()
+            sections.append(self.pivot(title, rows, dimension, labels, statuses))
+        return sections
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        day = self.get_dashboard_day(request)
+        # Sembrar el día escribe en la primaria, y eso fija las lecturas siguientes a la primaria.
+        self.seed(day)
+        with use_replica():
+            statuses = list(AccessStatus.objects.all())
+            sections = self.get_sections(day, statuses)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': self.model._meta.verbose_name_plural,
+            'opts': self.model._meta,
+            'day': day,
+            'statuses': statuses,
+            'sections': sections,
+            **(extra_context or {}),
+        }
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, self.change_list_template, context)
@@ -0,0 +1,72 @@
+"""Point-in-time member statuses.
+
+`MemberAccessLog` is append-only, so the status of a member at any moment is the
+last log written up to that moment. To keep these lookups independent of the log
+size, `take_snapshot` periodically stores the status of every member; a query
+then starts from the latest snapshot before the requested moment and only looks
+at the log entries written after it (the tail).
+"""
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Member, MemberAccessLog, StatusSnapshot, StatusSnapshotEntry
+
+SNAPSHOT_BATCH_SIZE = 2000
+
+
+def latest_snapshot(moment):
+    """Returns the most recent snapshot taken at or before `moment`."""
+    return StatusSnapshot.objects.filter(taken_at__lte=moment).order_by('-taken_at').first()
+
+
+def status_as_of(moment, member_ref='pk', snapshot=None):
+    """Expression with the status id of the member referenced by `member_ref` at `moment` (inclusive)."""
+    tail = MemberAccessLog.objects.filter(member=OuterRef(member_ref), date_changed__lte=moment)
+    if snapshot is not None:
+        tail = tail.filter(date_changed__gt=snapshot.taken_at)
+    tail_status = Subquery(tail.order_by('-date_changed', '-pk').values('status')[:1])
+    if snapshot is None:
+        return tail_status
+    snapshot_status = Subquery(
+        StatusSnapshotEntry.objects.filter(snapshot=snapshot, member=OuterRef(member_ref)).values('status')[:1]
+    )
+    return Coalesce(tail_status, snapshot_status, output_field=IntegerField())
+
+
+def members_as_of(moment, queryset=None):
+    """Annotates `status_id_as_of` on the members that existed at `moment`."""
+    queryset = Member.objects.all() if queryset is None else queryset
+    return (
+        queryset
+        .annotate(status_id_as_of=status_as_of(moment, snapshot=latest_snapshot(moment)))
+        .filter(status_id_as_of__isnull=False)
+    )
+
+
+def headcount_as_of(moment, queryset=None):
+    """Returns the number of members in each status at `moment`, keyed by status id."""
+    return dict(
+        members_as_of(moment, queryset)
+        .values('status_id_as_of')
+        .annotate(total=Count('pk'))
+        .order_by()
+        .values_list('status_id_as_of', 'total')
+    )
+
+
+def take_snapshot(moment=None):
+    """Stores the status of every member at `moment` (now by default) as a new snapshot."""
+    moment = moment or timezone.now()
+    with transaction.atomic():
+        rows = members_as_of(moment).order_by().values_list('pk', 'status_id_as_of')
+        snapshot = StatusSnapshot.objects.create(taken_at=moment)
+        entries = [
+            StatusSnapshotEntry(snapshot=snapshot, member_id=member_id, status_id=status_id)
+            for member_id, status_id in rows
+        ]
+        StatusSnapshotEntry.objects.bulk_create(entries, batch_size=SNAPSHOT_BATCH_SIZE)
+        snapshot.member_count = len(entries)
+        snapshot.save(update_fields=['member_count'])
+    return snapshot
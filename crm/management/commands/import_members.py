@@ -1,8 +1,10 @@
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
 from crm.models import DiscoverySource, MedicalCondition, Member, MemberContact, ContactRelation
+from monitoring.commands import InstrumentedCommandMixin
+from monitoring.metrics import track_batch
 
-class Command(BaseCommand):
+class Command(InstrumentedCommandMixin, BaseCommand):
     help = "Import members from a CSV file."
 
     def add_arguments(self, parser):
@@ -14,10 +16,19 @@ class Command(BaseCommand):
 
     def import_members(self, csv_file):
         try:
-            df = self.read_csv_file(csv_file)
-            self.validate_columns(df)
-            self.convert_date_format(df)  # Convertir el formato de fecha
-            created_count, updated_count, error_count = self.process_rows(df)
+            with self.phase("read CSV") as phase:
+                df = self.read_csv_file(csv_file)
+                phase.rows = len(df)
+            with self.phase("validate") as phase:
+                self.validate_columns(df)
+                phase.rows = len(df)
+            with self.phase("convert dates") as phase:
+                self.convert_date_format(df)  # Convertir el formato de fecha
+                phase.rows = len(df)
+            with self.phase("process rows") as phase, track_batch('import_members') as rows:
+                created_count, updated_count, error_count = self.process_rows(df)
+                rows.update(created=created_count, updated=updated_count, errors=error_count)
+                phase.rows = len(df)
             self.stdout.write(self.style.SUCCESS(
                 f"Import completed: {created_count} created, {updated_count} updated, {error_count} errors."
             ))
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from academy import rollups as product_rollups
+from academy.models import ProductMembershipRollup
+from crm import rollups
+from crm.models import MemberAccessLog, MembershipRollup
+from monitoring.commands import InstrumentedCommandMixin
+
+
+class Command(InstrumentedCommandMixin, BaseCommand):
+    help = (
+        "Recompute the daily membership rollups from the access log. Schedule it with --missing "
+        "shortly after midnight so each day is seeded before the dashboard or the signals need it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=str, help="First day to rebuild (YYYY-MM-DD). Defaults to the first access log.")
+        parser.add_argument('--end', type=str, help="Last day to rebuild (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument('--missing', action='store_true', help="Only seed the days that have no rollup rows yet.")
+
+    def handle(self, *args, **kwargs):
+        today = timezone.localdate()
+        end = self.parse_day(kwargs['end']) or today
+        start = self.parse_day(kwargs['start']) or self.first_log_day() or today
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        day = start
+        rebuilt = 0
+        with self.phase("rebuild days") as phase:
+            while day <= end:
+                rebuilt += self.rebuild(day, kwargs['missing'])
+                day += timedelta(days=1)
+            phase.rows = rebuilt
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt membership rollups for {rebuilt} days ({start} to {end})."))
+
+    def rebuild(self, day, missing):
+        """Rebuilds both rollups of `day`, or only the unseeded ones with --missing; returns 1 when any was rebuilt."""
+        rebuilt = 0
+        for model, rebuild_day in (
+            (MembershipRollup, rollups.rebuild_day),
+            (ProductMembershipRollup, product_rollups.rebuild_day),
+        ):
+            if missing and rollups.is_seeded(model, day):
+                continue
+            rebuild_day(day)
+            rebuilt = 1
+        return rebuilt
+
+    def parse_day(self, value):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+        return day
+
+    def first_log_day(self):
+        first = MemberAccessLog.objects.aggregate(first=Min('date_changed'))['first']
+        return timezone.localtime(first).date() if first else None
@@ -0,0 +1,241 @@
+import json
+import shutil
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from AcademyCore2.db.routers import replica_alias
+from academy.models import Product
+from crm.models import Member, MemberAccessLog, MemberContact
+from monitoring.commands import InstrumentedCommandMixin
+
+MANIFEST_NAME = "manifest.json"
+LIVE_IDS_DIR = "_live_ids"
+
+# Cada tabla define cómo se detectan los cambios en modo incremental:
+#   "changed": filas cuyo campo "watermark" es posterior a la marca guardada en el manifiesto, que es
+#              el valor máximo de ese campo entre las filas exportadas (no la hora de la foto).
+#   "full":    se reescribe completa en cada foto (tablas pequeñas sin marcas de tiempo).
+# Una fila puede guardar su marca antes de confirmarse y hacerse visible después de la foto (o llegar
+# tarde a la réplica), así que cada foto incremental vuelve a leer una ventana de --overlap segundos
+# antes de la marca. Las filas releídas aparecen duplicadas: la versión vigente de cada id es la de
+# _snapshot_at más reciente.
+# Los borrados no se ven en modo incremental; para las tablas con "track_deletes" cada foto reescribe
+# _live_ids/<tabla> con los ids existentes, y las filas cuyo id no aparece ahí fueron borradas.
+SNAPSHOT_TABLES = {
+    "members": {
+        "model": Member,
+        "fields": [
+            "id", "member_code", "last_name", "second_last_name", "name", "curp", "birth_date",
+            "gender", "phone_number", "email", "photo", "how_did_you_hear_id",
+            "how_did_you_hear_details", "medical_condition_details", "enrollment_date", "updated_at",
+        ],
+        "mode": "changed",
+        "watermark": "updated_at",
+        "track_deletes": True,
+    },
+    "member_access_logs": {
+        "model": MemberAccessLog,
+        "fields": ["id", "member_id", "status_id", "reason", "changed_by_id", "date_changed"],
+        # Solo inserción: basta con la fecha de creación; se borran en cascada con el miembro.
+        "mode": "changed",
+        "watermark": "date_changed",
+    },
+    "member_contacts": {
+        "model": MemberContact,
+        "fields": [
+            "id", "member_id", "name", "phone_number", "relation_id", "is_primary", "is_emergency", "updated_at",
+        ],
+        "mode": "changed",
+        "watermark": "updated_at",
+        "track_deletes": True,
+    },
+    "product_members": {
+        "model": Product.members.through,
+        "fields": ["id", "product_id", "member_id"],
+        "mode": "full",
+    },
+}
+
+
+class Command(InstrumentedCommandMixin, BaseCommand):
+    help = "Write a point-in-time Parquet/Feather snapshot of the CRM tables for analytics."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', type=str, help="Directory where the dataset is written.")
+        parser.add_argument(
+            '--format', choices=['parquet', 'feather'], default='parquet',
+            help="File format of the dataset (default: parquet).",
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help="Append only the rows changed since the last snapshot recorded in the manifest.",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help="Number of rows read per primary-key ordered query (default: 5000).",
+        )
+        parser.add_argument(
+            '--overlap', type=int, default=300,
+            help="Seconds before the previous watermark that an incremental snapshot reads again, to catch "
+                 "rows committed late (default: 300).",
+        )
+        parser.add_argument(
+            '--database', default=None,
+            help="Database alias to read from (default: the read replica if configured for full snapshots, "
+                 "'default' for incremental ones).",
+        )
+
+    def handle(self, *args, **kwargs):
+        output_dir = Path(kwargs['output_dir'])
+        file_format = kwargs['format']
+        chunk_size = kwargs['chunk_size']
+        if kwargs['overlap'] < 0:
+            raise CommandError("--overlap must not be negative.")
+        self.overlap = timedelta(seconds=kwargs['overlap'])
+        # Una foto incremental leída de la réplica perdería las filas que aún no llegan a ella si el
+        # retraso supera --overlap; por omisión se lee de la primaria.
+        self.database = kwargs['database'] or (None if kwargs['incremental'] else replica_alias()) or DEFAULT_DB_ALIAS
+        if self.database not in connections:
+            raise CommandError(f"Unknown database '{self.database}'.")
+        if chunk_size <= 0:
+            raise CommandError("--chunk-size must be a positive integer.")
+
+        manifest = self.load_manifest(output_dir)
+        previous = manifest["snapshots"][-1] if manifest["snapshots"] else None
+        if kwargs['incremental']:
+            if previous is None:
+                raise CommandError("No previous snapshot found; run a full snapshot first.")
+            if previous["format"] != file_format:
+                raise CommandError(f"The existing dataset uses the '{previous['format']}' format.")
+        else:
+            previous = None
+            manifest = {"snapshots": []}
+            self.clear_tables(output_dir)
+
+        snapshot = self.take_snapshot(output_dir, file_format, chunk_size, previous)
+        manifest["snapshots"].append(snapshot)
+        self.save_manifest(output_dir, manifest)
+
+        summary = ", ".join(f"{name}: {info['rows']}" for name, info in snapshot["tables"].items())
+        self.stdout.write(self.style.SUCCESS(f"Snapshot {snapshot['snapshot_at']} written ({summary})."))
+
+    def take_snapshot(self, output_dir, file_format, chunk_size, previous):
+        """Reads every table inside one transaction so all files reflect the same point in time."""
+        connection = connections[self.database]
+        with transaction.atomic(using=self.database):
+            if connection.vendor in ('mysql', 'postgresql'):
+                # MySQL usa READ COMMITTED por defecto en Django; la foto necesita una vista estable.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            snapshot_at = timezone.now()
+            stamp = snapshot_at.strftime('%Y%m%dT%H%M%S%fZ')
+            tables = {}
+            for table_name, spec in SNAPSHOT_TABLES.items():
+                previous_table = previous["tables"].get(table_name) if previous else None
+                queryset = self.get_queryset(spec, previous_table)
+                table_dir = output_dir / table_name
+                if spec["mode"] == "full":
+                    self.clear_directory(table_dir)
+                with self.phase(f"export {table_name}") as phase:
+                    tables[table_name] = self.export_table(
+                        queryset, spec, table_dir, stamp, snapshot_at, file_format, chunk_size
+                    )
+                    phase.rows = tables[table_name]["rows"]
+                if previous_table and tables[table_name].get("watermark") is None:
+                    tables[table_name]["watermark"] = previous_table.get("watermark")
+                if spec.get("track_deletes"):
+                    self.write_live_ids(spec, output_dir, table_name, file_format)
+
+        return {
+            "snapshot_at": snapshot_at.isoformat(),
+            "mode": "incremental" if previous else "full",
+            "format": file_format,
+            "tables": tables,
+        }
+
+    def get_queryset(self, spec, previous_table):
+        """Returns the rows to export for a table, restricted to the changes when running incrementally."""
+        queryset = spec["model"].objects.using(self.database)
+        if spec["mode"] == "full" or not previous_table or previous_table.get("watermark") is None:
+            return queryset
+        since = parse_datetime(previous_table["watermark"]) - self.overlap
+        return queryset.filter(**{f"{spec['watermark']}__gte": since})
+
+    def export_table(self, queryset, spec, table_dir, stamp, snapshot_at, file_format, chunk_size):
+        """Writes the queryset in primary-key ordered chunks, one file per chunk."""
+        fields = spec["fields"]
+        watermark_field = spec.get("watermark")
+        table_dir.mkdir(parents=True, exist_ok=True)
+        rows = 0
+        last_pk = None
+        watermark = None
+        files = []
+        while True:
+            chunk = queryset.order_by('pk')
+            if last_pk is not None:
+                chunk = chunk.filter(pk__gt=last_pk)
+            records = list(chunk.values(*fields)[:chunk_size])
+            if not records:
+                break
+            df = pd.DataFrame.from_records(records, columns=fields)
+            df['_snapshot_at'] = snapshot_at
+            path = table_dir / f"{stamp}-{len(files):05d}.{file_format}"
+            self.write_frame(df, path, file_format)
+            files.append(path.name)
+            rows += len(records)
+            last_pk = records[-1]['id']
+            if watermark_field:
+                chunk_max = max(record[watermark_field] for record in records)
+                watermark = chunk_max if watermark is None else max(watermark, chunk_max)
+            if len(records) < chunk_size:
+                break
+        table = {"rows": rows, "files": files}
+        if watermark_field:
+            table["watermark"] = watermark.isoformat() if watermark else None
+        return table
+
+    def write_live_ids(self, spec, output_dir, table_name, file_format):
+        """Rewrites the ids that currently exist in a table, so readers can drop deleted rows."""
+        ids = spec["model"].objects.using(self.database).order_by('pk').values_list('pk', flat=True)
+        live_dir = output_dir / LIVE_IDS_DIR
+        live_dir.mkdir(parents=True, exist_ok=True)
+        df = pd.DataFrame({'id': list(ids.iterator(chunk_size=10000))}, dtype='int64')
+        self.write_frame(df, live_dir / f"{table_name}.{file_format}", file_format)
+
+    def write_frame(self, df, path, file_format):
+        try:
+            if file_format == 'parquet':
+                df.to_parquet(path, index=False)
+            else:
+                df.to_feather(path)
+        except ImportError as e:
+            raise CommandError(f"Writing {file_format} files requires pyarrow: {e}")
+
+    def clear_tables(self, output_dir):
+        """Removes the files of a previous dataset before writing a full snapshot."""
+        for table_name in SNAPSHOT_TABLES:
+            self.clear_directory(output_dir / table_name)
+        self.clear_directory(output_dir / LIVE_IDS_DIR)
+
+    def clear_directory(self, table_dir):
+        if table_dir.exists():
+            shutil.rmtree(table_dir)
+
+    def load_manifest(self, output_dir):
+        manifest_path = output_dir / MANIFEST_NAME
+        if not manifest_path.exists():
+            return {"snapshots": []}
+        try:
+            return json.loads(manifest_path.read_text())
+        except ValueError as e:
+            raise CommandError(f"Invalid manifest file '{manifest_path}': {e}")
+
+    def save_manifest(self, output_dir, manifest):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        (output_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
@@ -0,0 +1,59 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from AcademyCore2.db.routers import use_replica
+from crm import history, statuses
+from crm.models import AccessStatus
+from monitoring.commands import InstrumentedCommandMixin
+
+
+class Command(InstrumentedCommandMixin, BaseCommand):
+    help = "Show the member headcount per status, or the members in a status, at a given moment."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'moment', type=str,
+            help="Timestamp (YYYY-MM-DD HH:MM[:SS]) or date (YYYY-MM-DD, meaning the end of that day).",
+        )
+        parser.add_argument(
+            '--status', type=str, help="List the members that had the status with this code (e.g. 'inactive').",
+        )
+
+    @use_replica()
+    def handle(self, *args, **kwargs):
+        moment = self.parse_moment(kwargs['moment'])
+        if kwargs['status']:
+            try:
+                status_id = statuses.status_id(kwargs['status'])
+            except AccessStatus.DoesNotExist:
+                raise CommandError(f"Unknown status code '{kwargs['status']}'.")
+            members = history.members_as_of(moment).filter(status_id_as_of=status_id).order_by('member_code_number', 'member_code')
+            with self.phase("members as of") as phase:
+                members = list(members.values_list('member_code', 'name', 'last_name'))
+                phase.rows = len(members)
+            for member_code, name, last_name in members:
+                self.stdout.write(f"{member_code}\t{last_name}\t{name}")
+            return
+
+        with self.phase("headcount as of"):
+            headcount = history.headcount_as_of(moment)
+        self.stdout.write(self.style.NOTICE(f"Headcount as of {moment.isoformat()}:"))
+        for status_id, name in AccessStatus.objects.values_list('pk', 'name'):
+            self.stdout.write(f"{name}: {headcount.get(status_id, 0)}")
+
+    def parse_moment(self, value):
+        try:
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                moment = datetime.combine(day, time.max) if day else None
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise CommandError(f"Invalid timestamp '{value}'.")
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
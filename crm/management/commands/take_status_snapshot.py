@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from crm import history
+from monitoring.commands import InstrumentedCommandMixin
+
+
+class Command(InstrumentedCommandMixin, BaseCommand):
+    help = "Store the current status of every member as a snapshot for point-in-time queries."
+
+    def handle(self, *args, **kwargs):
+        with self.phase("take snapshot") as phase:
+            snapshot = history.take_snapshot()
+            phase.rows = snapshot.member_count
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot taken at {snapshot.taken_at.isoformat()} with {snapshot.member_count} members."
+        ))
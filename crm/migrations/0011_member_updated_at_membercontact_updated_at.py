@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0010_alter_accessstatus_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='updated at'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='membercontact',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='updated at'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0011_member_updated_at_membercontact_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='Day')),
+                ('gender', models.CharField(choices=[('M', 'Male'), ('F', 'Female'), ('O', 'Other')], max_length=1, verbose_name='Gender')),
+                ('member_count', models.IntegerField(default=0, verbose_name='Members')),
+                ('age_segment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='crm.agesegment', verbose_name='Age Segment')),
+                ('how_did_you_hear', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='crm.discoverysource', verbose_name='Discovery Source')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crm.accessstatus', verbose_name='Status')),
+            ],
+            options={
+                'verbose_name': 'Membership Dashboard',
+                'verbose_name_plural': 'Membership Dashboard',
+                'ordering': ['-day'],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0012_membershiprollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(unique=True, verbose_name='Taken at')),
+                ('member_count', models.PositiveIntegerField(default=0, verbose_name='Members')),
+            ],
+            options={
+                'verbose_name': 'Status Snapshot',
+                'verbose_name_plural': 'Status Snapshots',
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatusSnapshotEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'Status Snapshot Entry',
+                'verbose_name_plural': 'Status Snapshot Entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='memberaccesslog',
+            index=models.Index(fields=['member', 'date_changed'], name='crm_accesslog_member_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='statussnapshotentry',
+            name='member',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crm.member'),
+        ),
+        migrations.AddField(
+            model_name='statussnapshotentry',
+            name='snapshot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='crm.statussnapshot'),
+        ),
+        migrations.AddField(
+            model_name='statussnapshotentry',
+            name='status',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crm.accessstatus'),
+        ),
+        migrations.AddConstraint(
+            model_name='statussnapshotentry',
+            constraint=models.UniqueConstraint(fields=('snapshot', 'member'), name='crm_unique_snapshot_member'),
+        ),
+    ]
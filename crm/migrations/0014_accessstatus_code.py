@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:38
+
+from django.db import migrations, models
+
+def assign_status_codes(apps, schema_editor):
+    """Assign stable codes to the default statuses, whatever language their names are in."""
+    AccessStatus = apps.get_model('crm', 'AccessStatus')
+    codes = {
+        "active": ["Activo", "Active"],
+        "inactive": ["Inactivo", "Inactive"],
+    }
+    for code, names in codes.items():
+        status = AccessStatus.objects.filter(name__in=names).order_by('pk').first()
+        if status is None:
+            status = AccessStatus.objects.create(name=names[0])
+        status.code = code
+        status.save(update_fields=['code'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0013_statussnapshot_statussnapshotentry_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accessstatus',
+            name='code',
+            field=models.SlugField(blank=True, help_text="Stable identifier used by the application (e.g. 'active'). Leave empty for custom statuses.", null=True, unique=True, verbose_name='Code'),
+        ),
+        migrations.RunPython(assign_status_codes, migrations.RunPython.noop),
+    ]
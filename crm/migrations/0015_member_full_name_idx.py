@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0014_accessstatus_code'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['last_name', 'second_last_name', 'name'], name='crm_member_full_name_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0015_member_full_name_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='member',
+            name='birth_date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
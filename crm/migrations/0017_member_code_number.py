@@ -0,0 +1,38 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+def backfill_member_code_numbers(apps, schema_editor):
+    """Store the numeric value of every existing numeric member code."""
+    Member = apps.get_model('crm', 'Member')
+    members = []
+    for member in Member.objects.only('pk', 'member_code').iterator(chunk_size=2000):
+        code = member.member_code
+        # Los códigos que no caben en la columna se quedan en 0, igual que los no numéricos.
+        if code.isascii() and code.isdigit() and int(code) <= 2147483647:
+            member.member_code_number = int(code)
+            members.append(member)
+    Member.objects.bulk_update(members, ['member_code_number'], batch_size=2000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0016_birth_date_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='member',
+            options={'ordering': ['member_code_number', 'member_code'], 'verbose_name': 'Member', 'verbose_name_plural': 'Members'},
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='member_code_number',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='member code number'),
+        ),
+        migrations.RunPython(backfill_member_code_numbers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['member_code_number', 'member_code'], name='crm_member_code_number_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0017_member_code_number'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memberaccesslog',
+            index=models.Index(fields=['date_changed'], name='crm_accesslog_date_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.comparison
+
+
+def drop_duplicated_days(apps, schema_editor):
+    """Drop the days that have repeated keys; `rebuild_membership_rollups --missing` seeds them again."""
+    MembershipRollup = apps.get_model('crm', 'MembershipRollup')
+    days = (
+        MembershipRollup.objects.values('day', 'status', 'age_segment', 'gender', 'how_did_you_hear')
+        .annotate(rows=models.Count('pk')).filter(rows__gt=1).values_list('day', flat=True).order_by()
+    )
+    MembershipRollup.objects.filter(day__in=set(days)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0019_photo_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='membershiprollup',
+            name='age_segment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crm.agesegment', verbose_name='Age Segment'),
+        ),
+        migrations.AlterField(
+            model_name='membershiprollup',
+            name='how_did_you_hear',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='crm.discoverysource', verbose_name='Discovery Source'),
+        ),
+        migrations.RunPython(drop_duplicated_days, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='membershiprollup',
+            constraint=models.UniqueConstraint(models.F('day'), models.F('status'), django.db.models.functions.comparison.Coalesce('age_segment', 0), models.F('gender'), django.db.models.functions.comparison.Coalesce('how_did_you_hear', 0), name='crm_unique_membership_rollup'),
+        ),
+    ]
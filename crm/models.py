@@ -3,7 +3,46 @@ from datetime import date
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Case, Exists, ExpressionWrapper, IntegerField, Min, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, ExtractYear
 from django.utils.translation import gettext_lazy as _
+from AcademyCore2.db.routers import use_replica
+
+# Formatos compartidos por los modelos, los formularios y la validación previa del preregistro
+PHONE_PATTERN = r'^\d{10,15}$'
+CURP_PATTERN = r'^[A-Z]{4}\d{6}[HM]{1}[A-Z]{5}[A-Z0-9]{2}$'
+
+
+def years_before(day, years):
+    """Devuelve la fecha `years` años antes de `day` (el 29 de febrero pasa al 28 en años no bisiestos)."""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def age_expression(on=None, field='birth_date'):
+    """Expresión SQL con la edad en años cumplidos a la fecha `on` (hoy por defecto)."""
+    on = on or date.today()
+    birthday_pending = (
+        Q(**{f'{field}__month__gt': on.month}) | Q(**{f'{field}__month': on.month, f'{field}__day__gt': on.day})
+    )
+    return ExpressionWrapper(
+        Value(on.year) - ExtractYear(field) - Case(When(birthday_pending, then=Value(1)), default=Value(0)),
+        output_field=IntegerField(),
+    )
+
+
+def age_range_q(min_age=None, max_age=None, on=None, field='birth_date'):
+    """Q object matching the people aged at least `min_age` and less than `max_age` on `on`, as a birth date range."""
+    on = on or date.today()
+    condition = Q()
+    if min_age is not None:
+        condition &= Q(**{f'{field}__lte': years_before(on, min_age)})
+    if max_age is not None:
+        condition &= Q(**{f'{field}__gt': years_before(on, max_age)})
+    return condition
+
 
 class DiscoverySource(models.Model):
     """Model to represent discovery sources of the members (e.g., social media)."""
@@ -34,6 +73,10 @@ class MedicalCondition(models.Model):
 class AccessStatus(models.Model):
     """Model to represent the status of a member (Active, Inactive, Temporarily Inactive)."""
     name = models.CharField(max_length=100, unique=True, verbose_name=_("Status Name"))
+    code = models.SlugField(
+        max_length=50, unique=True, null=True, blank=True, verbose_name=_("Code"),
+        help_text=_("Stable identifier used by the application (e.g. 'active'). Leave empty for custom statuses."),
+    )
 
     class Meta:
         verbose_name = _("Access Status")
@@ -50,7 +93,7 @@ class Person(models.Model):
     last_name = models.CharField(max_length=255, blank=False)
     second_last_name = models.CharField(max_length=255, blank=False)
     curp = models.CharField(max_length=18, blank=False)
-    birth_date = models.DateField(blank=False)
+    birth_date = models.DateField(blank=False, db_index=True)
     
     gender_choices = [
         ('M', _('Male')),
@@ -60,7 +103,8 @@ class Person(models.Model):
     gender = models.CharField(max_length=1, choices=gender_choices, blank=False)
     phone_number = models.CharField(max_length=15, blank=False)
     email = models.EmailField(blank=False)
-    photo = models.ImageField(upload_to='members_photos/', blank=False)
+    # Indexada: person_photo busca al dueño de cada foto servida por su nombre de archivo
+    photo = models.ImageField(upload_to='members_photos/', blank=False, db_index=True)
     how_did_you_hear = models.ForeignKey('crm.DiscoverySource', on_delete=models.SET_NULL, null=True, blank=False)
     how_did_you_hear_details = models.CharField(max_length=255, blank=True, null=True)  # Detalles de cómo se enteró de la academia
     medical_condition_details = models.CharField(max_length=255, blank=True, null=True)  # Detalles condiciones medicas
@@ -72,6 +116,7 @@ class Person(models.Model):
         return today.year - self.birth_date.year - ((today.month, today.day) < (self.birth_date.month, self.birth_date.day))
 
     @property
+    @use_replica()
     def age_segment(self):
         """Devuelve el segmento de edad correspondiente a la persona."""
         segment = AgeSegment.objects.filter(
@@ -83,12 +128,11 @@ class Person(models.Model):
     def clean(self):
         """Validaciones para los campos comunes."""
         # Validación de número de teléfono (solo dígitos, entre 10 y 15 caracteres)
-        if not re.match(r'^\d{10,15}$', self.phone_number):
+        if not re.match(PHONE_PATTERN, self.phone_number):
             raise ValidationError(_("The phone number must contain only digits and be between 10 and 15 characters long."))
         
         # Validación de CURP (formato mexicano)
-        curp_pattern = r'^[A-Z]{4}\d{6}[HM]{1}[A-Z]{5}[A-Z0-9]{2}$'
-        if not re.match(curp_pattern, self.curp):
+        if not re.match(CURP_PATTERN, self.curp):
             raise ValidationError(_("The CURP must follow a valid format."))
         super().clean()  # Llamar al método clean() de la clase base para asegurarse de que no se omitan otras validaciones
 
@@ -99,22 +143,55 @@ class Person(models.Model):
         abstract = True
 
 
+# Mayor valor que cabe en un PositiveIntegerField en todos los motores (MySQL admite hasta 2**32 - 1).
+MAX_MEMBER_CODE_NUMBER = 2147483647
+
+
+def member_code_number(code):
+    """Devuelve el valor numérico de un member_code, o 0 si no es numérico o no cabe en la columna."""
+    if not code or not (code.isascii() and code.isdigit()):
+        return 0
+    number = int(code)
+    return number if number <= MAX_MEMBER_CODE_NUMBER else 0
+
+
+class MemberQuerySet(models.QuerySet):
+    def with_current_status(self):
+        """Annotates `current_status_id` with the status of the most recent access log, in SQL."""
+        latest_log = (
+            MemberAccessLog.objects.filter(member=OuterRef('pk'))
+            .order_by('-date_changed', '-pk')
+            .values('status')[:1]
+        )
+        return self.annotate(current_status_id=Subquery(latest_log))
+
+
 class Member(Person):
     """Modelo que representa a un miembro de la academia o club, hereda de Person."""
     member_code = models.CharField(max_length=100, unique=True, blank=False)
+    # Copia numérica de member_code para ordenar, filtrar por rangos y asignar códigos en la base de datos
+    member_code_number = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("member code number"))
     enrollment_date = models.DateField(auto_now_add=True, blank=True)  # Fecha de inscripción
     curp = models.CharField(max_length=18, unique=True, blank=False)  # Único solo en Member
     medical_conditions = models.ManyToManyField('crm.MedicalCondition', blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_("updated at"))
+
+    objects = MemberQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Member")
         verbose_name_plural = _("Members")
-        ordering = ['member_code']
+        ordering = ['member_code_number', 'member_code']
+        indexes = [
+            models.Index(fields=['member_code_number', 'member_code'], name='crm_member_code_number_idx'),
+            models.Index(fields=['last_name', 'second_last_name', 'name'], name='crm_member_full_name_idx'),
+        ]
 
     def __str__(self):
         return f"({self.member_code}) {self.name}" 
 
     @property
+    @use_replica()
     def current_status(self):
         """Devuelve el último estado del miembro según el log más reciente."""
         latest_log = self.statuses.order_by('-date_changed').first()
@@ -125,14 +202,18 @@ class Member(Person):
         is_new = self.pk is None
         if is_new:
             self.member_code = self.generate_member_code()
+        self.member_code_number = member_code_number(self.member_code)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'member_code' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'member_code_number'}
         super().save(*args, **kwargs)
         
         if is_new:
             # Solo crear el registro de log si es un miembro nuevo
-            active_status = AccessStatus.objects.get(name=_("Activo"))
+            from .statuses import ACTIVE, status_id
             MemberAccessLog.objects.create(
                 member=self,
-                status=active_status,
+                status_id=status_id(ACTIVE),
                 reason=_("New member"),
                 changed_by=user,
             )
@@ -140,17 +221,13 @@ class Member(Person):
     def generate_member_code(self):
         """Genera un nuevo member_code secuencial comenzando desde 5000."""
         MIN_CODE = 5000
-        # Obtener todos los códigos actuales y ordenarlos
-        existing_codes = Member.objects.values_list('member_code', flat=True)
-        existing_codes = [int(code) for code in existing_codes if code.isdigit() and int(code) >= MIN_CODE]
-        existing_codes.sort()
-        # Buscar el primer hueco en la secuencia
-        new_code = MIN_CODE
-        for code in existing_codes:
-            if new_code < code:
-                break
-            new_code += 1
-        return str(new_code).zfill(4)
+        taken = Member.objects.filter(member_code_number__gte=MIN_CODE)
+        if not taken.filter(member_code_number=MIN_CODE).exists():
+            return str(MIN_CODE).zfill(4)
+        # El primer hueco está justo después del menor código cuyo siguiente número está libre
+        next_taken = Member.objects.filter(member_code_number=OuterRef('member_code_number') + 1)
+        last_before_gap = taken.filter(~Exists(next_taken)).aggregate(code=Min('member_code_number'))['code']
+        return str(last_before_gap + 1).zfill(4)
 
 
 class MemberAccessLog(models.Model):
@@ -165,6 +242,11 @@ class MemberAccessLog(models.Model):
         verbose_name = _("Member Access Log")
         verbose_name_plural = _("Member Access Logs")
         ordering = ['-date_changed']
+        indexes = [
+            models.Index(fields=['member', 'date_changed'], name='crm_accesslog_member_date_idx'),
+            # Marca de agua de las fotos incrementales de snapshot_crm
+            models.Index(fields=['date_changed'], name='crm_accesslog_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.member.name} - {self.status.name} - {self.date_changed}"
@@ -207,6 +289,8 @@ class Contact(models.Model):
 class MemberContact(Contact):
     """Model to represent a contact for a member."""
     member = models.ForeignKey(Member, related_name='contacts', on_delete=models.CASCADE, blank=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_("updated at"))
+
     class Meta:
         verbose_name = _("Member Contact")
         verbose_name_plural = _("Member Contacts")
@@ -245,3 +329,62 @@ class AgeSegment(models.Model):
                 params={"segment": overlapping_segment_names}
             )
         super().clean()
+
+    def birth_date_range(self, on=None):
+        """Returns the (exclusive, inclusive) birth date bounds of the people in this segment on a given day."""
+        on = on or date.today()
+        return years_before(on, self.max_age), years_before(on, self.min_age)
+
+
+class MembershipRollup(models.Model):
+    """Daily count of members per status, age segment, gender and discovery source."""
+    day = models.DateField(db_index=True, verbose_name=_("Day"))
+    status = models.ForeignKey(AccessStatus, on_delete=models.CASCADE, related_name='+', verbose_name=_("Status"))
+    # Al borrar un segmento o una fuente se eliminan sus filas y se recalculan esos días (ver crm.signals).
+    age_segment = models.ForeignKey(AgeSegment, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name=_("Age Segment"))
+    gender = models.CharField(max_length=1, choices=Person.gender_choices, verbose_name=_("Gender"))
+    how_did_you_hear = models.ForeignKey(DiscoverySource, on_delete=models.CASCADE, null=True, blank=True, related_name='+', verbose_name=_("Discovery Source"))
+    member_count = models.IntegerField(default=0, verbose_name=_("Members"))
+
+    class Meta:
+        verbose_name = _("Membership Dashboard")
+        verbose_name_plural = _("Membership Dashboard")
+        ordering = ['-day']
+        constraints = [
+            # Sin segmento o sin fuente cuenta como 0 para que esas filas también sean únicas.
+            models.UniqueConstraint(
+                'day', 'status', Coalesce('age_segment', 0), 'gender', Coalesce('how_did_you_hear', 0),
+                name='crm_unique_membership_rollup',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.status} - {self.member_count}"
+
+
+class StatusSnapshot(models.Model):
+    """Compact copy of the status of every member at a point in time."""
+    taken_at = models.DateTimeField(unique=True, verbose_name=_("Taken at"))
+    member_count = models.PositiveIntegerField(default=0, verbose_name=_("Members"))
+
+    class Meta:
+        verbose_name = _("Status Snapshot")
+        verbose_name_plural = _("Status Snapshots")
+        ordering = ['-taken_at']
+
+    def __str__(self):
+        return f"{self.taken_at} ({self.member_count})"
+
+
+class StatusSnapshotEntry(models.Model):
+    """Status of one member in a snapshot."""
+    snapshot = models.ForeignKey(StatusSnapshot, on_delete=models.CASCADE, related_name='entries')
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='+')
+    status = models.ForeignKey(AccessStatus, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        verbose_name = _("Status Snapshot Entry")
+        verbose_name_plural = _("Status Snapshot Entries")
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot', 'member'], name='crm_unique_snapshot_member'),
+        ]
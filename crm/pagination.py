@@ -0,0 +1,194 @@
+"""Changelist pagination for the large CRM tables.
+
+Django's admin paginates with ``COUNT(*)`` plus ``OFFSET``, and both get slower
+as the table grows. `KeysetChangeList` seeks from the last row shown instead
+(``WHERE key > last_key ORDER BY key LIMIT n``), so every page costs the same as
+the first one, and `EstimatedCountPaginator` takes the total from the table
+statistics when counting every row would be expensive.
+"""
+from functools import cached_property
+
+from django.contrib.admin.views.main import ChangeList
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+
+CURSOR_VAR = 'cursor'
+CURSOR_SALT = 'crm.pagination.cursor'
+
+
+def estimated_row_count(model, using='default'):
+    """Returns the row count of the model's table according to the database statistics, or None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        # En InnoDB TABLE_ROWS es una estimación del optimizador; no recorre la tabla.
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def encode_cursor(obj, keyset):
+    """Returns a signed cursor with the values of `obj` for the (field, descending) pairs of `keyset`."""
+    return signing.dumps([field.value_to_string(obj) for field, _ in keyset], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor, keyset):
+    """Returns the key values stored in `cursor`, or None if it is invalid."""
+    try:
+        values = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(values, list) or len(values) != len(keyset):
+        return None
+    try:
+        return [field.to_python(value) for (field, _), value in zip(keyset, values)]
+    except Exception:
+        return None
+
+
+def seek(queryset, keyset, values):
+    """Filters the rows that come after `values` in the keyset ordering."""
+    condition = Q()
+    for position, (field, descending) in enumerate(keyset):
+        lookups = {prev.attname: value for (prev, _), value in zip(keyset[:position], values)}
+        lookups[f"{field.attname}__{'lt' if descending else 'gt'}"] = values[position]
+        condition |= Q(**lookups)
+    return queryset.filter(condition)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids counting every row of large tables.
+
+    Unfiltered lists above `estimate_threshold` rows report the table statistics;
+    filtered lists stop counting at `count_limit` rows. In both cases `estimated`
+    is set so the template can show the total as approximate.
+    """
+    estimate_threshold = 10000
+    count_limit = 10000
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.estimate_threshold:
+                self.estimated = True
+                return estimate
+        count = queryset.order_by()[:self.count_limit].count()
+        if count >= self.count_limit:
+            self.estimated = True
+        return count
+
+
+class KeysetChangeList(ChangeList):
+    """Changelist that pages by seeking on the ordering columns instead of using OFFSET.
+
+    Seeking needs an ordering made of non-null columns of the model that ends in
+    a unique one; any other ordering (e.g. by a related field) falls back to the
+    regular numbered pages.
+    """
+    keyset = None
+    next_cursor = None
+    cursor = None
+
+    def __init__(self, request, *args, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        # El cursor no debe viajar en los enlaces de filtros ni en el formulario de búsqueda.
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Cambiar filtros u orden siempre vuelve a la primera página.
+        return super().get_query_string(new_params, [CURSOR_VAR, *(remove or [])])
+
+    def get_keyset(self, queryset):
+        """Returns the ordering as a list of (field, descending) pairs, or None if it can't be used to seek."""
+        opts = self.lookup_opts
+        keyset = []
+        for part in queryset.query.order_by:
+            if not isinstance(part, str) or '__' in part.lstrip('-') or part == '?':
+                return None
+            name = part.lstrip('-')
+            try:
+                field = opts.pk if name == 'pk' else opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete or field.null or field.is_relation:
+                return None
+            keyset.append((field, part.startswith('-')))
+        if not keyset or not (keyset[-1][0].primary_key or keyset[-1][0].unique):
+            return None
+        return keyset
+
+    def encode_cursor(self, obj):
+        return encode_cursor(obj, self.keyset)
+
+    def decode_cursor(self, cursor):
+        return decode_cursor(cursor, self.keyset)
+
+    def seek(self, queryset, values):
+        return seek(queryset, self.keyset, values)
+
+    def get_results(self, request):
+        self.keyset = self.get_keyset(self.queryset)
+        if self.keyset is None or self.show_all:
+            return super().get_results(request)
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        queryset = self.queryset
+        values = self.decode_cursor(request.GET[CURSOR_VAR]) if CURSOR_VAR in request.GET else None
+        if values is not None:
+            self.cursor = request.GET[CURSOR_VAR]
+            queryset = self.seek(queryset, values)
+        rows = list(queryset[:self.list_per_page + 1])
+        result_list = rows[:self.list_per_page]
+        if len(rows) > self.list_per_page:
+            self.next_cursor = self.encode_cursor(result_list[-1])
+
+        self.result_count = paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.result_list = result_list
+        self.can_show_all = False
+        self.multi_page = self.cursor is not None or self.next_cursor is not None
+        self.paginator = paginator
+        self.show_admin_actions = True
+
+    @property
+    def count_is_estimated(self):
+        return getattr(self.paginator, 'estimated', False)
+
+    def first_page_url(self):
+        return self.get_query_string()
+
+    def next_page_url(self):
+        if self.next_cursor is None:
+            return None
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
+class KeysetPaginationMixin:
+    """ModelAdmin mixin that pages the changelist with `KeysetChangeList` and estimated counts."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/crm/keyset_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,163 @@
+"""Daily membership rollups.
+
+Each day holds one row per combination of status and member dimensions. A day is
+seeded with a single set-based query over the current members, either by the
+scheduled `rebuild_membership_rollups --missing` run or by the first visit to the
+dashboard, and afterwards it is kept up to date by applying +1/-1 deltas as access
+logs are appended or member attributes change, so the dashboard never has to scan
+the access-log history. Writes never seed a day: they only move counts between the
+rows of a day that is already seeded.
+"""
+from collections import Counter
+from datetime import datetime, time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import history
+from .models import AgeSegment, Member, MembershipRollup
+
+
+def end_of_day(day):
+    """Returns the last instant of `day` as an aware datetime."""
+    return timezone.make_aware(datetime.combine(day, time.max))
+
+
+def status_at_end_of_day(day, member_ref='pk'):
+    """Expression with the status id of a member when `day` ended."""
+    moment = end_of_day(day)
+    return history.status_as_of(moment, member_ref=member_ref, snapshot=history.latest_snapshot(moment))
+
+
+def age_segment_case(day, segments=None, field='birth_date'):
+    """CASE expression mapping a birth date to the id of its age segment on `day`."""
+    segments = AgeSegment.objects.all() if segments is None else segments
+    whens = []
+    for segment in segments:
+        after, until = segment.birth_date_range(day)
+        whens.append(When(**{f'{field}__gt': after, f'{field}__lte': until}, then=Value(segment.pk)))
+    if not whens:
+        return Value(None, output_field=IntegerField())
+    return Case(*whens, default=None, output_field=IntegerField())
+
+
+def segment_for(birth_date, day, segments):
+    """Python counterpart of `age_segment_case` for a single birth date."""
+    if isinstance(birth_date, str):
+        birth_date = parse_date(birth_date)
+    for segment in segments:
+        after, until = segment.birth_date_range(day)
+        if after < birth_date <= until:
+            return segment.pk
+    return None
+
+
+def is_seeded(model, day):
+    return model.objects.filter(day=day).exists()
+
+
+def prepare_day(model, day, rebuild):
+    """Seeds `day` with `rebuild` unless it already has rows.
+
+    Two concurrent seeds insert the same keys; the loser's transaction is rolled
+    back by the unique constraint and the rows of the winner are kept.
+    """
+    if is_seeded(model, day):
+        return
+    try:
+        rebuild(day)
+    except IntegrityError:
+        pass
+
+
+def rebuild_day(day):
+    """Recomputes every membership rollup row of `day` from the access log."""
+    rows = (
+        Member.objects
+        .annotate(status_id_as_of=status_at_end_of_day(day), age_segment_id=age_segment_case(day))
+        .filter(status_id_as_of__isnull=False)
+        .values('status_id_as_of', 'age_segment_id', 'gender', 'how_did_you_hear_id')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    with transaction.atomic():
+        MembershipRollup.objects.filter(day=day).delete()
+        MembershipRollup.objects.bulk_create([
+            MembershipRollup(
+                day=day,
+                status_id=row['status_id_as_of'],
+                age_segment_id=row['age_segment_id'],
+                gender=row['gender'],
+                how_did_you_hear_id=row['how_did_you_hear_id'],
+                member_count=row['total'],
+            )
+            for row in rows
+        ])
+
+
+def apply_deltas(model, day, deltas):
+    """Adds each delta to the row identified by its key, creating the row when missing."""
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        lookup = dict(key)
+        with transaction.atomic():
+            rows = model.objects.filter(day=day, **lookup)
+            if rows.update(member_count=F('member_count') + delta):
+                continue
+            # La restricción única hace que una creación concurrente se convierta en una actualización.
+            row, created = model.objects.get_or_create(day=day, **lookup, defaults={'member_count': delta})
+            if not created:
+                rows.update(member_count=F('member_count') + delta)
+
+
+def member_dimensions(member_ids, day):
+    """Returns the rollup dimensions of each member on `day`, keyed by member id."""
+    segments = list(AgeSegment.objects.all())
+    return {
+        row['pk']: {
+            'age_segment_id': segment_for(row['birth_date'], day, segments),
+            'gender': row['gender'],
+            'how_did_you_hear_id': row['how_did_you_hear_id'],
+        }
+        for row in Member.objects.filter(pk__in=member_ids).values('pk', 'birth_date', 'gender', 'how_did_you_hear_id')
+    }
+
+
+def rollup_key(dimensions, status_id):
+    return tuple(sorted({**dimensions, 'status_id': status_id}.items()))
+
+
+def apply_status_changes(changes, day=None):
+    """Moves each member from its previous status to the new one in today's rollup.
+
+    `changes` is a list of (member_id, previous_status_id, new_status_id) tuples; a
+    previous status of None means the member was just created and a new status of
+    None that it is being deleted.
+    """
+    day = day or timezone.localdate()
+    if not changes or not is_seeded(MembershipRollup, day):
+        return
+    dimensions = member_dimensions({member_id for member_id, _, _ in changes}, day)
+    deltas = Counter()
+    for member_id, previous_status_id, new_status_id in changes:
+        if member_id not in dimensions or previous_status_id == new_status_id:
+            continue
+        if previous_status_id is not None:
+            deltas[rollup_key(dimensions[member_id], previous_status_id)] -= 1
+        if new_status_id is not None:
+            deltas[rollup_key(dimensions[member_id], new_status_id)] += 1
+    apply_deltas(MembershipRollup, day, deltas)
+
+
+def apply_dimension_change(previous, current, status_id, day=None):
+    """Moves one member between rollup rows after its gender, birth date or source changed."""
+    day = day or timezone.localdate()
+    if status_id is None or previous == current or not is_seeded(MembershipRollup, day):
+        return
+    deltas = Counter()
+    deltas[rollup_key(previous, status_id)] -= 1
+    deltas[rollup_key(current, status_id)] += 1
+    apply_deltas(MembershipRollup, day, deltas)
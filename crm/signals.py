@@ -0,0 +1,84 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import rollups, statuses
+from .models import AccessStatus, AgeSegment, DiscoverySource, Member, MemberAccessLog, MembershipRollup
+
+# Enviada cuando uno o varios miembros cambian de estado.
+# Argumento `changes`: lista de tuplas (member_id, previous_status_id, new_status_id).
+member_status_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender=AccessStatus)
+def clear_status_registry(sender, **kwargs):
+    statuses.clear_cache()
+
+
+def latest_status_id(member_id, exclude_pk=None):
+    """Returns the status id of the most recent access log of a member."""
+    logs = MemberAccessLog.objects.filter(member_id=member_id)
+    if exclude_pk is not None:
+        logs = logs.exclude(pk=exclude_pk)
+    return logs.order_by('-date_changed', '-pk').values_list('status_id', flat=True).first()
+
+
+@receiver(post_save, sender=MemberAccessLog)
+def announce_status_change(sender, instance, created, raw=False, **kwargs):
+    """Publishes every new access log as a status change of its member."""
+    if not created or raw:
+        return
+    previous_status_id = latest_status_id(instance.member_id, exclude_pk=instance.pk)
+    member_status_changed.send(
+        sender=MemberAccessLog, changes=[(instance.member_id, previous_status_id, instance.status_id)]
+    )
+
+
+@receiver(pre_delete, sender=Member)
+def announce_member_removal(sender, instance, **kwargs):
+    """Publishes a deleted member as leaving its current status."""
+    status_id = latest_status_id(instance.pk)
+    if status_id is not None:
+        member_status_changed.send(sender=Member, changes=[(instance.pk, status_id, None)])
+
+
+@receiver(member_status_changed)
+def update_membership_rollups(sender, changes, **kwargs):
+    rollups.apply_status_changes(changes)
+
+
+@receiver(pre_save, sender=Member)
+def remember_rollup_dimensions(sender, instance, raw=False, **kwargs):
+    """Keeps the dimensions stored before an update so the rollup row can be moved afterwards."""
+    if raw or instance.pk is None or not rollups.is_seeded(MembershipRollup, timezone.localdate()):
+        return
+    instance._rollup_dimensions = rollups.member_dimensions([instance.pk], timezone.localdate()).get(instance.pk)
+
+
+@receiver(post_save, sender=Member)
+def move_member_between_rollups(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_rollup_dimensions', None)
+    if created or raw or previous is None:
+        return
+    del instance._rollup_dimensions
+    current = rollups.member_dimensions([instance.pk], timezone.localdate()).get(instance.pk)
+    if current != previous:
+        rollups.apply_dimension_change(previous, current, latest_status_id(instance.pk))
+
+
+@receiver(pre_delete, sender=AgeSegment)
+@receiver(pre_delete, sender=DiscoverySource)
+def remember_rollup_days(sender, instance, **kwargs):
+    """Keeps the days whose rollup rows are about to be deleted along with the segment or source."""
+    field = 'age_segment' if sender is AgeSegment else 'how_did_you_hear'
+    instance._rollup_days = list(
+        MembershipRollup.objects.filter(**{field: instance}).values_list('day', flat=True).distinct().order_by()
+    )
+
+
+@receiver(post_delete, sender=AgeSegment)
+@receiver(post_delete, sender=DiscoverySource)
+def rebuild_rollup_days(sender, instance, **kwargs):
+    """Recomputes the days that lost rows so their members are counted under their new dimensions."""
+    for day in getattr(instance, '_rollup_days', []):
+        rollups.rebuild_day(day)
@@ -0,0 +1,46 @@
+'use strict';
+{
+    // Columnas en el mismo orden que MemberAccessLogInline.fields
+    const columns = ['status', 'reason', 'changed_by', 'date_changed'];
+
+    function cell(className, text) {
+        const td = document.createElement('td');
+        td.className = className;
+        if (text !== undefined) {
+            const p = document.createElement('p');
+            p.textContent = text;
+            td.appendChild(p);
+        }
+        return td;
+    }
+
+    document.addEventListener('click', function(event) {
+        const button = event.target.closest('.access-log-load-more button');
+        if (!button) {
+            return;
+        }
+        const container = button.parentElement;
+        const tbody = container.previousElementSibling.querySelector('tbody');
+        button.disabled = true;
+        fetch(container.dataset.url + '?cursor=' + encodeURIComponent(container.dataset.cursor), {credentials: 'same-origin'})
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                const emptyForm = tbody.querySelector('.empty-form');
+                data.rows.forEach(function(row) {
+                    const tr = document.createElement('tr');
+                    tr.className = 'form-row has_original';
+                    tr.appendChild(cell('original'));
+                    columns.forEach(function(column) {
+                        tr.appendChild(cell('field-' + column, row[column]));
+                    });
+                    tbody.insertBefore(tr, emptyForm);
+                });
+                container.dataset.cursor = data.cursor;
+                if (data.has_more) {
+                    button.disabled = false;
+                } else {
+                    container.remove();
+                }
+            });
+    });
+}
@@ -0,0 +1,35 @@
+"""Registry of the access statuses the application relies on.
+
+Statuses are referenced by their stable `code` instead of their display name, which
+is translatable and editable. The code -> pk map is loaded once per process and
+cleared whenever an AccessStatus is saved or deleted (see `crm.signals`).
+"""
+from .models import AccessStatus
+
+ACTIVE = 'active'
+INACTIVE = 'inactive'
+
+_status_ids = None
+
+
+def load():
+    global _status_ids
+    _status_ids = dict(AccessStatus.objects.filter(code__isnull=False).values_list('code', 'pk'))
+    return _status_ids
+
+
+def clear_cache():
+    global _status_ids
+    _status_ids = None
+
+
+def status_id(code):
+    """Returns the primary key of the status with the given code."""
+    status_ids = _status_ids if _status_ids is not None else load()
+    if code not in status_ids:
+        # Puede haberse creado en otro proceso después de cargar el mapa.
+        status_ids = load()
+    try:
+        return status_ids[code]
+    except KeyError:
+        raise AccessStatus.DoesNotExist(f"No access status with code '{code}'.")
@@ -0,0 +1,115 @@
+import re
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from crm.admin import MemberAdmin
+from crm.models import AccessStatus, Member, MemberAccessLog
+from crm.pagination import EstimatedCountPaginator
+
+
+class KeysetPaginationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        cls.inactive = AccessStatus.objects.get(name="Inactivo")
+        for number in range(5):
+            # member_code se genera de forma secuencial desde 5000
+            Member.objects.create(
+                name="Juan",
+                last_name="Pérez",
+                curp=f"PAGN010101HDFRRN{number:02d}",
+                birth_date="1985-01-01",
+                gender="M",
+                phone_number="+521234567890",
+                email="juan.perez@example.com",
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        patcher = mock.patch.object(MemberAdmin, 'list_per_page', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def next_url(self, response):
+        match = re.search(r'href="([^"]*)" class="next"', response.content.decode())
+        return match and match.group(1).replace('&amp;', '&')
+
+    def test_pages_follow_the_cursor(self):
+        codes = []
+        url = '?'
+        while url:
+            response = self.client.get('/admin/crm/member/' + url)
+            self.assertEqual(response.status_code, 200)
+            codes += [member.member_code for member in response.context['cl'].result_list]
+            url = self.next_url(response)
+        self.assertEqual(codes, ['5000', '5001', '5002', '5003', '5004'])
+
+    def test_deep_pages_seek_instead_of_offset(self):
+        first = self.client.get('/admin/crm/member/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/admin/crm/member/' + self.next_url(first))
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('OFFSET', sql)
+        self.assertIn('"crm_member"."member_code" >', sql)
+
+    def test_tampered_cursor_starts_from_first_page(self):
+        response = self.client.get('/admin/crm/member/?cursor=invalid')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_list[0].member_code, '5000')
+
+    def test_filter_links_drop_the_cursor(self):
+        first = self.client.get('/admin/crm/member/')
+        response = self.client.get('/admin/crm/member/' + self.next_url(first))
+        self.assertNotIn('cursor', response.context['cl'].get_query_string({'gender': 'F'}))
+        self.assertNotIn('cursor', response.context['cl'].params)
+
+    def test_ordering_by_related_field_falls_back_to_numbered_pages(self):
+        response = self.client.get('/admin/crm/member/?o=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.context['cl'].keyset)
+        with mock.patch.object(MemberAdmin, 'ordering', ('how_did_you_hear__name',)):
+            response = self.client.get('/admin/crm/member/')
+        self.assertIsNone(response.context['cl'].keyset)
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+    def test_current_status_filter_uses_latest_log(self):
+        member = Member.objects.get(member_code='5001')
+        MemberAccessLog.objects.create(member=member, status=self.inactive, reason="Baja")
+        response = self.client.get('/admin/crm/member/', {'current_status': self.inactive.pk})
+        self.assertEqual([m.pk for m in response.context['cl'].result_list], [member.pk])
+        active = AccessStatus.objects.get(name="Activo")
+        response = self.client.get('/admin/crm/member/', {'current_status': active.pk})
+        self.assertNotIn(member.pk, [m.pk for m in response.context['cl'].result_list])
+
+    def test_member_code_range_filter(self):
+        response = self.client.get('/admin/crm/member/', {'member_code_range': '5001-5002'})
+        codes = [member.member_code for member in response.context['cl'].result_list]
+        self.assertEqual(codes, ['5001', '5002'])
+        self.assertIn(('5000-5999', '5000-5999'), response.context['cl'].filter_specs[-1].lookup_choices)
+
+    def test_access_log_changelist(self):
+        response = self.client.get('/admin/crm/memberaccesslog/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+
+class EstimatedCountPaginatorTestCase(TestCase):
+    def test_uses_table_statistics_for_unfiltered_lists(self):
+        with mock.patch('crm.pagination.estimated_row_count', return_value=250000):
+            paginator = EstimatedCountPaginator(Member.objects.order_by('pk'), 100)
+            self.assertEqual(paginator.count, 250000)
+        self.assertTrue(paginator.estimated)
+
+    def test_counts_small_tables_exactly(self):
+        with mock.patch('crm.pagination.estimated_row_count', return_value=3):
+            paginator = EstimatedCountPaginator(Member.objects.order_by('pk'), 100)
+            self.assertEqual(paginator.count, 0)
+        self.assertFalse(paginator.estimated)
+
+    def test_filtered_counts_are_bounded(self):
+        paginator = EstimatedCountPaginator(AccessStatus.objects.filter(pk__gt=0), 100)
+        paginator.count_limit = 1
+        self.assertEqual(paginator.count, 1)
+        self.assertTrue(paginator.estimated)
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from crm.models import AgeSegment, Member, age_expression, years_before
+
+
+class AgeFiltersTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        today = date.today()
+        cls.birth_dates = {
+            'baby': years_before(today, 1),
+            'turns_ten_tomorrow': years_before(today, 10) + timedelta(days=1),
+            'ten_today': years_before(today, 10),
+            'adult': years_before(today, 30),
+            'senior': years_before(today, 70),
+        }
+        cls.members = {}
+        for number, (key, birth_date) in enumerate(cls.birth_dates.items()):
+            cls.members[key] = Member.objects.create(
+                name=key,
+                curp=f"AGEF010101HDFRRN{number:02d}",
+                birth_date=birth_date,
+                gender="M",
+                phone_number="+521234567890",
+                email="juan.perez@example.com",
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def names(self, response):
+        return {member.name for member in response.context['cl'].result_list}
+
+    def test_age_expression_matches_age_property(self):
+        ages = dict(Member.objects.annotate(age_years=age_expression()).values_list('pk', 'age_years'))
+        for member in self.members.values():
+            self.assertEqual(ages[member.pk], member.age, member.name)
+
+    def test_age_segment_filter(self):
+        child = AgeSegment.objects.get(name="Child")
+        response = self.client.get('/admin/crm/member/', {'age_segment': child.pk})
+        self.assertEqual(self.names(response), {'turns_ten_tomorrow', 'ten_today'})
+
+    def test_age_range_filter(self):
+        response = self.client.get('/admin/crm/member/', {'age': '10-31'})
+        self.assertEqual(self.names(response), {'ten_today', 'adult'})
+        response = self.client.get('/admin/crm/member/', {'age': '60-'})
+        self.assertEqual(self.names(response), {'senior'})
+
+    def test_invalid_age_range_returns_no_rows(self):
+        response = self.client.get('/admin/crm/member/', {'age': 'old'})
+        self.assertEqual(self.names(response), set())
+
+    def test_age_column_sorts_by_birth_date(self):
+        columns = self.client.get('/admin/crm/member/').context['cl'].list_display
+        index = columns.index('age_years')
+        response = self.client.get('/admin/crm/member/', {'o': str(index)})
+        ages = [member.age_years for member in response.context['cl'].result_list]
+        self.assertEqual(ages, sorted(ages))
+        self.assertIn('-birth_date', response.context['cl'].queryset.query.order_by)
+
+    def test_preregister_changelist_has_age_filters(self):
+        response = self.client.get('/admin/preregistration/preregister/', {'age': '18-30'})
+        self.assertEqual(response.status_code, 200)
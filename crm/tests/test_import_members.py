@@ -0,0 +1,66 @@
+import pstats
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import TestCase
+from crm.models import Member
+
+
+class ImportMembersCommandTestCase(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def write_csv(self, count):
+        rows = []
+        for index in range(count):
+            rows.append({
+                "codigo": 9000 + index, "apellido1": "Pérez", "apellido2": "López", "nombre": f"Alumno {index}",
+                "curp": f"IMPO010101HDFRRN{index:02d}", "fecha_inscripcion": "15/01/2025", "nacimiento": "01/01/1990",
+                "genero": "M", "telefono": "+521234567890", "correo": f"alumno{index}@example.com",
+                "producto": "", "descubrimiento": "Amigos", "descubrimiento_detalles": "",
+                "condicion_medica": "Ninguna", "condicion_medica_detalles": "", "estatus": "Activo",
+                "contacto_principal_nombre": "Ana", "contacto_principal_relacion": "Madre",
+                "contacto_principal_telefono": "+521234567891",
+                "contacto_emergencia_nombre": "Luis", "contacto_emergencia_relacion": "Padre",
+                "contacto_emergencia_telefono": "+521234567892",
+                "contacto_3_nombre": "", "contacto_3_relacion": "", "contacto_3_telefono": "",
+                "contacto_4_nombre": "", "contacto_4_relacion": "", "contacto_4_telefono": "",
+                "contacto_5_nombre": "", "contacto_5_telefono": "",
+            })
+        path = self.directory / "members.csv"
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return path
+
+    def test_stats_report_every_phase(self):
+        """Verifica que --stats reporte tiempo, filas y consultas de cada fase sin alterar la salida."""
+        path = self.write_csv(3)
+        out, err = StringIO(), StringIO()
+        call_command('import_members', str(path), '--stats', stdout=out, stderr=err)
+
+        self.assertEqual(Member.objects.filter(curp__startswith="IMPO").count(), 3)
+        self.assertIn("Import completed: 3 created", out.getvalue())
+        self.assertNotIn("Rows/s", out.getvalue())
+        report = err.getvalue()
+        for phase in ("read CSV", "validate", "convert dates", "process rows", "total"):
+            self.assertIn(phase, report)
+        process_rows = next(line for line in report.splitlines() if line.startswith("process rows")).split()
+        self.assertEqual(process_rows[3], "3")
+        self.assertGreater(int(process_rows[5]), 0)
+
+    def test_profile_and_memory_trace(self):
+        """Verifica que --profile escriba un archivo pstats y --trace-memory reporte el pico de memoria."""
+        path = self.write_csv(1)
+        profile_path = self.directory / "import.prof"
+        err = StringIO()
+        call_command(
+            'import_members', str(path), '--profile', str(profile_path), '--trace-memory', '3',
+            stdout=StringIO(), stderr=err,
+        )
+
+        stats = pstats.Stats(str(profile_path))
+        self.assertTrue(any(name == 'process_rows' for _, _, name in stats.stats))
+        self.assertIn("Memory: peak", err.getvalue())
+        self.assertIn("Largest allocations after", err.getvalue())
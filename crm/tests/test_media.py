@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from crm.models import Member
+from preregistration.models import TermsAndConditions
+
+
+class ProtectedMediaTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        self.member = Member(
+            name="Juan", curp="MEDI010101HDFRRN01", birth_date="1985-01-01", gender="M",
+            phone_number="+521234567890", email="juan.perez@example.com",
+        )
+        self.member.photo.save("photo.jpg", ContentFile(b"jpeg-bytes"), save=False)
+        self.member.save()
+        self.url = self.member.photo.url
+
+    def test_anonymous_users_are_sent_to_login(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_staff_without_permission_gets_404(self):
+        User.objects.create_user(username="staff", password="staffpassword", is_staff=True)
+        self.client.login(username="staff", password="staffpassword")
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_streams_file_without_accelerator(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"jpeg-bytes")
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    @override_settings(MEDIA_ACCEL='nginx', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_nginx_receives_internal_redirect(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.member.photo.name)
+        self.assertEqual(response.content, b"")
+
+    @override_settings(MEDIA_ACCEL='sendfile')
+    def test_terms_pdf_uses_sendfile(self):
+        terms = TermsAndConditions()
+        terms.pdf.save("terms.pdf", ContentFile(b"%PDF-1.4"), save=True)
+        response = self.client.get('/preregister/terms-and-conditions/')
+        self.assertEqual(response['X-Sendfile'], terms.pdf.path)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_unknown_photo_is_not_served(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/media/members_photos/../../settings.py').status_code, 404)
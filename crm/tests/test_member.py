@@ -86,4 +86,35 @@ class MemberTestCase(TestCase):
         """Verifica que la edad calculada sea correcta."""
         birth_date = date.today().replace(year=date.today().year - 30)  # 30 años atrás
         member = self.create_member(birth_date=birth_date)
-        self.assertEqual(member.age, 30, "La edad calculada no es la esperada.")
\ No newline at end of file
+        self.assertEqual(member.age, 30, "La edad calculada no es la esperada.")
+
+    def test_member_codes_fill_first_gap(self):
+        """Verifica que el código asignado sea el primer hueco desde 5000 y que se guarde su valor numérico."""
+        first = self.create_member(curp="CODE010101HDFRRN01")
+        second = self.create_member(curp="CODE010101HDFRRN02")
+        third = self.create_member(curp="CODE010101HDFRRN03")
+        self.assertEqual([first.member_code, second.member_code, third.member_code], ['5000', '5001', '5002'])
+        self.assertEqual(third.member_code_number, 5002)
+        second.delete()
+        self.assertEqual(self.create_member(curp="CODE010101HDFRRN04").member_code, '5001')
+        self.assertEqual(self.create_member(curp="CODE010101HDFRRN05").member_code, '5003')
+
+    def test_member_codes_sort_numerically(self):
+        """Verifica que '10000' se ordene después de '9999'."""
+        low = self.create_member(curp="CODE010101HDFRRN06")
+        high = self.create_member(curp="CODE010101HDFRRN07")
+        Member.objects.filter(pk=low.pk).update(member_code='9999', member_code_number=9999)
+        high.member_code = '10000'
+        high.save(update_fields=['member_code'])
+        high.refresh_from_db()
+        self.assertEqual(high.member_code_number, 10000)
+        self.assertEqual(list(Member.objects.values_list('member_code', flat=True)), ['9999', '10000'])
+        self.assertEqual(Member.objects.filter(member_code_number__range=(5000, 9999)).get(), Member.objects.get(pk=low.pk))
+
+    def test_member_code_number_out_of_range(self):
+        """Verifica que un código numérico que no cabe en la columna se guarde como no numérico (0)."""
+        member = self.create_member(curp="CODE010101HDFRRN08")
+        member.member_code = '99999999999'
+        member.save(update_fields=['member_code'])
+        member.refresh_from_db()
+        self.assertEqual(member.member_code_number, 0)
@@ -0,0 +1,141 @@
+import uuid
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from crm.admin import MemberAccessLogInline
+from crm.models import AccessStatus, Member, MemberAccessLog
+
+
+class ChangeStatusActionTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        cls.active = AccessStatus.objects.get(name="Activo")
+        cls.inactive = AccessStatus.objects.get(name="Inactivo")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create_member(self, **kwargs):
+        defaults = {
+            "member_code": uuid.uuid4(),
+            "name": "Juan Pérez",
+            "curp": "JUAP010101HDFRRN09",
+            "birth_date": "1985-01-01",
+            "gender": "M",
+            "phone_number": "+521234567890",
+            "email": "juan.perez@example.com",
+            "photo": None,
+            "how_did_you_hear": None,
+        }
+        defaults.update(kwargs)
+        return Member.objects.create(**defaults)
+
+    def test_intermediate_page_is_shown(self):
+        member = self.create_member(curp="ACTN010101HDFRRN10")
+        response = self.client.post('/admin/crm/member/', {'action': 'change_status', '_selected_action': [member.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'admin/crm/member/change_status.html')
+
+    def test_change_status_skips_members_already_in_status(self):
+        """Verifica que se agregue un log por miembro, omitiendo los que ya tienen el estado destino."""
+        first = self.create_member(curp="ACTN010101HDFRRN11")
+        second = self.create_member(curp="ACTN010101HDFRRN12")
+        MemberAccessLog.objects.create(member=second, status=self.inactive, reason="Previo")
+
+        response = self.client.post('/admin/crm/member/', {
+            'action': 'change_status',
+            '_selected_action': [first.pk, second.pk],
+            'status': self.inactive.pk,
+            'reason': "Sin pago",
+            'apply': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(first.current_status, self.inactive)
+        self.assertEqual(MemberAccessLog.objects.filter(reason="Sin pago").count(), 1)
+        self.assertEqual(MemberAccessLog.objects.get(reason="Sin pago").changed_by, self.user)
+        self.assertEqual(Member.objects.with_current_status().get(pk=second.pk).current_status_id, self.inactive.pk)
+
+    def test_change_status_includes_members_without_history(self):
+        """Verifica que un miembro sin logs (estado actual NULL) también reciba el nuevo estado."""
+        member = self.create_member(curp="ACTN010101HDFRRN13")
+        MemberAccessLog.objects.filter(member=member).delete()
+
+        self.client.post('/admin/crm/member/', {
+            'action': 'change_status',
+            '_selected_action': [member.pk],
+            'status': self.inactive.pk,
+            'reason': "Sin historial",
+            'apply': 'yes',
+        })
+        self.assertEqual(member.current_status, self.inactive)
+
+
+class MemberAccessLogInlineTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        cls.inactive = AccessStatus.objects.get(name="Inactivo")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create_member_with_logs(self, curp, log_count):
+        member = Member.objects.create(
+            name="Juan Pérez", last_name="Pérez", second_last_name="López", curp=curp, birth_date="1985-01-01",
+            gender="M", phone_number="1234567890", email="juan.perez@example.com",
+        )
+        MemberAccessLog.objects.bulk_create([
+            MemberAccessLog(member=member, status=self.inactive, reason=f"Cambio {i}", changed_by=self.user)
+            for i in range(log_count - 1)
+        ])
+        return member
+
+    def change_page_queries(self, member):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/crm/member/{member.pk}/change/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_change_page_cost_does_not_grow_with_history(self):
+        """Abrir un miembro con mucho historial cuesta lo mismo que uno con poco."""
+        short = self.create_member_with_logs("INLN010101HDFRRN10", 21)
+        long = self.create_member_with_logs("INLN010101HDFRRN11", 60)
+        self.change_page_queries(short)  # Calienta las cachés de la primera petición
+        _, short_queries = self.change_page_queries(short)
+        response, long_queries = self.change_page_queries(long)
+        self.assertEqual(short_queries, long_queries)
+        self.assertContains(response, 'access-log-load-more')
+        self.assertEqual(response.context['inline_admin_formsets'][1].formset.initial_form_count(), 20)
+
+    def test_load_more_returns_older_logs(self):
+        member = self.create_member_with_logs("INLN010101HDFRRN12", 45)
+        formset = self.client.get(f'/admin/crm/member/{member.pk}/change/').context['inline_admin_formsets'][1].formset
+        url = f'/admin/crm/member/{member.pk}/access-log/'
+        data = self.client.get(url, {'cursor': formset.load_more_cursor}).json()
+        self.assertEqual(len(data['rows']), 20)
+        self.assertTrue(data['has_more'])
+        # Un log nuevo no desplaza la página siguiente: el cursor sigue desde la última fila mostrada.
+        MemberAccessLog.objects.create(member=member, status=self.inactive, reason="Nuevo")
+        data = self.client.get(url, {'cursor': data['cursor']}).json()
+        self.assertEqual(len(data['rows']), 5)
+        self.assertFalse(data['has_more'])
+
+    def test_post_binds_the_logs_rendered_on_get(self):
+        """Un log creado entre el GET y el POST no desplaza las filas del formulario enviado."""
+        member = self.create_member_with_logs("INLN010101HDFRRN13", 25)
+        url = f'/admin/crm/member/{member.pk}/change/'
+        formset = self.client.get(url).context['inline_admin_formsets'][1].formset
+        rendered = [form.instance.pk for form in formset.initial_forms]
+        MemberAccessLog.objects.create(member=member, status=self.inactive, reason="Nuevo")
+
+        data = {f'{formset.prefix}-INITIAL_FORMS': len(rendered)}
+        data.update({f'{formset.prefix}-{index}-id': pk for index, pk in enumerate(rendered)})
+        request = RequestFactory().post(url, data)
+        request.user = self.user
+        request.resolver_match = resolve(url)
+        queryset = MemberAccessLogInline(Member, admin.site).get_queryset(request)
+        self.assertEqual(sorted(queryset.values_list('pk', flat=True)), sorted(rendered))
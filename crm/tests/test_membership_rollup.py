@@ -0,0 +1,126 @@
+import uuid
+from django.contrib.auth.models import User
+from datetime import date
+from django.test import TestCase
+from django.utils import timezone
+from academy.models import Product, ProductMembershipRollup
+from academy import rollups as product_rollups
+from crm import rollups
+from crm.models import AccessStatus, DiscoverySource, Member, MemberAccessLog, MembershipRollup
+
+
+class MembershipRollupTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.active = AccessStatus.objects.get(name="Activo")
+        cls.inactive = AccessStatus.objects.get(name="Inactivo")
+        cls.product = Product.objects.create(code="SWIM", name="Natación")
+
+    def create_member(self, **kwargs):
+        defaults = {
+            "member_code": uuid.uuid4(),
+            "name": "Juan Pérez",
+            "curp": "JUAP010101HDFRRN09",
+            "birth_date": "1985-01-01",
+            "gender": "M",
+            "phone_number": "+521234567890",
+            "email": "juan.perez@example.com",
+            "photo": None,
+            "how_did_you_hear": None,
+        }
+        defaults.update(kwargs)
+        return Member.objects.create(**defaults)
+
+    def counts(self, model, **filters):
+        today = timezone.localdate()
+        return {
+            row.status_id: row.member_count
+            for row in model.objects.filter(day=today, **filters) if row.member_count
+        }
+
+    def assert_matches_rebuild(self):
+        """Las filas mantenidas incrementalmente deben coincidir con un recálculo completo."""
+        today = timezone.localdate()
+        incremental = sorted(
+            MembershipRollup.objects.filter(day=today, member_count__gt=0)
+            .values_list('status_id', 'age_segment_id', 'gender', 'how_did_you_hear_id', 'member_count')
+        )
+        incremental_products = sorted(
+            ProductMembershipRollup.objects.filter(day=today, member_count__gt=0)
+            .values_list('product_id', 'status_id', 'member_count')
+        )
+        rollups.rebuild_day(today)
+        product_rollups.rebuild_day(today)
+        rebuilt = sorted(
+            MembershipRollup.objects.filter(day=today)
+            .values_list('status_id', 'age_segment_id', 'gender', 'how_did_you_hear_id', 'member_count')
+        )
+        rebuilt_products = sorted(
+            ProductMembershipRollup.objects.filter(day=today).values_list('product_id', 'status_id', 'member_count')
+        )
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(incremental_products, rebuilt_products)
+
+    def test_rollups_follow_new_members_and_status_changes(self):
+        """Verifica que el rollup del día se actualice con altas, cambios de estado y productos."""
+        existing = self.create_member(curp="ROLL010101HDFRRN10")
+        self.product.members.add(existing)
+        rollups.rebuild_day(timezone.localdate())
+        product_rollups.rebuild_day(timezone.localdate())
+        self.assertEqual(self.counts(MembershipRollup), {self.active.pk: 1})
+
+        member = self.create_member(curp="ROLL010101HDFRRN11", gender="F", birth_date=date(2015, 5, 5))
+        MemberAccessLog.objects.create(member=existing, status=self.inactive, reason="Sin pago")
+        self.product.members.add(member)
+        self.assertEqual(self.counts(MembershipRollup), {self.active.pk: 1, self.inactive.pk: 1})
+        self.assertEqual(self.counts(ProductMembershipRollup), {self.active.pk: 1, self.inactive.pk: 1})
+
+        member.gender = "O"
+        member.save()
+        self.product.members.remove(existing)
+        self.assertEqual(self.counts(ProductMembershipRollup), {self.active.pk: 1})
+        self.assert_matches_rebuild()
+
+    def test_deleting_member_removes_it_from_rollups(self):
+        member = self.create_member(curp="ROLL010101HDFRRN12")
+        self.product.members.add(member)
+        rollups.rebuild_day(timezone.localdate())
+        product_rollups.rebuild_day(timezone.localdate())
+
+        member.delete()
+        self.assertEqual(self.counts(MembershipRollup), {})
+        self.assertEqual(self.counts(ProductMembershipRollup), {})
+
+    def test_writes_do_not_seed_the_day(self):
+        """Sin sembrar el día, las altas no calculan el rollup; lo hace el comando o el dashboard."""
+        member = self.create_member(curp="ROLL010101HDFRRN14")
+        self.product.members.add(member)
+        member.gender = "F"
+        member.save()
+        self.assertFalse(MembershipRollup.objects.exists())
+        self.assertFalse(ProductMembershipRollup.objects.exists())
+
+    def test_deleting_discovery_source_rebuilds_its_days(self):
+        """Las filas de la fuente borrada se recalculan en vez de sumarse a las filas sin fuente."""
+        source = DiscoverySource.objects.create(name="Volante")
+        self.create_member(curp="ROLL010101HDFRRN15")
+        self.create_member(curp="ROLL010101HDFRRN16", how_did_you_hear=source)
+        rollups.rebuild_day(timezone.localdate())
+        product_rollups.rebuild_day(timezone.localdate())
+
+        source.delete()
+        rows = MembershipRollup.objects.filter(day=timezone.localdate())
+        self.assertEqual(list(rows.values_list('how_did_you_hear_id', 'member_count')), [(None, 2)])
+        MemberAccessLog.objects.create(member=Member.objects.first(), status=self.inactive, reason="Sin pago")
+        self.assertEqual(self.counts(MembershipRollup), {self.active.pk: 1, self.inactive.pk: 1})
+        self.assert_matches_rebuild()
+
+    def test_dashboard_renders_from_rollups(self):
+        self.create_member(curp="ROLL010101HDFRRN13")
+        admin_user = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        self.client.force_login(admin_user)
+
+        response = self.client.get('/admin/crm/membershiprollup/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['sections'][1]['rows'][0]['total'], 1)
+        self.assertEqual(len(response.context['sections']), 4)
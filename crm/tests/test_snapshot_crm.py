@@ -0,0 +1,91 @@
+import json
+import tempfile
+import uuid
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.dateparse import parse_datetime
+from crm.models import Member, MemberAccessLog, AccessStatus
+
+
+class SnapshotCrmCommandTestCase(TestCase):
+    def setUp(self):
+        self.output_dir = Path(tempfile.mkdtemp())
+
+    def create_member(self, **kwargs):
+        defaults = {
+            "member_code": uuid.uuid4(),
+            "name": "Juan Pérez",
+            "curp": "JUAP010101HDFRRN09",
+            "birth_date": "1985-01-01",
+            "gender": "M",
+            "phone_number": "+521234567890",
+            "email": "juan.perez@example.com",
+            "photo": None,
+            "how_did_you_hear": None,
+        }
+        defaults.update(kwargs)
+        return Member.objects.create(**defaults)
+
+    def read_table(self, table_name):
+        return pd.read_parquet(self.output_dir / table_name)
+
+    def test_full_snapshot_reads_in_chunks(self):
+        """Verifica que la foto completa contenga todas las filas aunque se lean en varios bloques."""
+        for suffix in range(10, 13):
+            self.create_member(curp=f"SNAP010101HDFRRN{suffix}")
+
+        call_command('snapshot_crm', str(self.output_dir), '--chunk-size', '2', stdout=StringIO())
+
+        members = self.read_table('members')
+        self.assertEqual(len(members), 3)
+        self.assertEqual(len(list((self.output_dir / 'members').iterdir())), 2)
+        self.assertEqual(len(self.read_table('member_access_logs')), 3)
+
+    def test_incremental_snapshot_appends_only_changes(self):
+        """Verifica que el modo incremental solo agregue las filas nuevas o modificadas."""
+        self.create_member(curp="SNAP010101HDFRRN21")
+        member = self.create_member(curp="SNAP010101HDFRRN20")
+        call_command('snapshot_crm', str(self.output_dir), stdout=StringIO())
+
+        member.email = "nuevo@example.com"
+        member.save()
+        MemberAccessLog.objects.create(
+            member=member, status=AccessStatus.objects.get(name="Inactivo"), reason="Sin pago"
+        )
+        log = MemberAccessLog.objects.latest('pk')
+        call_command('snapshot_crm', str(self.output_dir), '--incremental', '--overlap', '0', stdout=StringIO())
+
+        manifest = json.loads((self.output_dir / 'manifest.json').read_text())
+        incremental = manifest["snapshots"][-1]
+        self.assertEqual(incremental["mode"], "incremental")
+        self.assertEqual(incremental["tables"]["members"]["rows"], 1)
+        self.assertEqual(incremental["tables"]["members"]["watermark"], member.updated_at.isoformat())
+        logs = self.read_table('member_access_logs')
+        self.assertIn(log.pk, set(logs[logs['_snapshot_at'] == logs['_snapshot_at'].max()]['id']))
+
+        members = self.read_table('members')
+        latest = members.sort_values('_snapshot_at').drop_duplicates('id', keep='last')
+        self.assertEqual(latest.set_index('id').loc[member.pk, 'email'], "nuevo@example.com")
+
+    def test_incremental_snapshot_reads_late_commits_and_lists_live_ids(self):
+        """Verifica que se relean las filas confirmadas tarde y que los borrados se detecten con _live_ids."""
+        kept = self.create_member(curp="SNAP010101HDFRRN30")
+        deleted = self.create_member(curp="SNAP010101HDFRRN31")
+        call_command('snapshot_crm', str(self.output_dir), stdout=StringIO())
+        manifest = json.loads((self.output_dir / 'manifest.json').read_text())
+        watermark = parse_datetime(manifest["snapshots"][-1]["tables"]["members"]["watermark"])
+
+        # Una fila guardada antes de la marca de agua pero confirmada después de la foto anterior.
+        late = self.create_member(curp="SNAP010101HDFRRN32")
+        Member.objects.filter(pk=late.pk).update(updated_at=watermark - timedelta(seconds=30))
+        deleted.delete()
+        call_command('snapshot_crm', str(self.output_dir), '--incremental', '--overlap', '60', stdout=StringIO())
+
+        self.assertIn(late.pk, set(self.read_table('members')['id']))
+        live_ids = set(pd.read_parquet(self.output_dir / '_live_ids' / 'members.parquet')['id'])
+        self.assertEqual(live_ids, {kept.pk, late.pk})
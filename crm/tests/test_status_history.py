@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from crm import history
+from crm.models import AccessStatus, Member, MemberAccessLog
+
+
+class StatusHistoryTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.active = AccessStatus.objects.get(name="Activo")
+        cls.inactive = AccessStatus.objects.get(name="Inactivo")
+        cls.start = timezone.make_aware(datetime(2025, 1, 1, 12, 0))
+
+    def create_member(self, **kwargs):
+        defaults = {
+            "member_code": uuid.uuid4(),
+            "name": "Juan Pérez",
+            "curp": "JUAP010101HDFRRN09",
+            "birth_date": "1985-01-01",
+            "gender": "M",
+            "phone_number": "+521234567890",
+            "email": "juan.perez@example.com",
+            "photo": None,
+            "how_did_you_hear": None,
+        }
+        defaults.update(kwargs)
+        member = Member.objects.create(**defaults)
+        member.statuses.update(date_changed=self.start)
+        return member
+
+    def log(self, member, status, days):
+        """Crea un log con fecha controlada (date_changed usa auto_now_add)."""
+        entry = MemberAccessLog.objects.create(member=member, status=status, reason="Cambio")
+        MemberAccessLog.objects.filter(pk=entry.pk).update(date_changed=self.start + timedelta(days=days))
+
+    def test_headcount_with_and_without_snapshots(self):
+        """Verifica que el resultado sea el mismo usando solo el log o una foto más la cola del log."""
+        first = self.create_member(curp="HIST010101HDFRRN10")
+        second = self.create_member(curp="HIST010101HDFRRN11")
+        self.log(first, self.inactive, days=10)
+        self.log(second, self.inactive, days=20)
+        self.log(first, self.active, days=30)
+
+        moments = [self.start - timedelta(days=1), self.start + timedelta(days=15),
+                   self.start + timedelta(days=25), self.start + timedelta(days=35)]
+        expected = [history.headcount_as_of(moment) for moment in moments]
+        self.assertEqual(expected[0], {})
+        self.assertEqual(expected[1], {self.active.pk: 1, self.inactive.pk: 1})
+        self.assertEqual(expected[2], {self.inactive.pk: 2})
+
+        snapshot = history.take_snapshot(self.start + timedelta(days=15))
+        self.assertEqual(snapshot.member_count, 2)
+        self.assertEqual([history.headcount_as_of(moment) for moment in moments], expected)
+
+    def test_status_as_of_command(self):
+        member = self.create_member(curp="HIST010101HDFRRN12")
+        self.log(member, self.inactive, days=5)
+
+        out = StringIO()
+        call_command('status_as_of', '2025-01-03', stdout=out)
+        self.assertIn("Activo: 1", out.getvalue())
+
+        out = StringIO()
+        call_command('status_as_of', '2025-01-10', '--status', 'inactive', stdout=out)
+        self.assertIn(str(member.member_code), out.getvalue())
@@ -0,0 +1,49 @@
+import uuid
+from django.test import TestCase, override_settings
+from django.utils import translation
+from crm import statuses
+from crm.models import AccessStatus, Member
+
+
+class StatusRegistryTestCase(TestCase):
+    def create_member(self, **kwargs):
+        defaults = {
+            "member_code": uuid.uuid4(),
+            "name": "Juan Pérez",
+            "curp": "JUAP010101HDFRRN09",
+            "birth_date": "1985-01-01",
+            "gender": "M",
+            "phone_number": "+521234567890",
+            "email": "juan.perez@example.com",
+            "photo": None,
+            "how_did_you_hear": None,
+        }
+        defaults.update(kwargs)
+        return Member.objects.create(**defaults)
+
+    def test_default_statuses_have_codes(self):
+        self.assertEqual(AccessStatus.objects.get(code=statuses.ACTIVE).pk, statuses.status_id(statuses.ACTIVE))
+        self.assertEqual(AccessStatus.objects.get(code=statuses.INACTIVE).pk, statuses.status_id(statuses.INACTIVE))
+
+    @override_settings(LANGUAGE_CODE='en')
+    def test_new_member_is_active_in_any_language(self):
+        """Verifica que el estado inicial no dependa del idioma activo."""
+        with translation.override('en'):
+            member = self.create_member(curp="STAT010101HDFRRN10")
+        self.assertEqual(member.current_status.code, statuses.ACTIVE)
+
+    def test_registry_is_loaded_once_and_cleared_on_changes(self):
+        # El rollback de la prueba no envía señales; se limpia el registro al terminar.
+        self.addCleanup(statuses.clear_cache)
+        statuses.status_id(statuses.ACTIVE)
+        with self.assertNumQueries(0):
+            statuses.status_id(statuses.ACTIVE)
+
+        renamed = AccessStatus.objects.get(code=statuses.ACTIVE)
+        renamed.delete()
+        AccessStatus.objects.create(name="Vigente", code=statuses.ACTIVE)
+        self.assertEqual(statuses.status_id(statuses.ACTIVE), AccessStatus.objects.get(name="Vigente").pk)
+
+    def test_unknown_code_raises(self):
+        with self.assertRaises(AccessStatus.DoesNotExist):
+            statuses.status_id("archived")
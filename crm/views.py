@@ -1,3 +1,21 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404
+from django.views.decorators.http import require_safe
 
-# Create your views here.
+from AcademyCore2.media import serve_file
+from preregistration.models import Preregister
+from .models import Member
+
+
+@require_safe
+@staff_member_required
+def person_photo(request, name):
+    """Delivers a member or preregister photo to staff users allowed to view its owner."""
+    # Solo se entregan archivos registrados en la base de datos, nunca rutas arbitrarias.
+    for model, permission in ((Member, 'crm.view_member'), (Preregister, 'preregistration.view_preregister')):
+        if not request.user.has_perm(permission):
+            continue
+        owner = model.objects.filter(photo=name).only('photo').first()
+        if owner is not None:
+            return serve_file(request, owner.photo)
+    raise Http404("Photo not found.")
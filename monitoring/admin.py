@@ -0,0 +1,73 @@
+from django.contrib import admin
+from django.db.models import F
+from django.utils.html import format_html
+from django.utils.translation import gettext_lazy as _
+
+from .models import EndpointQueryStats, RequestProfile
+
+
+@admin.register(EndpointQueryStats)
+class EndpointQueryStatsAdmin(admin.ModelAdmin):
+    """Read-only list of the endpoints with the most SQL work, filled by SQLInstrumentationMiddleware."""
+    list_display = (
+        'endpoint', 'method', 'requests', 'avg_queries', 'max_queries', 'avg_sql_ms', 'max_sql_ms',
+        'n_plus_one_requests', 'last_seen',
+    )
+    list_filter = ('method',)
+    search_fields = ('endpoint',)
+    ordering = ('-total_sql_ms',)
+    readonly_fields = [field.name for field in EndpointQueryStats._meta.fields]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            avg_queries_value=F('total_queries') * 1.0 / F('requests'),
+            avg_sql_ms_value=F('total_sql_ms') / F('requests'),
+        )
+
+    @admin.display(description=_("avg queries"), ordering='avg_queries_value')
+    def avg_queries(self, obj):
+        return round(obj.avg_queries_value, 1)
+
+    @admin.display(description=_("avg SQL time (ms)"), ordering='avg_sql_ms_value')
+    def avg_sql_ms(self, obj):
+        return round(obj.avg_sql_ms_value, 1)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Profiles taken with ?_profile=1 or the X-Profile header (see monitoring.profiling)."""
+    list_display = (
+        'created_at', 'method', 'path', 'status_code', 'duration_ms', 'sql_count', 'sql_ms', 'template_ms', 'user',
+    )
+    list_filter = ('method', 'status_code')
+    search_fields = ('path', 'view_name')
+    fields = (
+        'created_at', 'user', 'method', 'path', 'view_name', 'status_code', 'duration_ms', 'sql_count', 'sql_ms',
+        'template_ms', 'call_tree_display', 'sql_timeline_display', 'top_functions_display',
+    )
+    readonly_fields = fields
+
+    @admin.display(description=_("call tree"))
+    def call_tree_display(self, obj):
+        return format_html('<pre style="overflow:auto">{}</pre>', obj.call_tree)
+
+    @admin.display(description=_("SQL timeline"))
+    def sql_timeline_display(self, obj):
+        lines = (f"{entry['start_ms']:>10.1f} ms  +{entry['ms']:.1f} ms  {entry['sql']}" for entry in obj.sql_timeline)
+        return format_html('<pre style="overflow:auto">{}</pre>', "\n".join(lines))
+
+    @admin.display(description=_("top functions"))
+    def top_functions_display(self, obj):
+        return format_html('<pre style="overflow:auto">{}</pre>', obj.top_functions)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
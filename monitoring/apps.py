@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+    verbose_name = _("Monitoring")
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+        from .sql import install_hook
+
+        connection_created.connect(install_hook)
+        for connection in connections.all(initialized_only=True):
+            install_hook(connection=connection)
@@ -0,0 +1,147 @@
+"""Instrumentation options for management commands.
+
+`InstrumentedCommandMixin` adds three options to a command:
+
+- ``--profile FILE`` runs the command under cProfile and writes the pstats
+  file (``python -m pstats FILE``, or snakeviz);
+- ``--trace-memory [N]`` traces allocations with tracemalloc and reports the
+  peak and the N lines holding the most memory at the end of the phase that
+  left the most allocated (default 10);
+- ``--stats`` reports the wall time, rows, rows/s and queries of each phase
+  and of the whole command.
+
+Commands mark their phases with ``with self.phase('read CSV') as phase:`` and
+set ``phase.rows`` when the phase processes rows. The reports go to stderr,
+so the output of the command itself is unchanged.
+"""
+import cProfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from .sql import count_queries
+
+MEMORY_FRAMES = 10
+
+
+class Phase:
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        if self.rows is None or not self.seconds:
+            return None
+        return self.rows / self.seconds
+
+
+@contextmanager
+def measure(name):
+    """Measures the wall time and queries of the block in a new Phase."""
+    phase = Phase(name)
+    start = time.perf_counter()
+    with count_queries() as counter:
+        try:
+            yield phase
+        finally:
+            phase.seconds = time.perf_counter() - start
+            phase.queries = counter.count
+            phase.sql_seconds = counter.duration
+
+
+def format_phases(phases):
+    lines = [f"{'Phase':<24} {'Time':>10} {'Rows':>9} {'Rows/s':>10} {'Queries':>9} {'SQL time':>10}"]
+    for phase in phases:
+        rows = '' if phase.rows is None else str(phase.rows)
+        rate = '' if phase.rows_per_second is None else f"{phase.rows_per_second:.1f}"
+        lines.append(
+            f"{phase.name:<24} {phase.seconds:>9.3f}s {rows:>9} {rate:>10} {phase.queries:>9} {phase.sql_seconds:>9.3f}s"
+        )
+    return lines
+
+
+def format_size(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class InstrumentedCommandMixin:
+    """Adds --profile, --trace-memory and --stats to a BaseCommand subclass."""
+    phases = None  # lista de Phase solo con --stats
+    memory_snapshot = None
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        group = parser.add_argument_group("instrumentation")
+        group.add_argument('--profile', metavar='FILE', help="Run under cProfile and write the pstats file to FILE.")
+        group.add_argument(
+            '--trace-memory', nargs='?', type=int, const=MEMORY_FRAMES, metavar='N',
+            help=f"Report the memory peak and the N lines that allocated the most (default {MEMORY_FRAMES}).",
+        )
+        group.add_argument(
+            '--stats', action='store_true', help="Report wall time, rows/s and queries for each phase.",
+        )
+        return parser
+
+    @contextmanager
+    def phase(self, name):
+        """Measures a phase of the command for --stats; set `rows` on the yielded Phase."""
+        try:
+            with measure(name) as phase:
+                yield phase
+        finally:
+            if self.phases is not None:
+                self.phases.append(phase)
+            if tracemalloc.is_tracing():
+                self.snapshot_memory(name)
+
+    def execute(self, *args, **options):
+        profile_path = options.get('profile')
+        trace_memory = options.get('trace_memory')
+        self.phases = [] if options.get('stats') else None
+        profiler = cProfile.Profile() if profile_path else None
+        self.memory_snapshot = None
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            with measure('total') as total:
+                if profiler:
+                    return profiler.runcall(super().execute, *args, **options)
+                return super().execute(*args, **options)
+        finally:
+            if profiler:
+                profiler.dump_stats(profile_path)
+                self.stderr.write(f"Profile written to {profile_path}.")
+            if trace_memory:
+                self.report_memory(trace_memory)
+            if self.phases is not None:
+                for line in format_phases(self.phases + [total]):
+                    self.stderr.write(line)
+
+    def snapshot_memory(self, name):
+        """Keeps the snapshot taken when the most memory was allocated."""
+        current = tracemalloc.get_traced_memory()[0]
+        if self.memory_snapshot is None or current > self.memory_snapshot[0]:
+            self.memory_snapshot = (current, name, tracemalloc.take_snapshot())
+
+    def report_memory(self, limit):
+        self.snapshot_memory('end')
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size, name, snapshot = self.memory_snapshot
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ])
+        self.stderr.write(f"Memory: peak {format_size(peak)}, still allocated at exit {format_size(current)}.")
+        self.stderr.write(f"Largest allocations after '{name}' ({format_size(size)} allocated):")
+        for stat in snapshot.statistics('lineno')[:limit]:
+            frame = stat.traceback[0]
+            self.stderr.write(f"{format_size(stat.size):>12} {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
@@ -0,0 +1,151 @@
+"""Application metrics in the Prometheus text format (``/metrics``).
+
+With PROMETHEUS_MULTIPROC_DIR set (see settings), every process of the
+server, and every management command run with the same environment, writes
+its samples to files in that directory, and the ``/metrics`` view
+(`monitoring.views.metrics`) aggregates them all. The directory must be emptied when the server starts. Without it, each
+process only reports its own samples.
+
+The rest of the code reports through the helpers below instead of using the
+metric objects directly.
+"""
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+from AcademyCore2.db.pool import pool_stats
+
+REQUEST_LATENCY = Histogram(
+    'academy_request_duration_seconds', "Request latency by URL name.", ['view', 'method'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_QUERIES = Histogram(
+    'academy_request_db_queries', "Database queries per request by URL name.", ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+DB_QUERIES = Counter('academy_db_queries', "Database queries run while serving requests.", ['view'])
+BATCH_ROWS = Counter('academy_batch_rows', "Rows processed by imports and conversions.", ['operation', 'result'])
+BATCH_SECONDS = Counter('academy_batch_duration_seconds', "Time spent in imports and conversions.", ['operation'])
+BATCH_THROUGHPUT = Gauge(
+    'academy_batch_last_rows_per_second', "Throughput of the last import or conversion.", ['operation'],
+    multiprocess_mode='mostrecent',
+)
+PHOTO_UPLOAD_BYTES = Histogram(
+    'academy_photo_upload_bytes',
+    "Size of the photos saved with preregistrations, posted with the form or through a PhotoUpload.", ['source'],
+    buckets=(64 * 1024, 256 * 1024, 512 * 1024, 1024 ** 2, 2 * 1024 ** 2, 4 * 1024 ** 2, 8 * 1024 ** 2, 16 * 1024 ** 2),
+)
+CACHE_LOOKUPS = Counter('academy_cache_lookups', "Cache lookups by cache alias and result.", ['cache', 'result'])
+ADMISSION_REJECTIONS = Counter(
+    'academy_admission_rejections', "Preregistration requests refused by admission control.", ['reason'],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    'academy_admission_in_flight', "Preregistration requests being processed.", multiprocess_mode='livesum',
+)
+# Pools de conexiones (AcademyCore2/db/pool.py): cada proceso publica los valores de sus pools y
+# /metrics suma los de los procesos vivos. Los contadores son acumulados desde que arrancó el proceso.
+POOL_CONNECTIONS = Gauge(
+    'academy_db_pool_connections', "Pooled database connections by state.", ['database', 'state'],
+    multiprocess_mode='livesum',
+)
+POOL_MAX_SIZE = Gauge(
+    'academy_db_pool_max_size', "Maximum connections of the pools.", ['database'], multiprocess_mode='livesum',
+)
+POOL_EVENTS = Gauge(
+    'academy_db_pool_events', "Pool events since the process started (acquired, waits, timeouts, ...).",
+    ['database', 'event'], multiprocess_mode='livesum',
+)
+POOL_WAIT_SECONDS = Gauge(
+    'academy_db_pool_wait_seconds', "Time spent waiting for a pooled connection since the process started.",
+    ['database'], multiprocess_mode='livesum',
+)
+POOL_WAIT_MAX = Gauge(
+    'academy_db_pool_wait_seconds_max', "Longest wait for a pooled connection.", ['database'],
+    multiprocess_mode='max',
+)
+POOL_EVENT_NAMES = ('created', 'closed', 'acquired', 'waits', 'timeouts', 'failed_checks')
+
+
+class PendingPreregistrationsCollector:
+    """Reports the preregistrations waiting for staff review (the approval queue) when scraped."""
+    name = 'academy_preregistrations_pending'
+    documentation = "Preregistrations waiting to be approved or canceled."
+
+    def describe(self):
+        # Sin describe(), registrarlo ejecutaría collect() y con ello una consulta.
+        yield GaugeMetricFamily(self.name, self.documentation)
+
+    def collect(self):
+        from preregistration.models import Preregister
+
+        gauge = GaugeMetricFamily(self.name, self.documentation)
+        gauge.add_metric([], Preregister.objects.filter(approval_status='PENDING').count())
+        yield gauge
+
+
+def observe_request(view, method, seconds, queries):
+    REQUEST_LATENCY.labels(view, method).observe(seconds)
+    REQUEST_QUERIES.labels(view).observe(queries)
+    DB_QUERIES.labels(view).inc(queries)
+
+
+@contextmanager
+def track_batch(operation):
+    """Times a batch; the block fills the yielded dict with row counts by result (e.g. created, errors)."""
+    rows = {}
+    start = time.perf_counter()
+    try:
+        yield rows
+    finally:
+        seconds = time.perf_counter() - start
+        total = 0
+        for result, count in rows.items():
+            BATCH_ROWS.labels(operation, result).inc(count)
+            total += count
+        BATCH_SECONDS.labels(operation).inc(seconds)
+        if seconds > 0:
+            BATCH_THROUGHPUT.labels(operation).set(total / seconds)
+
+
+def publish_pool_stats():
+    """Copies the stats of this process's connection pools into the pool gauges."""
+    for database, stats in pool_stats().items():
+        POOL_CONNECTIONS.labels(database, 'in_use').set(stats['in_use'])
+        POOL_CONNECTIONS.labels(database, 'idle').set(stats['idle'])
+        POOL_MAX_SIZE.labels(database).set(stats['max_size'])
+        for event in POOL_EVENT_NAMES:
+            POOL_EVENTS.labels(database, event).set(stats[event])
+        POOL_WAIT_SECONDS.labels(database).set(stats['wait_seconds_total'])
+        POOL_WAIT_MAX.labels(database).set(stats['wait_seconds_max'])
+
+
+def observe_photo_upload(source, size):
+    PHOTO_UPLOAD_BYTES.labels(source).observe(size)
+
+
+def count_cache_lookups(cache, hits=0, misses=0):
+    if hits:
+        CACHE_LOOKUPS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, 'miss').inc(misses)
+
+
+def count_admission_rejection(reason):
+    ADMISSION_REJECTIONS.labels(reason).inc()
+
+
+
+REGISTRY.register(PendingPreregistrationsCollector())
+
+
+def registry():
+    """Returns the registry to expose: the samples of every process in multiprocess mode, else this process's."""
+    if not settings.PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(PendingPreregistrationsCollector())
+    return registry
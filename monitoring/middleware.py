@@ -0,0 +1,150 @@
+"""Opt-in per-request SQL instrumentation (SQL_INSTRUMENTATION setting).
+
+For each request it records the query count, the total SQL time, the slowest
+statements and the repeated query shapes (see `monitoring.sql`). The summary
+is sent three ways:
+
+- a JSON log line on the ``monitoring.sql`` logger (WARNING when an N+1 was found);
+- ``X-SQL-Queries``, ``X-SQL-Time`` and ``X-SQL-N-Plus-One`` headers, for staff users or under DEBUG;
+- `EndpointQueryStats`, which the admin lists by total SQL time. The totals
+  are added up in memory per process and written every
+  SQL_INSTRUMENTATION_FLUSH_INTERVAL seconds, so hot endpoints don't queue
+  behind the lock of their stats row. Up to one interval per process is lost
+  when a worker stops.
+
+`MetricsMiddleware` (always on) feeds the latency and query count histograms
+of `monitoring.metrics` and refreshes the connection pool gauges.
+"""
+import json
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .metrics import observe_request, publish_pool_stats
+from .models import EndpointQueryStats
+from .sql import count_queries, record_queries
+
+logger = logging.getLogger('monitoring.sql')
+
+
+class EndpointStatsBuffer:
+    """Per-process totals of the instrumented requests, by (endpoint, method), until they're flushed."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.flushed_at = time.monotonic()
+
+    def add(self, endpoint, method, summary):
+        with self.lock:
+            totals = self.totals.setdefault((endpoint, method), {
+                'requests': 0, 'total_queries': 0, 'max_queries': 0, 'total_sql_ms': 0.0, 'max_sql_ms': 0.0,
+                'n_plus_one_requests': 0, 'last_n_plus_one': '', 'slowest_query': '', 'slowest_query_ms': 0.0,
+            })
+            totals['requests'] += 1
+            totals['total_queries'] += summary['queries']
+            totals['max_queries'] = max(totals['max_queries'], summary['queries'])
+            totals['total_sql_ms'] += summary['sql_ms']
+            totals['max_sql_ms'] = max(totals['max_sql_ms'], summary['sql_ms'])
+            if summary['n_plus_one']:
+                totals['n_plus_one_requests'] += 1
+                totals['last_n_plus_one'] = json.dumps(summary['n_plus_one'], indent=2)
+            if summary['slowest'] and summary['slowest'][0]['ms'] > totals['slowest_query_ms']:
+                totals['slowest_query'] = summary['slowest'][0]['sql']
+                totals['slowest_query_ms'] = summary['slowest'][0]['ms']
+
+    def take_due(self, interval):
+        """Returns the buffered totals and empties the buffer when `interval` seconds have passed, else {}."""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.flushed_at < interval or not self.totals:
+                return {}
+            self.flushed_at = now
+            totals, self.totals = self.totals, {}
+        return totals
+
+    def flush(self, interval=0):
+        for (endpoint, method), totals in self.take_due(interval).items():
+            EndpointQueryStats.record(endpoint, method, totals)
+
+
+endpoint_stats = EndpointStatsBuffer()
+
+
+def view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else '<unresolved>'
+
+
+class SQLInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = {
+            'slow_count': getattr(settings, 'SQL_INSTRUMENTATION_SLOW_COUNT', 5),
+            'repeat_threshold': getattr(settings, 'SQL_INSTRUMENTATION_N_PLUS_ONE', 5),
+        }
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries(**self.options) as recorder:
+            response = self.get_response(request)
+        self.report(request, response, recorder)
+        return response
+
+    async def __acall__(self, request):
+        with record_queries(**self.options) as recorder:
+            response = await self.get_response(request)
+        await sync_to_async(self.report)(request, response, recorder)
+        return response
+
+    def report(self, request, response, recorder):
+        endpoint = view_name(request)
+        summary = recorder.summary()
+        logger.log(
+            logging.WARNING if summary['n_plus_one'] else logging.INFO,
+            json.dumps({'endpoint': endpoint, 'method': request.method, 'status': response.status_code, **summary}),
+        )
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['X-SQL-Queries'] = str(summary['queries'])
+            response['X-SQL-Time'] = f"{summary['sql_ms']}ms"
+            response['X-SQL-N-Plus-One'] = str(len(summary['n_plus_one']))
+        endpoint_stats.add(endpoint, request.method, summary)
+        endpoint_stats.flush(getattr(settings, 'SQL_INSTRUMENTATION_FLUSH_INTERVAL', 30))
+
+
+class MetricsMiddleware:
+    """Observes the latency and query count of every request, labelled by URL name."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with count_queries() as counter:
+            response = self.get_response(request)
+        observe_request(view_name(request), request.method, time.perf_counter() - start, counter.count)
+        publish_pool_stats()
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with count_queries() as counter:
+            response = await self.get_response(request)
+        observe_request(view_name(request), request.method, time.perf_counter() - start, counter.count)
+        publish_pool_stats()
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EndpointQueryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=255, verbose_name='endpoint')),
+                ('method', models.CharField(max_length=10, verbose_name='method')),
+                ('requests', models.PositiveIntegerField(default=0, verbose_name='requests')),
+                ('total_queries', models.PositiveBigIntegerField(default=0, verbose_name='total queries')),
+                ('max_queries', models.PositiveIntegerField(default=0, verbose_name='max queries')),
+                ('total_sql_ms', models.FloatField(default=0, verbose_name='total SQL time (ms)')),
+                ('max_sql_ms', models.FloatField(default=0, verbose_name='max SQL time (ms)')),
+                ('n_plus_one_requests', models.PositiveIntegerField(default=0, verbose_name='requests with N+1')),
+                ('last_n_plus_one', models.TextField(blank=True, verbose_name='last N+1 queries')),
+                ('slowest_query', models.TextField(blank=True, verbose_name='slowest query')),
+                ('slowest_query_ms', models.FloatField(default=0, verbose_name='slowest query time (ms)')),
+                ('last_seen', models.DateTimeField(auto_now=True, verbose_name='last seen')),
+            ],
+            options={
+                'verbose_name': 'Endpoint query stats',
+                'verbose_name_plural': 'Endpoint query stats',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='endpointquerystats',
+            constraint=models.UniqueConstraint(fields=('endpoint', 'method'), name='monitoring_endpoint_method_uniq'),
+        ),
+    ]
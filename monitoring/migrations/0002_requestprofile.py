@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('method', models.CharField(max_length=10, verbose_name='method')),
+                ('path', models.CharField(max_length=2048, verbose_name='path')),
+                ('view_name', models.CharField(blank=True, max_length=255, verbose_name='view')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='status code')),
+                ('duration_ms', models.FloatField(verbose_name='duration (ms)')),
+                ('sql_count', models.PositiveIntegerField(verbose_name='queries')),
+                ('sql_ms', models.FloatField(verbose_name='SQL time (ms)')),
+                ('template_ms', models.FloatField(verbose_name='template render time (ms)')),
+                ('call_tree', models.TextField(verbose_name='call tree')),
+                ('top_functions', models.TextField(verbose_name='top functions')),
+                ('sql_timeline', models.JSONField(default=list, verbose_name='SQL timeline')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'Request profile',
+                'verbose_name_plural': 'Request profiles',
+                'ordering': ['-created_at'],
+                'permissions': [('profile_requests', 'Can profile requests')],
+            },
+        ),
+    ]
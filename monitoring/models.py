@@ -0,0 +1,84 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.translation import gettext_lazy as _
+
+
+class EndpointQueryStats(models.Model):
+    """SQL usage accumulated per endpoint by `SQLInstrumentationMiddleware`."""
+    endpoint = models.CharField(max_length=255, verbose_name=_("endpoint"))
+    method = models.CharField(max_length=10, verbose_name=_("method"))
+    requests = models.PositiveIntegerField(default=0, verbose_name=_("requests"))
+    total_queries = models.PositiveBigIntegerField(default=0, verbose_name=_("total queries"))
+    max_queries = models.PositiveIntegerField(default=0, verbose_name=_("max queries"))
+    total_sql_ms = models.FloatField(default=0, verbose_name=_("total SQL time (ms)"))
+    max_sql_ms = models.FloatField(default=0, verbose_name=_("max SQL time (ms)"))
+    n_plus_one_requests = models.PositiveIntegerField(default=0, verbose_name=_("requests with N+1"))
+    last_n_plus_one = models.TextField(blank=True, verbose_name=_("last N+1 queries"))
+    slowest_query = models.TextField(blank=True, verbose_name=_("slowest query"))
+    slowest_query_ms = models.FloatField(default=0, verbose_name=_("slowest query time (ms)"))
+    last_seen = models.DateTimeField(auto_now=True, verbose_name=_("last seen"))
+
+    class Meta:
+        verbose_name = _("Endpoint query stats")
+        verbose_name_plural = _("Endpoint query stats")
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'method'], name='monitoring_endpoint_method_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.endpoint}"
+
+    @classmethod
+    def record(cls, endpoint, method, totals):
+        """Adds the totals buffered for an endpoint (see `EndpointStatsBuffer`) to its row."""
+        changes = {
+            'requests': F('requests') + totals['requests'],
+            'total_queries': F('total_queries') + totals['total_queries'],
+            'max_queries': Greatest('max_queries', totals['max_queries']),
+            'total_sql_ms': F('total_sql_ms') + totals['total_sql_ms'],
+            'max_sql_ms': Greatest('max_sql_ms', totals['max_sql_ms']),
+        }
+        if totals['n_plus_one_requests']:
+            changes['n_plus_one_requests'] = F('n_plus_one_requests') + totals['n_plus_one_requests']
+            changes['last_n_plus_one'] = totals['last_n_plus_one']
+        rows = cls.objects.filter(endpoint=endpoint[:255], method=method)
+        if not rows.update(**changes):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(endpoint=endpoint[:255], method=method)
+            except IntegrityError:
+                pass  # Otro proceso creó la fila al mismo tiempo
+            rows.update(**changes)
+        if totals['slowest_query']:
+            rows.filter(slowest_query_ms__lt=totals['slowest_query_ms']).update(
+                slowest_query=totals['slowest_query'], slowest_query_ms=totals['slowest_query_ms']
+            )
+
+
+class RequestProfile(models.Model):
+    """Profile of a single request taken on demand by `ProfilingMiddleware`."""
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("created at"))
+    user = models.ForeignKey(
+        'auth.User', on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("user")
+    )
+    method = models.CharField(max_length=10, verbose_name=_("method"))
+    path = models.CharField(max_length=2048, verbose_name=_("path"))
+    view_name = models.CharField(max_length=255, blank=True, verbose_name=_("view"))
+    status_code = models.PositiveSmallIntegerField(verbose_name=_("status code"))
+    duration_ms = models.FloatField(verbose_name=_("duration (ms)"))
+    sql_count = models.PositiveIntegerField(verbose_name=_("queries"))
+    sql_ms = models.FloatField(verbose_name=_("SQL time (ms)"))
+    template_ms = models.FloatField(verbose_name=_("template render time (ms)"))
+    call_tree = models.TextField(verbose_name=_("call tree"))
+    top_functions = models.TextField(verbose_name=_("top functions"))
+    sql_timeline = models.JSONField(default=list, verbose_name=_("SQL timeline"))
+
+    class Meta:
+        verbose_name = _("Request profile")
+        verbose_name_plural = _("Request profiles")
+        ordering = ['-created_at']
+        permissions = [('profile_requests', _("Can profile requests"))]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.created_at:%Y-%m-%d %H:%M:%S})"
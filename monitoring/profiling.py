@@ -0,0 +1,202 @@
+"""On-demand profiling of single requests.
+
+A user with the ``monitoring.profile_requests`` permission adds ``?_profile=1``
+to a URL, or sends the ``X-Profile: 1`` header, and that request runs under
+`TreeProfiler` with its queries recorded. The resulting `RequestProfile` holds the
+call tree, the functions with the most cumulative time, the SQL timeline and
+the template render time. It can be viewed in the admin, and the response
+links to it in ``X-Profile-URL``.
+
+Requests without the switch only pay two dictionary lookups.
+
+Under ASGI, the profiled part of the request runs in a worker thread. Django
+sends the sync code of the request (sync views, ORM calls, template
+rendering) to that same thread, so the profiler sees it. Code that runs on the
+event loop itself is not profiled.
+"""
+import os
+import sys
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.template.base import Template
+from django.urls import reverse
+
+from .models import RequestProfile
+from .sql import record_queries
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PERMISSION = 'monitoring.profile_requests'
+
+TREE_MIN_FRACTION = 0.005  # Se omiten las ramas con menos del 0.5 % del tiempo total
+TREE_MAX_DEPTH = 60
+TOP_FUNCTIONS = 60
+
+
+class CallNode:
+    __slots__ = ('key', 'calls', 'total', 'started', 'children')
+
+    def __init__(self, key):
+        self.key = key
+        self.calls = 0
+        self.total = 0.0
+        self.started = 0.0
+        self.children = {}
+
+
+class TreeProfiler:
+    """Deterministic profiler that keeps the real call tree (``sys.setprofile``) of the current thread.
+
+    cProfile only keeps caller/callee pairs, which can't tell the middleware
+    chain apart (every layer goes through the same function). This builds one
+    node per call path instead. It makes the profiled request several times
+    slower.
+    """
+    def __init__(self):
+        self.root = CallNode(None)
+        self.stack = [self.root]
+
+    def __call__(self, frame, event, arg):
+        if event == 'call':
+            code = frame.f_code
+            self.push((code.co_filename, code.co_firstlineno, code.co_name))
+        elif event == 'c_call':
+            self.push(('~', 0, getattr(arg, '__qualname__', None) or repr(arg)))
+        elif len(self.stack) > 1:  # return, c_return, c_exception
+            node = self.stack.pop()
+            node.total += time.perf_counter() - node.started
+
+    def push(self, key):
+        children = self.stack[-1].children
+        node = children.get(key)
+        if node is None:
+            node = children[key] = CallNode(key)
+        node.calls += 1
+        self.stack.append(node)
+        node.started = time.perf_counter()
+
+    def run(self, function, *args):
+        sys.setprofile(self)
+        try:
+            return function(*args)
+        finally:
+            sys.setprofile(None)
+            self.root.total = sum(child.total for child in self.root.children.values())
+
+    def outermost(self):
+        """Yields (node, nested) for every node; `nested` is True when an ancestor has the same function."""
+        pending = [(child, frozenset()) for child in self.root.children.values()]
+        while pending:
+            node, ancestors = pending.pop()
+            yield node, node.key in ancestors
+            inner = ancestors | {node.key}
+            pending.extend((child, inner) for child in node.children.values())
+
+    def tree(self):
+        """Renders the call tree with cumulative times, pruning branches below TREE_MIN_FRACTION."""
+        minimum = self.root.total * TREE_MIN_FRACTION
+        lines = []
+        pending = [(child, 0) for child in sorted(self.root.children.values(), key=lambda node: node.total)]
+        while pending:
+            node, depth = pending.pop()
+            if node.total < minimum:
+                continue
+            lines.append(f"{node.total * 1000:10.1f} ms {node.calls:>7}  {'  ' * depth}{function_label(node.key)}")
+            if depth < TREE_MAX_DEPTH:
+                children = sorted(node.children.values(), key=lambda child: child.total)
+                pending.extend((child, depth + 1) for child in children)
+        return "\n".join(lines)
+
+    def top_functions(self):
+        """Renders the functions with the most cumulative time, with their own (self) time."""
+        functions = {}
+        for node, nested in self.outermost():
+            calls, cumulative, own = functions.get(node.key, (0, 0.0, 0.0))
+            own += node.total - sum(child.total for child in node.children.values())
+            functions[node.key] = (calls + node.calls, cumulative + (0 if nested else node.total), own)
+        lines = [f"{'cumulative':>12} {'self':>10} {'calls':>8}  function"]
+        ranked = sorted(functions.items(), key=lambda item: -item[1][1])[:TOP_FUNCTIONS]
+        for key, (calls, cumulative, own) in ranked:
+            lines.append(f"{cumulative * 1000:9.1f} ms {own * 1000:7.1f} ms {calls:>8}  {function_label(key)}")
+        return "\n".join(lines)
+
+    def time_in(self, function):
+        """Returns the seconds spent in `function`, counting nested calls once."""
+        code = function.__code__
+        key = (code.co_filename, code.co_firstlineno, code.co_name)
+        return sum(node.total for node, nested in self.outermost() if node.key == key and not nested)
+
+
+def function_label(key):
+    filename, lineno, name = key
+    if filename == '~':
+        return name  # Función integrada
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base) and 'site-packages' not in filename:
+        filename = filename[len(base):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f"{filename}:{lineno}({name})"
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def triggered(self, request):
+        """Returns whether the request asks to be profiled, removing the query parameter from it."""
+        if PROFILE_PARAM not in request.GET:
+            return PROFILE_HEADER in request.META
+        # El parámetro no debe llegar a la vista aunque el usuario no pueda perfilar (el admin lo trataría como un filtro).
+        request.GET = request.GET.copy()
+        del request.GET[PROFILE_PARAM]
+        request.META['QUERY_STRING'] = request.GET.urlencode()
+        return True
+
+    def allowed(self, request):
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_active and user.has_perm(PERMISSION)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not (self.triggered(request) and self.allowed(request)):
+            return self.get_response(request)
+        return self.profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not (self.triggered(request) and await sync_to_async(self.allowed)(request)):
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(request, async_to_sync(self.get_response))
+
+    def profile(self, request, get_response):
+        profiler = TreeProfiler()
+        with record_queries(keep_timeline=True) as recorder:
+            start = time.perf_counter()
+            response = profiler.run(get_response, request)
+            duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        profile = RequestProfile.objects.create(
+            user=request.user,
+            method=request.method,
+            path=request.get_full_path()[:2048],
+            view_name=match.view_name if match else '',
+            status_code=response.status_code,
+            duration_ms=round(duration * 1000, 2),
+            sql_count=recorder.count,
+            sql_ms=round(recorder.duration * 1000, 2),
+            template_ms=round(profiler.time_in(Template.render) * 1000, 2),
+            call_tree=profiler.tree(),
+            top_functions=profiler.top_functions(),
+            sql_timeline=recorder.sql_timeline(),
+        )
+        response['X-Profile-URL'] = reverse('admin:monitoring_requestprofile_change', args=[profile.pk])
+        return response
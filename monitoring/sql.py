@@ -0,0 +1,170 @@
+"""Per-request SQL recording.
+
+Every database connection gets `execute_hook` as an execute wrapper when it is
+created. The hook does nothing unless a recorder is active in the current
+context (`record_queries`, or `count_queries` for just the count and time).
+Recordings can be nested; every active recorder sees each query. The context
+variable follows the request into ``sync_to_async`` threads, so the queries of
+async views are recorded as well.
+
+A recorder counts the queries and their total time and keeps the slowest
+statements. It also counts queries by shape: the SQL with literals and
+``IN (...)`` lists collapsed. A shape seen `repeat_threshold` times in one
+request is reported as a probable N+1, attributed to the innermost project
+frame that issued it.
+"""
+import heapq
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+current_recorders = ContextVar('monitoring_sql_recorders', default=())
+
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+\b')
+
+MAX_SQL_LENGTH = 1000
+
+# Archivos de la instrumentación que no cuentan como origen de una consulta
+INTERNAL_FILES = {
+    os.path.join(os.path.dirname(__file__), name) for name in ('sql.py', 'middleware.py', 'models.py')
+}
+
+
+def query_shape(sql):
+    """Returns `sql` with parameter lists and literals collapsed, so repeated queries compare equal."""
+    sql = IN_LIST.sub('(...)', sql)
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    return ' '.join(sql.split())
+
+
+def caller():
+    """Returns 'file:line in function' for the innermost project frame outside the instrumentation, or None."""
+    base = str(settings.BASE_DIR) + os.sep
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and filename not in INTERNAL_FILES and 'site-packages' not in filename:
+            return f"{os.path.relpath(filename, base)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryCounter:
+    """Counts the queries and their total time."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.duration = 0.0
+
+    def record(self, sql, duration, start):
+        with self.lock:
+            self.count += 1
+            self.duration += duration
+
+
+class QueryRecorder:
+    MAX_TIMELINE = 1000
+
+    def __init__(self, slow_count=5, repeat_threshold=5, keep_timeline=False):
+        self.slow_count = slow_count
+        self.repeat_threshold = repeat_threshold
+        self.started = time.perf_counter()
+        self.timeline = [] if keep_timeline else None  # (inicio, duración, sql) de cada consulta
+        self.lock = threading.Lock()
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []  # montículo de (duración, número de consulta, sql)
+        self.shapes = Counter()
+        self.repeats = {}  # forma -> origen en el código
+
+    def record(self, sql, duration, start):
+        shape = query_shape(sql)
+        with self.lock:
+            self.count += 1
+            self.duration += duration
+            self.shapes[shape] += 1
+            repeated = self.shapes[shape] == self.repeat_threshold
+            if self.timeline is not None and len(self.timeline) < self.MAX_TIMELINE:
+                self.timeline.append((start, duration, sql))
+            entry = (duration, self.count, sql[:MAX_SQL_LENGTH])
+            if len(self.slowest) < self.slow_count:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+        if repeated:
+            # La pila solo se inspecciona una vez por forma repetida.
+            self.repeats[shape] = caller()
+
+    def slowest_queries(self):
+        return [{'sql': sql, 'ms': round(duration * 1000, 2)} for duration, _, sql in sorted(self.slowest, reverse=True)]
+
+    def sql_timeline(self):
+        """Returns the recorded queries in execution order with their start offset from the recording start."""
+        return [
+            {'start_ms': round((start - self.started) * 1000, 2), 'ms': round(duration * 1000, 2),
+             'sql': sql[:MAX_SQL_LENGTH]}
+            for start, duration, sql in self.timeline or ()
+        ]
+
+    def n_plus_one(self):
+        """Returns the repeated query shapes, most repeated first."""
+        return sorted(
+            ({'shape': shape[:MAX_SQL_LENGTH], 'count': self.shapes[shape], 'caller': location}
+             for shape, location in self.repeats.items()),
+            key=lambda item: -item['count'],
+        )
+
+    def summary(self):
+        return {
+            'queries': self.count,
+            'sql_ms': round(self.duration * 1000, 2),
+            'slowest': self.slowest_queries(),
+            'n_plus_one': self.n_plus_one(),
+        }
+
+
+def execute_hook(execute, sql, params, many, context):
+    recorders = current_recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for recorder in recorders:
+            recorder.record(sql, duration, start)
+
+
+def install_hook(sender=None, connection=None, **kwargs):
+    if execute_hook not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_hook)
+
+
+@contextmanager
+def recording(recorder):
+    token = current_recorders.set(current_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        current_recorders.reset(token)
+
+
+def record_queries(**options):
+    """Records the queries run in this context (and the threads it calls into) with a new QueryRecorder."""
+    return recording(QueryRecorder(**options))
+
+
+def count_queries():
+    """Counts the queries run in this context with a new QueryCounter."""
+    return recording(QueryCounter())
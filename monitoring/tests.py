@@ -0,0 +1,199 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase, modify_settings, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from AcademyCore2.db import pool
+from crm.models import Member
+from monitoring import middleware
+from monitoring.metrics import track_batch
+from monitoring.models import EndpointQueryStats, RequestProfile
+from monitoring.sql import count_queries, query_shape, record_queries
+
+INSTRUMENTED = modify_settings(MIDDLEWARE={'prepend': 'monitoring.middleware.SQLInstrumentationMiddleware'})
+
+
+class QueryRecorderTests(TestCase):
+    def test_query_shape_collapses_literals_and_lists(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'  LIMIT 21"),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+
+    def test_repeated_queries_are_reported_with_their_origin(self):
+        with record_queries(repeat_threshold=3) as recorder:
+            for pk in range(4):
+                Member.objects.filter(pk=pk).exists()
+            User.objects.count()
+        self.assertEqual(recorder.count, 5)
+        [repeated] = recorder.n_plus_one()
+        self.assertEqual(repeated['count'], 4)
+        self.assertIn('monitoring/tests.py', repeated['caller'])
+        self.assertIn('test_repeated_queries_are_reported_with_their_origin', repeated['caller'])
+        self.assertEqual(len(recorder.slowest_queries()), 5)
+
+    def test_queries_outside_a_recording_are_ignored(self):
+        with record_queries() as recorder:
+            pass
+        Member.objects.exists()
+        self.assertEqual(recorder.count, 0)
+
+    def test_nested_recordings_see_every_query(self):
+        with record_queries() as recorder:
+            Member.objects.exists()
+            with count_queries() as counter:
+                Member.objects.exists()
+        self.assertEqual(recorder.count, 2)
+        self.assertEqual(counter.count, 1)
+
+
+@INSTRUMENTED
+class SQLInstrumentationMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+
+    @override_settings(SQL_INSTRUMENTATION_FLUSH_INTERVAL=0)
+    def test_admin_request_is_measured(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('admin:crm_member_changelist'))
+        self.assertGreater(int(response['X-SQL-Queries']), 0)
+        self.assertIn('X-SQL-N-Plus-One', response)
+        stats = EndpointQueryStats.objects.get(endpoint='admin:crm_member_changelist', method='GET')
+        self.assertEqual(stats.requests, 1)
+        self.assertEqual(stats.max_queries, int(response['X-SQL-Queries']))
+
+        self.client.get(reverse('admin:crm_member_changelist'))
+        stats.refresh_from_db()
+        self.assertEqual(stats.requests, 2)
+        response = self.client.get(reverse('admin:monitoring_endpointquerystats_changelist'))
+        self.assertContains(response, 'admin:crm_member_changelist')
+
+    def test_endpoint_stats_are_buffered_until_the_interval_passes(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(middleware, 'endpoint_stats', middleware.EndpointStatsBuffer()) as buffer:
+            self.client.get(reverse('admin:crm_member_changelist'))
+            self.client.get(reverse('admin:crm_member_changelist'))
+            self.assertFalse(EndpointQueryStats.objects.exists())
+            buffer.flush()
+        stats = EndpointQueryStats.objects.get(endpoint='admin:crm_member_changelist', method='GET')
+        self.assertEqual(stats.requests, 2)
+        self.assertGreater(stats.slowest_query_ms, 0)
+
+    @override_settings(DEBUG=True, SQL_INSTRUMENTATION_FLUSH_INTERVAL=0)
+    async def test_queries_of_async_views_are_recorded(self):
+        await cache.aclear()
+        response = await self.async_client.get(reverse('preregister_status'), {'folio': 'PR-X', 'curp': 'X'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['X-SQL-Queries'], '1')
+        stats = await EndpointQueryStats.objects.aget(endpoint='preregister_status')
+        self.assertEqual(stats.total_queries, 1)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        cls.staff = User.objects.create_user(username="staff", password="staffpassword", is_staff=True)
+
+    def test_profile_is_stored_for_permitted_users(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:crm_member_changelist'), {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(response['X-Profile-URL'], reverse('admin:monitoring_requestprofile_change', args=[profile.pk]))
+        self.assertEqual(profile.path, reverse('admin:crm_member_changelist'))
+        self.assertEqual(profile.view_name, 'admin:crm_member_changelist')
+        self.assertEqual(profile.sql_count, len(profile.sql_timeline))
+        self.assertGreater(profile.template_ms, 0)
+        self.assertIn('changelist_view', profile.call_tree)
+
+        response = self.client.get(response['X-Profile-URL'])
+        self.assertContains(response, 'changelist_view')
+
+    def test_switch_is_ignored_without_permission(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin:index'), HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-URL', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_switch_is_removed_from_the_query_without_permission(self):
+        """Sin permiso el parámetro tampoco llega a la vista; el changelist lo trataría como un filtro inválido."""
+        self.staff.user_permissions.add(Permission.objects.get(codename='view_member'))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin:crm_member_changelist'), {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-URL', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    async def test_async_views_are_profiled(self):
+        await sync_to_async(self.async_client.force_login)(self.admin)
+        response = await self.async_client.get(reverse('preregister_create'), headers={'X-Profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        profile = await RequestProfile.objects.aget()
+        self.assertGreater(profile.sql_count, 0)
+        self.assertGreater(profile.template_ms, 0)
+
+
+class MetricsTests(TestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_measured_by_url_name(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client.force_login(admin)
+        labels = {'view': 'admin:crm_member_changelist', 'method': 'GET'}
+        before = self.sample('academy_request_duration_seconds_count', **labels)
+        queries = self.sample('academy_db_queries_total', view='admin:crm_member_changelist')
+
+        self.client.get(reverse('admin:crm_member_changelist'))
+
+        self.assertEqual(self.sample('academy_request_duration_seconds_count', **labels), before + 1)
+        self.assertGreater(self.sample('academy_db_queries_total', view='admin:crm_member_changelist'), queries)
+
+    def test_batches_report_rows_and_throughput(self):
+        before = self.sample('academy_batch_rows_total', operation='test_batch', result='created')
+        with track_batch('test_batch') as rows:
+            rows.update(created=3, errors=1)
+        self.assertEqual(self.sample('academy_batch_rows_total', operation='test_batch', result='created'), before + 3)
+        self.assertGreater(self.sample('academy_batch_last_rows_per_second', operation='test_batch'), 0)
+
+    def test_endpoint_exposes_text_format_to_allowed_addresses(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'academy_preregistrations_pending 0.0', response.content)
+
+        with override_settings(METRICS_ALLOWED_IPS=['10.0.0.1']):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    def test_connection_pools_are_exported(self):
+        connection_pool = pool.get_pool(('metrics_test', 'key'), lambda: pool.ConnectionPool(connect=object, max_size=3))
+        self.addCleanup(pool._pools.pop, ('metrics_test', 'key'))
+        connection_pool.acquire()
+
+        content = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('academy_db_pool_connections{database="metrics_test",state="in_use"} 1.0', content)
+        self.assertIn('academy_db_pool_max_size{database="metrics_test"} 3.0', content)
+        self.assertIn('academy_db_pool_events{database="metrics_test",event="acquired"} 1.0', content)
+
+    @override_settings(IS_PRODUCTION=True)
+    def test_token_is_mandatory_in_production(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    @override_settings(METRICS_TRUSTED_PROXIES=1)
+    def test_client_address_is_resolved_behind_the_proxy(self):
+        response = self.client.get(reverse('metrics'), HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_X_FORWARDED_FOR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from preregistration.middleware import client_ip
+from .metrics import publish_pool_stats, registry
+
+
+def metrics(request):
+    """Exposes the metrics to the scraper holding METRICS_TOKEN.
+
+    Without a token (only allowed outside production) the client address,
+    resolved behind METRICS_TRUSTED_PROXIES, must be in METRICS_ALLOWED_IPS.
+    """
+    if settings.METRICS_TOKEN:
+        allowed = constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {settings.METRICS_TOKEN}")
+    elif settings.IS_PRODUCTION:
+        # Detrás del proxy frontal todas las peticiones llegan desde 127.0.0.1.
+        allowed = False
+    else:
+        ip = client_ip(
+            request.META.get('REMOTE_ADDR'), request.META.get('HTTP_X_FORWARDED_FOR'), settings.METRICS_TRUSTED_PROXIES
+        )
+        allowed = ip in settings.METRICS_ALLOWED_IPS
+    if not allowed:
+        return HttpResponseForbidden()
+    publish_pool_stats()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
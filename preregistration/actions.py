@@ -3,6 +3,8 @@ from django.contrib import messages
 from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 from crm.models import Member, MemberContact
+from monitoring.metrics import track_batch
+from .status import invalidate_status
 
 def cancel_preregisters(modeladmin, request, queryset):
     """Cancela los PreRegister seleccionados."""
@@ -26,25 +28,29 @@ def convert_to_member(modeladmin, request, queryset):
     """Convierte los PreRegister seleccionados en Members."""
     converted_count = 0
     skipped_count = 0
+    error_count = 0
 
     queryset = queryset.select_related('member').prefetch_related('medical_conditions', 'preregisters')
 
-    for preregister in queryset:
-        if not is_member_exists(preregister):
-            try:
-                with transaction.atomic():
-                    new_member = create_member_from_preregister(preregister)
-                    assign_medical_conditions(new_member, preregister)
-                    create_member_contacts(new_member, preregister)
-                    update_preregister_status(preregister, new_member)
-                    cancel_duplicate_preregisters(preregister)
-
-                    converted_count += 1
-
-            except Exception as e:
-                messages.error(request, f"Error al convertir {preregister.name}: {str(e)}")
-        else:
-            skipped_count += 1
+    with track_batch('convert_to_member') as rows:
+        for preregister in queryset:
+            if not is_member_exists(preregister):
+                try:
+                    with transaction.atomic():
+                        new_member = create_member_from_preregister(preregister)
+                        assign_medical_conditions(new_member, preregister)
+                        create_member_contacts(new_member, preregister)
+                        update_preregister_status(preregister, new_member)
+                        cancel_duplicate_preregisters(preregister)
+
+                        converted_count += 1
+
+                except Exception as e:
+                    error_count += 1
+                    messages.error(request, f"Error al convertir {preregister.name}: {str(e)}")
+            else:
+                skipped_count += 1
+        rows.update(converted=converted_count, skipped=skipped_count, errors=error_count)
 
     send_messages(modeladmin, request, converted_count, skipped_count)
 
@@ -98,10 +104,13 @@ def update_preregister_status(preregister, new_member):
 
 def cancel_duplicate_preregisters(preregister):
     """Cancela otros PreRegisters con el mismo CURP y status 'PENDING'."""
-    preregister._meta.model.objects.filter(
+    duplicates = preregister._meta.model.objects.filter(
         curp=preregister.curp,
         approval_status="PENDING"
-    ).exclude(id=preregister.id).update(approval_status="CANCELED")
+    ).exclude(id=preregister.id)
+    # update() no envía post_save, así que la caché de estados se invalida aquí
+    invalidate_status(duplicates.values_list('folio', flat=True))
+    duplicates.update(approval_status="CANCELED")
 
 
 def send_messages(modeladmin, request, converted_count, skipped_count):
@@ -8,7 +8,8 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.safestring import mark_safe
 from django.db.models import Case, When, IntegerField
 from .forms import PreRegisterAdminForm
-from crm.admin import MemberAdmin
+from crm.admin import AgeColumnMixin, AgeRangeFilter, AgeSegmentFilter, MemberAdmin, ReplicaReadsMixin
+from crm.pagination import KeysetPaginationMixin
 
 class PreregisterContactInline(admin.TabularInline):
     model = PreRegisterContact
@@ -16,14 +17,16 @@ class PreregisterContactInline(admin.TabularInline):
     fields = ('name', 'phone_number', 'relation', 'is_primary', 'is_emergency')
 
 @admin.register(Preregister)
-class PreregisterAdmin(admin.ModelAdmin):
+class PreregisterAdmin(ReplicaReadsMixin, AgeColumnMixin, KeysetPaginationMixin, admin.ModelAdmin):
     form = PreRegisterAdminForm
     actions = [convert_to_member, cancel_preregisters]  # Agrega la acción personalizada
     list_display = (
-        'photo_preview', 'folio', 'last_name', 'second_last_name', 'name', 'phone_number', 'approval_status'
+        'photo_preview', 'folio', 'last_name', 'second_last_name', 'name', 'age_years', 'phone_number',
+        'approval_status'
     )
     search_fields = ( 'folio', 'last_name', 'second_last_name', 'name', 'curp', 'email', 'phone_number')
-    list_filter = ('approval_status',)
+    list_filter = ('approval_status', AgeSegmentFilter, AgeRangeFilter)
+    autocomplete_fields = ('member', 'how_did_you_hear')
     ordering = ('folio',)
     readonly_fields = ('folio', 'age', 'age_segment', 'photo_preview', 'approval_status', 'created_at')
     inlines = [PreregisterContactInline]
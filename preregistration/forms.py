@@ -1,8 +1,8 @@
 import re
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import Preregister
-from crm.models import ContactRelation, MedicalCondition
+from .models import PhotoUpload, Preregister
+from crm.models import CURP_PATTERN, PHONE_PATTERN, ContactRelation, MedicalCondition
 from django.utils.translation import gettext_lazy as _
 
 class PreRegisterAdminForm(forms.ModelForm):
@@ -33,6 +33,14 @@ class PreRegisterAdminForm(forms.ModelForm):
 
         return cleaned_data
     
+class PrevalidatedImageField(forms.ImageField):
+    """ImageField that skips Pillow when the upload was already verified (see `verify_photo`)."""
+    def to_python(self, data):
+        if getattr(data, 'image', None) is not None:
+            return forms.FileField.to_python(self, data)
+        return super().to_python(data)
+
+
 class PreRegisterPublicForm(forms.ModelForm):
 
     accept_terms = forms.BooleanField(
@@ -55,16 +63,66 @@ class PreRegisterPublicForm(forms.ModelForm):
     emergency_contact_phone = forms.CharField(max_length=20)
     emergency_contact_relation = forms.ModelChoiceField(queryset=ContactRelation.objects.all())
 
+    # Token firmado de una foto ya recibida (PhotoUpload): subida por fragmentos o guardada
+    # de un envío anterior con errores. Sustituye al archivo en el envío.
+    photo_upload = forms.CharField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Preregister
         fields = [
             'last_name','second_last_name','name', 'curp', 'birth_date', 'gender', 'phone_number', 'email', 'accept_terms',
             'photo', 'how_did_you_hear', 'how_did_you_hear_details', 'medical_condition_details'
         ]
+        field_classes = {'photo': PrevalidatedImageField}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.data.get(self.add_prefix('photo_upload')):
+            self.fields['photo'].required = False
+
+    def verify_photo(self):
+        """Checks the uploaded photo with Pillow; async views call it in a worker thread before is_valid()."""
+        upload = self.files.get(self.add_prefix('photo'))
+        if upload is None:
+            return
+        try:
+            self.fields['photo'].to_python(upload)
+        except ValidationError:
+            pass  # is_valid() vuelve a validarla y reporta el error en el campo
+
+    def stash_photo(self):
+        """Keeps a valid photo posted with an invalid form so the re-rendered form can reuse it."""
+        if self.cleaned_data.get('photo_upload') is not None:
+            self.cleaned_data['photo'].close()  # La foto ya guardada sigue referenciada por su token
+            return None
+        photo = self.files.get(self.add_prefix('photo'))
+        if photo is None or self.has_error('photo'):
+            return None
+        upload = PhotoUpload.stash(photo)
+        self.data = self.data.copy()
+        self.data[self.add_prefix('photo_upload')] = upload.token
+        self.fields['photo'].required = False
+        return upload
+
+    def clean_photo_upload(self):
+        token = self.cleaned_data.get('photo_upload')
+        if not token or self.files.get(self.add_prefix('photo')):
+            return None  # Un archivo nuevo reemplaza a la foto ya recibida
+        upload = PhotoUpload.from_token(token)
+        if upload is None:
+            raise forms.ValidationError(_("The uploaded photo has expired, please select it again."))
+        return upload
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('photo_upload')
+        if upload is not None:
+            cleaned_data['photo'] = upload.open()
+        return cleaned_data
 
     def clean_phone_number(self):
         phone_number = self.cleaned_data.get('phone_number')
-        if not re.match(r'^\d{10,15}$', phone_number):
+        if not re.match(PHONE_PATTERN, phone_number):
             raise forms.ValidationError(
                 _("The phone number must contain only digits and be between 10 and 15 characters long.")
             )
@@ -72,8 +130,7 @@ class PreRegisterPublicForm(forms.ModelForm):
     
     def clean_curp(self):
         curp = self.cleaned_data.get('curp')
-        curp_pattern = r'^[A-Z]{4}\d{6}[HM]{1}[A-Z]{5}[A-Z0-9]{2}$'
-        if not re.match(curp_pattern, curp):
+        if not re.match(CURP_PATTERN, curp):
             raise forms.ValidationError(
                 _("The CURP must follow a valid format.")
             )
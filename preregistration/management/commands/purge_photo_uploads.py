@@ -0,0 +1,34 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from preregistration.models import PhotoUpload, remove_part
+
+
+class Command(BaseCommand):
+    help = "Delete photo uploads older than PHOTO_UPLOAD_MAX_AGE and orphaned chunk files."
+
+    def handle(self, *args, **kwargs):
+        cutoff = timezone.now() - timedelta(seconds=settings.PHOTO_UPLOAD_MAX_AGE)
+        stale = PhotoUpload.objects.filter(created_at__lt=cutoff)
+        paths = [upload.path for upload in stale.only('pk')]
+        deleted, _ = stale.delete()
+        for path in paths:
+            remove_part(path)
+
+        # Archivos sin fila (p. ej. de un proceso que terminó antes de confirmar la transacción)
+        orphans = 0
+        if os.path.isdir(settings.PHOTO_UPLOAD_DIR):
+            known = {f"{pk}.part" for pk in PhotoUpload.objects.values_list('pk', flat=True)}
+            for entry in os.scandir(settings.PHOTO_UPLOAD_DIR):
+                if (entry.is_file() and entry.name not in known
+                        and entry.stat().st_mtime < cutoff.timestamp()):
+                    remove_part(entry.path)
+                    orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} photo uploads and {orphans} orphaned files."
+        ))
@@ -0,0 +1,333 @@
+"""Admission control for the public preregistration endpoints.
+
+Before a request to ``PREREGISTRATION_ADMISSION['PATH_PREFIX']`` (with one of
+the configured methods) is processed, `AdmissionController` checks, in order:
+
+- the declared body size (413 without reading the body);
+- a token bucket per client IP (429);
+- a global token bucket (503);
+- the number of requests already in flight (503).
+
+Methods in ``UNMETERED_METHODS`` skip the token buckets: the chunks of a photo
+upload (PATCH) belong to a session whose creation (POST) was already metered.
+
+Endpoints with their own budget (e.g. the GET validation pre-check) use the
+`limit_requests` decorator with a separate setting instead.
+
+Rejected requests get a ``Retry-After`` header and are counted by reason in
+`admission_stats()` and in the ``/metrics`` endpoint.
+
+Under WSGI the body is read lazily, so `AdmissionControlMiddleware` runs
+before the upload is consumed. Under ASGI, Django reads the whole body before
+any middleware runs, so `asgi.py` wraps the application with
+`AdmissionControlASGIMiddleware`, which applies the same checks on the
+connection scope. It also stops uploads without a Content-Length that grow
+past the limit.
+"""
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from monitoring.metrics import ADMISSION_IN_FLIGHT, count_admission_rejection
+
+DEFAULTS = {
+    'PATH_PREFIX': '/preregister/',
+    'METHODS': ('POST', 'PUT', 'PATCH'),
+    'UNMETERED_METHODS': ('PATCH',),
+    'IP_RATE': 0.2,          # fichas por segundo por IP
+    'IP_BURST': 10,
+    'GLOBAL_RATE': 20.0,     # fichas por segundo para todo el proceso
+    'GLOBAL_BURST': 200,
+    'MAX_IN_FLIGHT': 50,
+    'MAX_BODY_SIZE': 10 * 1024 * 1024,
+    'TRUSTED_PROXIES': 0,    # proxies delante de Django que añaden X-Forwarded-For
+    'MAX_TRACKED_IPS': 10000,
+}
+
+REASONS = {
+    'body_size': (413, "Request body too large."),
+    'ip_rate': (429, "Too many requests, please try again later."),
+    'global_rate': (503, "The service is busy, please try again later."),
+    'concurrency': (503, "The service is busy, please try again later."),
+}
+
+
+class TokenBucket:
+    """Allows `burst` requests at once and refills at `rate` tokens per second."""
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now):
+        """Takes one token; returns 0 on success or the seconds until one is available."""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def give_back(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+def client_ip(remote_addr, forwarded_for, trusted_proxies):
+    """Returns the client address, trusting only the last `trusted_proxies` hops of X-Forwarded-For."""
+    if trusted_proxies and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(trusted_proxies, len(hops))]
+    return remote_addr or 'unknown'
+
+
+class AdmissionController:
+    def __init__(self, options=None, clock=time.monotonic):
+        self.options = {**DEFAULTS, **(options or {})}
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.ip_buckets = OrderedDict()
+        self.global_bucket = TokenBucket(self.options['GLOBAL_RATE'], self.options['GLOBAL_BURST'], clock())
+        self.in_flight = 0
+        self.max_in_flight_seen = 0
+        self.admitted = 0
+        self.rejections = Counter()
+
+    def applies(self, method, path):
+        return method in self.options['METHODS'] and path.startswith(self.options['PATH_PREFIX'])
+
+    def metered(self, method):
+        return method not in self.options['UNMETERED_METHODS']
+
+    def client_ip(self, remote_addr, forwarded_for):
+        return client_ip(remote_addr, forwarded_for, self.options['TRUSTED_PROXIES'])
+
+    def ip_bucket(self, ip, now):
+        bucket = self.ip_buckets.get(ip)
+        if bucket is None:
+            bucket = TokenBucket(self.options['IP_RATE'], self.options['IP_BURST'], now)
+            self.ip_buckets[ip] = bucket
+            # Se descartan las IPs menos recientes; una IP olvidada vuelve con el cubo lleno.
+            while len(self.ip_buckets) > self.options['MAX_TRACKED_IPS']:
+                self.ip_buckets.popitem(last=False)
+        else:
+            self.ip_buckets.move_to_end(ip)
+        return bucket
+
+    def admit(self, ip, content_length=None, metered=True):
+        """Returns None when the request may proceed (call `release` when done), else (reason, retry_after)."""
+        if content_length is not None and content_length > self.options['MAX_BODY_SIZE']:
+            return self.reject('body_size', 0)
+        with self.lock:
+            taken = []
+            if metered:
+                now = self.clock()
+                bucket = self.ip_bucket(ip, now)
+                wait = bucket.take(now)
+                if wait:
+                    return self.reject('ip_rate', wait)
+                taken.append(bucket)
+                wait = self.global_bucket.take(now)
+                if wait:
+                    bucket.give_back()
+                    return self.reject('global_rate', wait)
+                taken.append(self.global_bucket)
+            if self.in_flight >= self.options['MAX_IN_FLIGHT']:
+                for bucket in taken:
+                    bucket.give_back()
+                return self.reject('concurrency', 1)
+            self.in_flight += 1
+            ADMISSION_IN_FLIGHT.inc()
+            self.max_in_flight_seen = max(self.max_in_flight_seen, self.in_flight)
+            self.admitted += 1
+        return None
+
+    def reject(self, reason, retry_after):
+        with self.lock:
+            self.rejections[reason] += 1
+        count_admission_rejection(reason)
+        return reason, max(1, math.ceil(retry_after)) if retry_after != math.inf else 60
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.dec()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'admitted': self.admitted,
+                'rejected': dict(self.rejections),
+                'in_flight': self.in_flight,
+                'in_flight_max': self.max_in_flight_seen,
+                'tracked_ips': len(self.ip_buckets),
+            }
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(setting='PREREGISTRATION_ADMISSION'):
+    """Returns the process-wide controller configured by the `setting` dict."""
+    with _controllers_lock:
+        if setting not in _controllers:
+            _controllers[setting] = AdmissionController(getattr(settings, setting, None))
+        return _controllers[setting]
+
+
+@receiver(setting_changed)
+def reset_controller(setting, **kwargs):
+    with _controllers_lock:
+        _controllers.pop(setting, None)
+
+
+def admission_stats(setting='PREREGISTRATION_ADMISSION'):
+    return get_controller(setting).stats()
+
+
+def parse_content_length(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def rejection_response(reason, retry_after):
+    status, message = REASONS[reason]
+    response = HttpResponse(message, status=status, content_type='text/plain; charset=utf-8')
+    if reason != 'body_size':
+        response['Retry-After'] = str(retry_after)
+    return response
+
+
+def limit_requests(setting):
+    """Applies the token buckets and concurrency cap configured in `setting` to an async view."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            controller = get_controller(setting)
+            ip = controller.client_ip(request.META.get('REMOTE_ADDR'), request.META.get('HTTP_X_FORWARDED_FOR'))
+            rejection = controller.admit(ip, parse_content_length(request.META.get('CONTENT_LENGTH')))
+            if rejection:
+                return rejection_response(*rejection)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                controller.release()
+        return wrapped
+    return decorator
+
+
+class AdmissionControlMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def check(self, request):
+        """Returns (controller, rejection response or None), or (None, None) when the request isn't limited."""
+        controller = get_controller()
+        scope = getattr(request, 'scope', None)
+        if (scope and scope.get('admission_checked')) or not controller.applies(request.method, request.path):
+            return None, None
+        ip = controller.client_ip(request.META.get('REMOTE_ADDR'), request.META.get('HTTP_X_FORWARDED_FOR'))
+        rejection = controller.admit(
+            ip, parse_content_length(request.META.get('CONTENT_LENGTH')), controller.metered(request.method)
+        )
+        if rejection:
+            return None, rejection_response(*rejection)
+        return controller, None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        controller, rejection = self.check(request)
+        if rejection:
+            return rejection
+        try:
+            return self.get_response(request)
+        finally:
+            if controller:
+                controller.release()
+
+    async def __acall__(self, request):
+        controller, rejection = self.check(request)
+        if rejection:
+            return rejection
+        try:
+            return await self.get_response(request)
+        finally:
+            if controller:
+                controller.release()
+
+
+class AdmissionControlASGIMiddleware:
+    """ASGI wrapper that applies the admission checks before the request body is received."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        controller = get_controller()
+        if not controller.applies(scope['method'], scope['path']):
+            return await self.app(scope, receive, send)
+
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        client = scope.get('client')
+        ip = controller.client_ip(client[0] if client else None, headers.get('x-forwarded-for'))
+        rejection = controller.admit(
+            ip, parse_content_length(headers.get('content-length')), controller.metered(scope['method'])
+        )
+        if rejection:
+            return await self.send_rejection(send, *rejection)
+
+        limit = controller.options['MAX_BODY_SIZE']
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit and not rejected:
+                    # Cuerpo sin Content-Length que supera el límite: se responde 413 y se corta la lectura.
+                    rejected = True
+                    controller.reject('body_size', 0)
+                    await self.send_rejection(send, 'body_size', 0)
+                    return {'type': 'http.disconnect'}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app({**scope, 'admission_checked': True}, limited_receive, guarded_send)
+        finally:
+            controller.release()
+
+    async def send_rejection(self, send, reason, retry_after):
+        status, message = REASONS[reason]
+        headers = [(b'content-type', b'text/plain; charset=utf-8')]
+        if reason != 'body_size':
+            headers.append((b'retry-after', str(retry_after).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': message.encode()})
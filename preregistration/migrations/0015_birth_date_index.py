@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preregistration', '0014_alter_preregister_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='preregister',
+            name='birth_date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
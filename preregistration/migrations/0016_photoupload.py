@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:02
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preregistration', '0015_birth_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='file name')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='content type')),
+                ('size', models.PositiveIntegerField(verbose_name='size')),
+                ('received', models.PositiveIntegerField(default=0, verbose_name='received bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='completed at')),
+            ],
+            options={
+                'verbose_name': 'Photo upload',
+                'verbose_name_plural': 'Photo uploads',
+            },
+        ),
+    ]
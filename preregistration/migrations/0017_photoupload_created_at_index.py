@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preregistration', '0016_photoupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photoupload',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created at'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preregistration', '0017_photoupload_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='preregister',
+            index=models.Index(fields=['curp', 'approval_status'], name='prereg_curp_status_idx'),
+        ),
+    ]
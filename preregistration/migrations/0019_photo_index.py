@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preregistration', '0018_preregister_curp_status_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='preregister',
+            name='photo',
+            field=models.ImageField(db_index=True, upload_to='members_photos/'),
+        ),
+    ]
@@ -1,5 +1,10 @@
+import os
 import uuid
-from django.db import models
+from django.conf import settings
+from django.core import signing
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models, transaction
+from django.utils import timezone
 from crm.models import Person, Member, Contact
 from django.utils.translation import gettext_lazy as _
 
@@ -21,6 +26,10 @@ class Preregister(Person):
     class Meta:
         verbose_name = _("Pre-register")
         verbose_name_plural = _("Pre-registers")
+        indexes = [
+            # Búsqueda de preregistros pendientes por CURP (validación previa y conversión a miembro)
+            models.Index(fields=['curp', 'approval_status'], name='prereg_curp_status_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -47,4 +56,98 @@ class TermsAndConditions(models.Model):
         verbose_name_plural = _("Terms and Conditions")
         
     def __str__(self): 
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class PhotoUpload(models.Model):
+    """Temporary upload session for a preregistration photo sent in chunks.
+
+    The bytes are appended to ``<PHOTO_UPLOAD_DIR>/<id>.part``; once `received`
+    reaches `size` and the image is verified the upload is completed and the
+    public form can reference it by its signed `token` instead of posting the
+    photo again. A valid photo posted with an invalid form is stashed the same
+    way (`stash`). Uploads older than PHOTO_UPLOAD_MAX_AGE are removed by the
+    ``purge_photo_uploads`` command.
+    """
+    TOKEN_SALT = 'preregistration.photo_upload'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255, verbose_name=_("file name"))
+    content_type = models.CharField(max_length=100, blank=True, verbose_name=_("content type"))
+    size = models.PositiveIntegerField(verbose_name=_("size"))
+    received = models.PositiveIntegerField(default=0, verbose_name=_("received bytes"))
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_("created at"))
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name=_("completed at"))
+
+    class Meta:
+        verbose_name = _("Photo upload")
+        verbose_name_plural = _("Photo uploads")
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def path(self):
+        return os.path.join(settings.PHOTO_UPLOAD_DIR, f"{self.pk}.part")
+
+    @classmethod
+    def stash(cls, file):
+        """Stores an already validated uploaded file as a completed upload."""
+        upload = cls(filename=os.path.basename(file.name)[-255:], content_type=getattr(file, 'content_type', '') or '',
+                     size=file.size)
+        os.makedirs(settings.PHOTO_UPLOAD_DIR, exist_ok=True)
+        with open(upload.path, 'wb') as part:
+            for chunk in file.chunks():
+                part.write(chunk)
+        upload.received = file.size
+        upload.complete()
+        upload.save()
+        return upload
+
+    @classmethod
+    def from_token(cls, token):
+        """Returns the completed upload signed in `token`, or None if it is invalid, expired or purged."""
+        try:
+            pk = signing.loads(token, salt=cls.TOKEN_SALT, max_age=settings.PHOTO_UPLOAD_MAX_AGE)
+        except signing.BadSignature:
+            return None
+        return cls.objects.filter(pk=pk, completed_at__isnull=False).first()
+
+    @property
+    def token(self):
+        return signing.dumps(str(self.pk), salt=self.TOKEN_SALT)
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
+    def write_chunk(self, data):
+        """Appends `data` at the current offset; the caller must hold a row lock."""
+        os.makedirs(settings.PHOTO_UPLOAD_DIR, exist_ok=True)
+        with open(self.path, 'r+b' if self.received else 'wb') as part:
+            # Se escribe en el offset confirmado: un fragmento repetido tras un corte sobrescribe lo no confirmado.
+            part.seek(self.received)
+            part.write(data)
+            part.truncate()
+        self.received += len(data)
+
+    def open(self):
+        """Returns the received bytes as an UploadedFile the photo field can take."""
+        return UploadedFile(open(self.path, 'rb'), name=self.filename, content_type=self.content_type, size=self.received)
+
+    def complete(self):
+        self.completed_at = timezone.now()
+
+    def delete(self, *args, **kwargs):
+        path = self.path
+        result = super().delete(*args, **kwargs)
+        # El archivo se borra solo si el borrado de la fila se confirma.
+        transaction.on_commit(lambda: remove_part(path))
+        return result
+
+
+def remove_part(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,63 @@
+"""Validation pre-check for the public preregistration form.
+
+The form page calls it while the parent types, before any photo is sent, to
+report a malformed CURP or phone and a CURP that already belongs to a member
+or to a pending preregister. The registration lookups go through the unique
+index on ``Member.curp`` and ``prereg_curp_status_idx``, and are cached for
+REGISTRATION_CACHE_TIMEOUT seconds. Saving or deleting a member or
+preregister drops the entry (``preregistration.signals``).
+"""
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext as _
+
+from crm.models import CURP_PATTERN, PHONE_PATTERN, Member
+from .models import Preregister
+from .status import curp_digest
+
+REGISTRATION_CACHE_TIMEOUT = 60
+
+
+def registration_cache_key(curp):
+    return f"preregistration:curp:{curp_digest(curp)}"
+
+
+async def curp_registration(curp):
+    """Returns (member_exists, pending_preregister) for a well-formed CURP."""
+    key = registration_cache_key(curp)
+    entry = await cache.aget(key)
+    if entry is None:
+        entry = (
+            await Member.objects.filter(curp=curp).aexists(),
+            await Preregister.objects.filter(curp=curp, approval_status='PENDING').aexists(),
+        )
+        await cache.aset(key, entry, REGISTRATION_CACHE_TIMEOUT)
+    return entry
+
+
+async def precheck(curp=None, phone_number=None):
+    """Returns the errors and warnings of the given fields, as lists of messages by field name."""
+    errors, warnings = {}, {}
+    if phone_number is not None and not re.match(PHONE_PATTERN, phone_number):
+        errors['phone_number'] = [
+            _("The phone number must contain only digits and be between 10 and 15 characters long.")
+        ]
+    if curp is not None:
+        if not re.match(CURP_PATTERN, curp):
+            errors['curp'] = [_("The CURP must follow a valid format.")]
+        else:
+            member_exists, pending = await curp_registration(curp)
+            if member_exists:
+                errors['curp'] = [_("This CURP already belongs to a member of the academy; please contact us.")]
+            elif pending:
+                warnings['curp'] = [_("There is already a pending pre-registration for this CURP.")]
+    return {'errors': errors, 'warnings': warnings}
+
+
+def invalidate_registration(curps):
+    """Deletes the cached registration of `curps` after the current transaction commits."""
+    keys = [registration_cache_key(curp) for curp in curps if curp]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
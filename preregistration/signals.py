@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from crm.models import Member
+from .models import Preregister
+from .precheck import invalidate_registration
+from .status import invalidate_status
+
+
+@receiver([post_save, post_delete], sender=Preregister)
+def clear_cached_status(sender, instance, raw=False, **kwargs):
+    """Drops the cached approval status and CURP registration when a preregister is saved or deleted."""
+    if not raw:
+        invalidate_status([instance.folio])
+        invalidate_registration([instance.curp])
+
+
+@receiver([post_save, post_delete], sender=Member)
+def clear_cached_registration(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_registration([instance.curp])
@@ -0,0 +1,113 @@
+'use strict';
+{
+    // Sube la foto por fragmentos antes de enviar el formulario y, si la conexión se corta,
+    // continúa desde el último byte confirmado por el servidor.
+    const container = document.querySelector('.photo-upload');
+    if (container && window.fetch && window.Blob) {
+        const fileInput = container.querySelector('input[type="file"]');
+        const uploadInput = container.querySelector('input[name="photo_upload"]');
+        const progress = container.querySelector('.photo-upload-progress');
+        const form = container.closest('form');
+        const submit = form.querySelector('button[type="submit"]');
+        const csrfToken = form.querySelector('input[name="csrfmiddlewaretoken"]').value;
+        const maxAttempts = 8;
+        let current = null;
+
+        function sleep(seconds) {
+            return new Promise(function(resolve) { setTimeout(resolve, seconds * 1000); });
+        }
+
+        function request(url, options) {
+            options.credentials = 'same-origin';
+            options.headers = Object.assign({'X-CSRFToken': csrfToken}, options.headers);
+            return fetch(url, options);
+        }
+
+        async function retryDelay(response, attempt) {
+            const retryAfter = response && parseInt(response.headers.get('Retry-After'), 10);
+            await sleep(retryAfter || Math.min(2 ** attempt, 30));
+        }
+
+        async function upload(file, token) {
+            const response = await request(container.dataset.url, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({filename: file.name, size: file.size, content_type: file.type}),
+            });
+            if (!response.ok) {
+                throw new Error('create');
+            }
+            let state = await response.json();
+            const url = container.dataset.url + state.id + '/';
+            let attempt = 0;
+            while (!state.complete) {
+                if (token !== current) {
+                    return null;  // Se eligió otro archivo
+                }
+                progress.querySelector('span').textContent = Math.floor(100 * state.offset / state.size);
+                let chunkResponse = null;
+                try {
+                    chunkResponse = await request(url, {
+                        method: 'PATCH',
+                        headers: {'Upload-Offset': String(state.offset)},
+                        body: file.slice(state.offset, state.offset + state.chunk_size),
+                    });
+                } catch (error) {
+                    // Error de red: se pregunta al servidor cuánto recibió
+                }
+                if (chunkResponse && chunkResponse.ok) {
+                    state = await chunkResponse.json();
+                    attempt = 0;
+                    continue;
+                }
+                if (chunkResponse && chunkResponse.status === 400) {
+                    throw new Error('rejected');
+                }
+                if (++attempt > maxAttempts) {
+                    throw new Error('retries');
+                }
+                await retryDelay(chunkResponse, attempt);
+                try {
+                    const stateResponse = await request(url, {method: 'GET'});
+                    if (stateResponse.status === 404) {
+                        throw new Error('expired');
+                    }
+                    if (stateResponse.ok) {
+                        state = await stateResponse.json();
+                    }
+                } catch (error) {
+                    if (error.message === 'expired') {
+                        throw error;
+                    }
+                }
+            }
+            return state.token;
+        }
+
+        fileInput.addEventListener('change', function() {
+            const token = current = {};
+            fileInput.name = 'photo';
+            uploadInput.value = '';
+            const file = fileInput.files[0];
+            if (!file) {
+                return;
+            }
+            submit.disabled = true;
+            progress.hidden = false;
+            upload(file, token).then(function(uploadToken) {
+                if (uploadToken && token === current) {
+                    // El formulario solo envía el token; el archivo ya está en el servidor.
+                    uploadInput.value = uploadToken;
+                    fileInput.removeAttribute('name');
+                }
+            }).catch(function() {
+                // Si falla, la foto se envía con el formulario como antes.
+            }).finally(function() {
+                if (token === current) {
+                    submit.disabled = false;
+                    progress.hidden = true;
+                }
+            });
+        });
+    }
+}
@@ -0,0 +1,55 @@
+'use strict';
+{
+    // Valida CURP y teléfono con el servidor mientras se llena el formulario, antes de subir la foto.
+    const form = document.querySelector('form[data-precheck-url]');
+    if (form && window.fetch) {
+        const fields = ['curp', 'phone_number'];
+
+        function messageBox(input) {
+            let box = input.parentElement.querySelector('.precheck-message');
+            if (!box) {
+                box = document.createElement('div');
+                box.className = 'precheck-message';
+                input.insertAdjacentElement('afterend', box);
+            }
+            return box;
+        }
+
+        function show(input, errors, warnings) {
+            const box = messageBox(input);
+            box.textContent = '';
+            errors.concat(warnings).forEach(function(message, index) {
+                const p = document.createElement('p');
+                p.className = index < errors.length ? 'error' : 'warning';
+                p.textContent = message;
+                box.appendChild(p);
+            });
+        }
+
+        fields.forEach(function(name) {
+            const input = form.querySelector('[name="' + name + '"]');
+            if (!input) {
+                return;
+            }
+            input.addEventListener('change', function() {
+                const value = input.value.trim();
+                if (!value) {
+                    show(input, [], []);
+                    return;
+                }
+                const params = new URLSearchParams({[name]: value});
+                fetch(form.dataset.precheckUrl + '?' + params, {credentials: 'same-origin'})
+                    .then(function(response) {
+                        // 429/503: el servidor está limitando; la validación final ocurre al enviar.
+                        return response.ok ? response.json() : null;
+                    })
+                    .then(function(data) {
+                        if (data && input.value.trim() === value) {
+                            show(input, data.errors[name] || [], data.warnings[name] || []);
+                        }
+                    })
+                    .catch(function() {});
+            });
+        });
+    }
+}
@@ -0,0 +1,44 @@
+"""Approval status lookups for applicants.
+
+Parents poll the status of their folio, so each lookup is cached for
+STATUS_CACHE_TIMEOUT seconds in the ``default`` cache, unknown folios
+included. The entry keeps a digest of the CURP instead of the CURP itself.
+Status changes delete the entry once their transaction commits (see
+``preregistration.signals`` and ``actions.cancel_duplicate_preregisters``).
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import Preregister
+
+STATUS_CACHE_TIMEOUT = 60
+MISSING = ''  # Entrada para folios inexistentes; evita consultar la base en cada intento
+
+
+def status_cache_key(folio):
+    return f"preregistration:status:{folio}"
+
+
+def curp_digest(curp):
+    return salted_hmac('preregistration.status.curp', curp.strip().upper()).hexdigest()
+
+
+async def lookup_status(folio, curp):
+    """Returns the approval status of the folio when `curp` matches it, else None."""
+    key = status_cache_key(folio)
+    entry = await cache.aget(key)
+    if entry is None:
+        row = await Preregister.objects.filter(folio=folio).values_list('curp', 'approval_status').afirst()
+        entry = (curp_digest(row[0]), row[1]) if row else MISSING
+        await cache.aset(key, entry, STATUS_CACHE_TIMEOUT)
+    if entry == MISSING or not constant_time_compare(entry[0], curp_digest(curp)):
+        return None
+    return entry[1]
+
+
+def invalidate_status(folios):
+    """Deletes the cached status of `folios` after the current transaction commits."""
+    keys = [status_cache_key(folio) for folio in folios if folio]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,6 +1,21 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from preregistration.actions import cancel_duplicate_preregisters
 from preregistration.forms import PreRegisterPublicForm
-from crm.models import MedicalCondition, ContactRelation, DiscoverySource
+from preregistration.middleware import AdmissionControlASGIMiddleware, AdmissionController, admission_stats
+from preregistration.models import PhotoUpload, Preregister, TermsAndConditions
+from crm.models import MedicalCondition, ContactRelation, DiscoverySource, Member
 from django.core.files.uploadedfile import SimpleUploadedFile
 from PIL import Image
 from io import BytesIO
@@ -75,3 +90,351 @@ class PreRegisterMedicalConditionTests(TestCase):
         file = create_test_image()
         form = PreRegisterPublicForm(data=self.form_data,files={'photo': file})
         self.assertTrue(form.is_valid(), form.errors)
+
+
+class PreregisterAdminAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        cls.members = [
+            Member.objects.create(
+                name=f"Member {i}", last_name=f"Lopez{i}", second_last_name="Diaz", curp=f"AUTO010101HDFRRN{i:02d}",
+                birth_date="1990-01-01", gender="M", phone_number="1234567890", email="member@example.com",
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_add_page_does_not_render_every_member(self):
+        """El formulario usa autocompletado en lugar de un <select> con todos los miembros."""
+        response = self.client.get(reverse('admin:preregistration_preregister_add'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, str(self.members[0]))
+
+    def test_member_autocomplete_searches_by_prefix(self):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'term': 'lopez1', 'app_label': 'preregistration', 'model_name': 'preregister', 'field_name': 'member',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['id'] for result in response.json()['results']], [str(self.members[1].pk)])
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'term': 'opez', 'app_label': 'preregistration', 'model_name': 'preregister', 'field_name': 'member',
+        })
+        self.assertEqual(response.json()['results'], [])
+
+
+class AsyncPreregistrationViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.media_root, PHOTO_UPLOAD_DIR=cls.media_root + '/uploads', PHOTO_UPLOAD_CHUNK_SIZE=400
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.relation = ContactRelation.objects.create(name="Parent")
+        self.source = DiscoverySource.objects.create(name="Radio")
+        self.form_data = {
+            'last_name': 'Pérez',
+            'second_last_name': 'López',
+            'name': 'Ana',
+            'curp': 'ASYN010101MDFRRN01',
+            'birth_date': '2015-01-01',
+            'gender': 'F',
+            'phone_number': '1234567890',
+            'email': 'ana@example.com',
+            'accept_terms': 'on',
+            'how_did_you_hear': self.source.pk,
+            'medical_conditions': [MedicalCondition.objects.get(name="None").pk],
+            'main_contact_name': 'John Doe',
+            'main_contact_phone': '0987654321',
+            'main_contact_relation': self.relation.pk,
+            'emergency_contact_name': 'Jane Doe',
+            'emergency_contact_phone': '0123456789',
+            'emergency_contact_relation': self.relation.pk,
+        }
+
+    async def test_form_page(self):
+        response = await self.async_client.get(reverse('preregister_create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.relation, response.context['contact_relations'])
+
+    async def test_valid_submission_creates_preregister_and_contacts(self):
+        response = await self.async_client.post(
+            reverse('preregister_create'), {**self.form_data, 'photo': create_test_image()}
+        )
+        self.assertEqual(response.status_code, 302)
+        preregister = await Preregister.objects.aget(curp='ASYN010101MDFRRN01')
+        self.assertIn(preregister.folio, response['Location'])
+        self.assertEqual(await preregister.preregisters.acount(), 2)
+
+    async def test_invalid_photo_is_reported(self):
+        photo = SimpleUploadedFile("photo.jpg", b"not an image", content_type="image/jpeg")
+        response = await self.async_client.post(reverse('preregister_create'), {**self.form_data, 'photo': photo})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('photo', response.context['form'].errors)
+        self.assertFalse(await Preregister.objects.aexists())
+
+    async def start_upload(self, content):
+        response = await self.async_client.post(
+            reverse('photo_upload_create'), {'filename': 'photo.jpg', 'size': len(content), 'content_type': 'image/jpeg'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return reverse('photo_upload', args=[response.json()['id']])
+
+    async def send_chunk(self, url, offset, data):
+        return await self.async_client.patch(
+            url, data, content_type='application/octet-stream', headers={'Upload-Offset': str(offset)}
+        )
+
+    async def test_chunked_upload_resumes_and_is_referenced_by_the_form(self):
+        content = create_test_image().read()
+        url = await self.start_upload(content)
+        self.assertEqual((await self.send_chunk(url, 0, content[:400])).json()['offset'], 400)
+        # Un fragmento repetido tras un corte se rechaza con el offset actual
+        response = await self.send_chunk(url, 0, content[:400])
+        self.assertEqual(response.status_code, 409)
+        offset = (await self.async_client.get(url)).json()['offset']
+        while offset < len(content):
+            state = (await self.send_chunk(url, offset, content[offset:offset + 400])).json()
+            offset = state['offset']
+        self.assertTrue(state['complete'])
+
+        response = await self.async_client.post(reverse('preregister_create'), {**self.form_data, 'photo_upload': state['token']})
+        self.assertEqual(response.status_code, 302)
+        preregister = await Preregister.objects.aget(curp='ASYN010101MDFRRN01')
+        with preregister.photo.open('rb') as photo:
+            self.assertEqual(photo.read(), content)
+        self.assertFalse(await PhotoUpload.objects.aexists())
+
+    async def test_incomplete_or_invalid_uploads_are_refused(self):
+        url = await self.start_upload(b"not an image")
+        upload_id = url.rstrip('/').rsplit('/', 1)[-1]
+        response = await self.async_client.post(reverse('preregister_create'), {**self.form_data, 'photo_upload': upload_id})
+        self.assertIn('photo_upload', response.context['form'].errors)
+        response = await self.send_chunk(url, 0, b"not an image")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(await PhotoUpload.objects.aexists())
+
+    async def test_valid_photo_is_kept_when_the_form_is_invalid(self):
+        photo = create_test_image()
+        content = photo.read()
+        photo.seek(0)
+        response = await self.async_client.post(
+            reverse('preregister_create'), {**self.form_data, 'phone_number': '12', 'photo': photo}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('phone_number', response.context['form'].errors)
+        token = response.context['form']['photo_upload'].value()
+        self.assertContains(response, token)
+
+        response = await self.async_client.post(reverse('preregister_create'), {**self.form_data, 'photo_upload': token})
+        self.assertEqual(response.status_code, 302)
+        preregister = await Preregister.objects.aget(curp='ASYN010101MDFRRN01')
+        with preregister.photo.open('rb') as saved:
+            self.assertEqual(saved.read(), content)
+        self.assertFalse(await PhotoUpload.objects.aexists())
+
+    def test_purge_photo_uploads_removes_stale_uploads(self):
+        stale = PhotoUpload.stash(create_test_image())
+        fresh = PhotoUpload.stash(create_test_image())
+        PhotoUpload.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(days=2))
+        call_command('purge_photo_uploads', stdout=StringIO())
+        self.assertEqual(list(PhotoUpload.objects.values_list('pk', flat=True)), [fresh.pk])
+        self.assertFalse(os.path.exists(stale.path))
+        self.assertTrue(os.path.exists(fresh.path))
+        self.assertIsNone(PhotoUpload.from_token(stale.token))
+
+    async def test_terms_pdf_is_streamed_in_chunks(self):
+        content = b"%PDF-1.4" + b"x" * 200000
+        terms = TermsAndConditions()
+        await sync_to_async(terms.pdf.save)("terms.pdf", ContentFile(content), save=True)
+        response = await self.async_client.get(reverse('terms_and_conditions'))
+        self.assertEqual(response['Content-Length'], str(len(content)))
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks), content)
+
+
+class AdmissionControlTests(TestCase):
+    LIMITS = {'IP_RATE': 1, 'IP_BURST': 2, 'GLOBAL_RATE': 100, 'GLOBAL_BURST': 100, 'MAX_BODY_SIZE': 1000}
+
+    def test_ip_bucket_refills_over_time(self):
+        now = [0.0]
+        controller = AdmissionController(self.LIMITS, clock=lambda: now[0])
+        self.assertIsNone(controller.admit('1.1.1.1'))
+        self.assertIsNone(controller.admit('1.1.1.1'))
+        self.assertEqual(controller.admit('1.1.1.1'), ('ip_rate', 1))
+        self.assertIsNone(controller.admit('2.2.2.2'))
+        now[0] = 1.0
+        self.assertIsNone(controller.admit('1.1.1.1'))
+        self.assertEqual(controller.stats()['rejected'], {'ip_rate': 1})
+
+    def test_concurrency_cap_and_global_bucket(self):
+        controller = AdmissionController({**self.LIMITS, 'MAX_IN_FLIGHT': 1, 'GLOBAL_RATE': 0.5, 'GLOBAL_BURST': 2},
+                                         clock=lambda: 0.0)
+        self.assertIsNone(controller.admit('1.1.1.1'))
+        self.assertEqual(controller.admit('2.2.2.2'), ('concurrency', 1))
+        controller.release()
+        self.assertIsNone(controller.admit('2.2.2.2'))
+        controller.release()
+        self.assertEqual(controller.admit('3.3.3.3'), ('global_rate', 2))
+        self.assertEqual(controller.stats()['in_flight'], 0)
+
+    def test_client_ip_trusts_only_configured_proxies(self):
+        controller = AdmissionController({'TRUSTED_PROXIES': 1})
+        self.assertEqual(controller.client_ip('10.0.0.1', 'spoofed, 8.8.8.8'), '8.8.8.8')
+        self.assertEqual(AdmissionController().client_ip('10.0.0.1', '8.8.8.8'), '10.0.0.1')
+
+    def test_middleware_rejects_before_the_view(self):
+        with override_settings(PREREGISTRATION_ADMISSION=self.LIMITS):
+            url = reverse('preregister_create')
+            response = self.client.post(url, {'name': 'x' * 2000})
+            self.assertEqual(response.status_code, 413)
+            self.assertEqual(self.client.post(url).status_code, 200)
+            self.assertEqual(self.client.post(url).status_code, 200)
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(admission_stats()['rejected'], {'body_size': 1, 'ip_rate': 1})
+
+    async def test_asgi_wrapper_refuses_oversized_body_without_reading_it(self):
+        async def app(scope, receive, send):
+            raise AssertionError("The application must not run")
+
+        async def receive():
+            raise AssertionError("The body must not be read")
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/preregister/new/', 'client': ('1.1.1.1', 1234),
+                 'headers': [(b'content-length', b'5000')]}
+        with override_settings(PREREGISTRATION_ADMISSION=self.LIMITS):
+            await AdmissionControlASGIMiddleware(app)(scope, receive, send)
+        self.assertEqual(sent[0]['status'], 413)
+
+    async def test_asgi_wrapper_cuts_streamed_body_over_the_limit(self):
+        messages = [{'type': 'http.request', 'body': b'x' * 600, 'more_body': True},
+                    {'type': 'http.request', 'body': b'x' * 600, 'more_body': True}]
+        seen = []
+
+        async def app(scope, receive, send):
+            self.assertTrue(scope['admission_checked'])
+            while True:
+                message = await receive()
+                seen.append(message['type'])
+                if message['type'] == 'http.disconnect':
+                    return
+                await send({'type': 'ignored'})
+
+        async def receive():
+            return messages.pop(0)
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/preregister/new/', 'client': ('1.1.1.1', 1234),
+                 'headers': []}
+        with override_settings(PREREGISTRATION_ADMISSION=self.LIMITS):
+            await AdmissionControlASGIMiddleware(app)(scope, receive, send)
+            self.assertEqual(admission_stats()['in_flight'], 0)
+        self.assertEqual(seen, ['http.request', 'http.disconnect'])
+        self.assertEqual([message.get('status') for message in sent], [None, 413, None])
+
+
+class PreregisterStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username="admin", password="adminpassword", email="admin@example.com")
+        cls.preregisters = [
+            Preregister.objects.create(
+                name="Ana", last_name="Pérez", second_last_name="López", curp="STAT010101MDFRRN01",
+                birth_date="2015-01-01", gender="F", phone_number="1234567890", email="ana@example.com",
+            )
+            for _ in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def status(self, folio, curp="STAT010101MDFRRN01"):
+        return self.client.get(reverse('preregister_status'), {'folio': folio, 'curp': curp})
+
+    def test_status_is_cached_and_requires_the_curp(self):
+        folio = self.preregisters[0].folio
+        self.assertEqual(self.status(folio).json()['status'], 'PENDING')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.status(folio.lower()).json()['status'], 'PENDING')
+            self.assertEqual(self.status(folio, curp="OTRA010101MDFRRN01").status_code, 404)
+        self.assertEqual(self.status('PR-00000000').status_code, 404)
+
+    def test_actions_invalidate_the_cached_status(self):
+        first, second = self.preregisters
+        self.status(first.folio)
+        self.status(second.folio)
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:preregistration_preregister_changelist'), {
+                'action': 'cancel_preregisters', '_selected_action': [first.pk],
+            })
+        self.assertEqual(self.status(first.folio).json()['status'], 'CANCELED')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_duplicate_preregisters(Preregister(pk=first.pk, curp=first.curp))
+        self.assertEqual(self.status(second.folio).json()['status'], 'CANCELED')
+
+
+class PreregisterPrecheckTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def precheck(self, **params):
+        return self.client.get(reverse('preregister_precheck'), params)
+
+    def test_formats_are_checked(self):
+        data = self.precheck(curp='abc', phone_number='12').json()
+        self.assertEqual(set(data['errors']), {'curp', 'phone_number'})
+        data = self.precheck(curp='prec010101mdfrrn01', phone_number='1234567890').json()
+        self.assertEqual(data, {'errors': {}, 'warnings': {}})
+
+    def test_registered_curps_are_reported_from_the_cache(self):
+        curp = 'PREC010101MDFRRN01'
+        Preregister.objects.create(
+            name="Ana", last_name="Pérez", second_last_name="López", curp=curp, birth_date="2015-01-01",
+            gender="F", phone_number="1234567890", email="ana@example.com",
+        )
+        self.assertIn('curp', self.precheck(curp=curp).json()['warnings'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Member.objects.create(
+                name="Ana", last_name="Pérez", second_last_name="López", curp=curp, birth_date="2015-01-01",
+                gender="F", phone_number="1234567890", email="ana@example.com",
+            )
+        self.assertIn('curp', self.precheck(curp=curp).json()['errors'])
+        with self.assertNumQueries(0):
+            self.assertIn('curp', self.precheck(curp=curp).json()['errors'])
+
+    def test_requests_are_rate_limited(self):
+        with override_settings(PREREGISTRATION_PRECHECK_ADMISSION={'IP_RATE': 0.01, 'IP_BURST': 1}):
+            self.assertEqual(self.precheck(phone_number='1234567890').status_code, 200)
+            response = self.precheck(phone_number='1234567890')
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
@@ -1,9 +1,20 @@
 from django.urls import path, include
-from .views import PreregisterCreateView, PreregisterSuccessView, TermsAndConditionsView
+from .middleware import limit_requests
+from .views import (
+    PhotoUploadCreateView, PhotoUploadView, PreregisterCreateView, PreregisterPrecheckView, PreregisterStatusView,
+    PreregisterSuccessView, TermsAndConditionsView,
+)
 
 urlpatterns = [
     path('new/', PreregisterCreateView.as_view(), name='preregister_create'),
+    path('uploads/', PhotoUploadCreateView.as_view(), name='photo_upload_create'),
+    path('uploads/<uuid:pk>/', PhotoUploadView.as_view(), name='photo_upload'),
+    path(
+        'precheck/', limit_requests('PREREGISTRATION_PRECHECK_ADMISSION')(PreregisterPrecheckView.as_view()),
+        name='preregister_precheck',
+    ),
     path('success/', PreregisterSuccessView.as_view(), name='preregister_success'),
+    path('status/', PreregisterStatusView.as_view(), name='preregister_status'),
     path('terms-and-conditions/', TermsAndConditionsView.as_view(), name='terms_and_conditions'),
     path('i18n/', include('django.conf.urls.i18n')),  # permite cambiar idioma vía POST
 ]
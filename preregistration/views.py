@@ -1,82 +1,227 @@
-from django.shortcuts import render
+"""Public preregistration views.
 
-from django.views.generic.edit import CreateView
+They are async so that, under ASGI, a process can keep thousands of slow
+clients waiting on the network: the request body is received by the server
+before the view runs, and the view only leaves the event loop for ORM calls
+and for blocking file and image work.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django import forms
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponseRedirect, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
 from django.urls import reverse_lazy
-from django.views.generic import TemplateView
-from .models import Preregister, PreRegisterContact, TermsAndConditions
+from django.views import View
+from AcademyCore2.media import aserve_file
+from monitoring.metrics import observe_photo_upload
+from .models import PhotoUpload, Preregister, PreRegisterContact, TermsAndConditions
 from crm.models import MedicalCondition, ContactRelation
-from django.http import HttpResponseRedirect, FileResponse, Http404
 from .forms import PreRegisterPublicForm
+from .precheck import precheck
+from .status import lookup_status
 
-class PreregisterCreateView(CreateView):
+class PreregisterCreateView(View):
     model = Preregister
     form_class = PreRegisterPublicForm
     template_name = 'preregistration/preregister_form.html'  # El nombre de la plantilla HTML
     success_url = reverse_lazy('preregister_success')  # Redirige tras guardar
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['medical_conditions'] = MedicalCondition.objects.all()
-        context['contact_relations'] = ContactRelation.objects.all()
-        return context
+    async def get_context_data(self, **kwargs):
+        return {
+            'medical_conditions': [condition async for condition in MedicalCondition.objects.all()],
+            'contact_relations': [relation async for relation in ContactRelation.objects.all()],
+            **kwargs,
+        }
+
+    async def render_form(self, form):
+        context = await self.get_context_data(form=form, view=self)
+        return TemplateResponse(self.request, self.template_name, context)
+
+    async def get(self, request, *args, **kwargs):
+        return await self.render_form(self.form_class())
+
+    async def post(self, request, *args, **kwargs):
+        # Leer request.POST/FILES analiza el cuerpo multipart y escribe los archivos grandes a disco.
+        form = await sync_to_async(lambda: self.form_class(request.POST, request.FILES), thread_sensitive=False)()
+        # Pillow revisa la foto en el pool de hilos; is_valid() ya no la vuelve a abrir.
+        await sync_to_async(form.verify_photo, thread_sensitive=False)()
+        if await sync_to_async(form.is_valid)():
+            return await self.form_valid(form)
+        return await self.form_invalid(form)
+
+    async def form_invalid(self, form):
+        # La foto válida se guarda para que corregir otro campo no obligue a subirla de nuevo.
+        await sync_to_async(form.stash_photo)()
+        return await self.render_form(form)
+
+    async def form_valid(self, form):
+        # Guardar la foto en disco y los registros relacionados son operaciones bloqueantes.
+        self.object = await sync_to_async(self.save)(form)
+        return HttpResponseRedirect(f"{self.success_url}?folio={self.object.folio}")
 
-    def form_invalid(self, form):
-        print("Formulario no válido:", form.errors)  # Depuración en consola
-        return super().form_invalid(form)
-    
-    def form_valid(self, form):
-        # Guarda la preinscripción
-        self.object = form.save()
+    @transaction.atomic
+    def save(self, form):
+        """Saves the preregister with its medical conditions and contacts."""
+        preregister = form.save()
+        upload = form.cleaned_data.get('photo_upload')
+        photo = form.cleaned_data.get('photo')
+        if photo:
+            observe_photo_upload('form' if upload is None else 'upload', photo.size)
+        if upload is not None:
+            photo.close()
+            upload.delete()
 
         medical_conditions = form.cleaned_data['medical_conditions']
         for condition in medical_conditions:
-            self.object.medical_conditions.add(condition)
-
-        # Captura los datos de los contactos
-        main_contact_name = form.cleaned_data['main_contact_name']
-        main_contact_phone = form.cleaned_data['main_contact_phone']
-        main_contact_relation = form.cleaned_data['main_contact_relation']
-        
-        emergency_contact_name = form.cleaned_data['emergency_contact_name']
-        emergency_contact_phone = form.cleaned_data['emergency_contact_phone']
-        emergency_contact_relation = form.cleaned_data['emergency_contact_relation']
+            preregister.medical_conditions.add(condition)
 
         # Crear el contacto principal
         PreRegisterContact.objects.create(
-            preregister=self.object,
-            name=main_contact_name,
-            phone_number=main_contact_phone,
-            relation=main_contact_relation,
+            preregister=preregister,
+            name=form.cleaned_data['main_contact_name'],
+            phone_number=form.cleaned_data['main_contact_phone'],
+            relation=form.cleaned_data['main_contact_relation'],
             is_primary=True
         )
 
         # Crear el contacto de emergencia
         PreRegisterContact.objects.create(
-            preregister=self.object,
-            name=emergency_contact_name,
-            phone_number=emergency_contact_phone,
-            relation=emergency_contact_relation,
+            preregister=preregister,
+            name=form.cleaned_data['emergency_contact_name'],
+            phone_number=form.cleaned_data['emergency_contact_phone'],
+            relation=form.cleaned_data['emergency_contact_relation'],
             is_emergency=True
         )
+        return preregister
+
+def upload_state(upload, status=200):
+    return JsonResponse({
+        'id': str(upload.pk),
+        'token': upload.token if upload.is_complete else None,
+        'offset': upload.received,
+        'size': upload.size,
+        'complete': upload.is_complete,
+        'chunk_size': settings.PHOTO_UPLOAD_CHUNK_SIZE,
+    }, status=status)
+
+
+class PhotoUploadCreateView(View):
+    """Opens a chunked upload session for the photo of the public form.
+
+    The body is JSON with ``filename``, ``size`` and ``content_type``; the
+    response carries the session id and the size of the chunks to send.
+    """
+    async def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+            filename = str(data['filename'])[-255:]
+            size = int(data['size'])
+            content_type = str(data.get('content_type', ''))[:100]
+        except (ValueError, TypeError, KeyError):
+            return JsonResponse({'error': 'filename and size are required.'}, status=400)
+        if not filename or not 0 < size <= settings.PHOTO_UPLOAD_MAX_SIZE:
+            return JsonResponse({'error': 'The photo size is not allowed.'}, status=400)
+        if content_type and not content_type.startswith('image/'):
+            return JsonResponse({'error': 'The file must be an image.'}, status=400)
+        upload = await PhotoUpload.objects.acreate(filename=filename, size=size, content_type=content_type)
+        return upload_state(upload, status=201)
+
 
-        return HttpResponseRedirect(self.get_success_url() + f"?folio={self.object.folio}")
+class PhotoUploadView(View):
+    """Reports the offset of an upload session (GET) and appends chunks to it (PATCH).
 
-class PreregisterSuccessView(TemplateView):
+    Each PATCH sends the raw bytes of one chunk with the ``Upload-Offset`` header
+    set to the offset it starts at. After a dropped connection the client asks
+    for the offset and resumes from there; a chunk for any other offset gets 409.
+    """
+    async def get(self, request, pk, *args, **kwargs):
+        upload = await sync_to_async(get_object_or_404)(PhotoUpload, pk=pk)
+        return upload_state(upload)
+
+    async def patch(self, request, pk, *args, **kwargs):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'The Upload-Offset header is required.'}, status=400)
+        data = request.body
+        if not data or len(data) > settings.PHOTO_UPLOAD_CHUNK_SIZE:
+            return JsonResponse({'error': 'The chunk size is not allowed.'}, status=400)
+        return await sync_to_async(self.append)(pk, offset, data)
+
+    @transaction.atomic
+    def append(self, pk, offset, data):
+        upload = get_object_or_404(PhotoUpload.objects.select_for_update(), pk=pk)
+        if upload.is_complete or offset != upload.received:
+            return upload_state(upload, status=409)
+        if upload.received + len(data) > upload.size:
+            return JsonResponse({'error': 'The chunk exceeds the declared size.'}, status=400)
+        upload.write_chunk(data)
+        if upload.received == upload.size:
+            photo = upload.open()
+            try:
+                forms.ImageField().to_python(photo)
+            except forms.ValidationError as error:
+                upload.delete()
+                return JsonResponse({'error': error.messages[0]}, status=400)
+            finally:
+                photo.close()
+            upload.complete()
+        upload.save(update_fields=['received', 'completed_at'])
+        return upload_state(upload)
+
+
+class PreregisterSuccessView(View):
     template_name = 'preregistration/preregister_success.html'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['folio'] = self.request.GET.get('folio')  # Extrae el folio de la URL
-        return context
-
-class TermsAndConditionsView(TemplateView):
-    #template_name = 'preregistration/terms_and_conditions.html'
-    def get(self, request, *args, **kwargs): 
-        try: 
-            terms = TermsAndConditions.objects.first() 
-            if not terms or not terms.pdf: 
-                raise Http404("Terms and Conditions not found.") 
-            return FileResponse(terms.pdf.open(), content_type='application/pdf') 
-        except TermsAndConditions.DoesNotExist: 
-            raise Http404("Terms and Conditions not found.")
+    async def get(self, request, *args, **kwargs):
+        context = {'folio': request.GET.get('folio')}  # Extrae el folio de la URL
+        return TemplateResponse(request, self.template_name, context)
+
+class PreregisterPrecheckView(View):
+    """Checks the CURP and phone of the public form before it is submitted.
 
+    Takes ``curp`` and/or ``phone_number`` as query parameters and returns
+    ``{"errors": {...}, "warnings": {...}}`` with the messages by field name.
+    Rate limited by PREREGISTRATION_PRECHECK_ADMISSION (see urls.py).
+    """
+    async def get(self, request, *args, **kwargs):
+        curp = request.GET.get('curp')
+        phone_number = request.GET.get('phone_number')
+        result = await precheck(
+            curp=curp.strip().upper() if curp is not None else None,
+            phone_number=phone_number.strip() if phone_number is not None else None,
+        )
+        response = JsonResponse(result)
+        response['Cache-Control'] = 'private, max-age=30'
+        return response
+
+
+class PreregisterStatusView(View):
+    """Returns the approval status of a folio as JSON when the CURP of the preregister matches."""
+    async def get(self, request, *args, **kwargs):
+        folio = request.GET.get('folio', '').strip().upper()
+        curp = request.GET.get('curp', '')
+        status = await lookup_status(folio, curp) if folio and curp else None
+        if status is None:
+            # La misma respuesta para folio inexistente y CURP incorrecta
+            return JsonResponse({'error': 'No pre-registration matches that folio and CURP.'}, status=404)
+        response = JsonResponse({
+            'folio': folio,
+            'status': status,
+            'label': str(dict(Preregister.STATUS_CHOICES)[status]),
+        })
+        response['Cache-Control'] = 'private, max-age=30'
+        return response
+
+
+class TermsAndConditionsView(View):
+    async def get(self, request, *args, **kwargs):
+        terms = await TermsAndConditions.objects.afirst()
+        if not terms or not terms.pdf:
+            raise Http404("Terms and Conditions not found.")
+        # El servidor frontal entrega el PDF cuando MEDIA_ACCEL está configurado; si no, se transmite por partes
+        return await aserve_file(request, terms.pdf, content_type='application/pdf', cache_control='public, max-age=300')